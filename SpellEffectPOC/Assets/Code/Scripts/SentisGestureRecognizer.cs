@@ -9,8 +9,14 @@ public class SentisGestureRecognizer : MonoBehaviour
     [Header("Model Settings")]
     [SerializeField] private ModelAsset modelAsset;
     [SerializeField] private float confidenceThreshold = 0.3f; // Very low for testing VR gestures
+
+    [Header("In-Graph Preprocessing")]
+    [Tooltip("Model exported by gesture_onnx_preprocessing.py: takes raw (1, P, 2) points and normalizes/rasterizes inside the graph")]
+    [SerializeField] private bool pointInputModel = false;
+    [SerializeField] private int pointInputLength = 64; // P used at export (--points)
     
     private Worker worker;
+    private float[] pointBuffer;
     private Model model;
     private bool isWarmedUp = false;
     
@@ -82,15 +88,8 @@ public class SentisGestureRecognizer : MonoBehaviour
             return null;
         }
 
-        // Normalize points
-        var normalizedPoints = NormalizePoints(points);
-        
-        // Convert 2D points to 28x28 image
-        var imageData = PointsToImage(normalizedPoints, 28, 28);
-        
-        // Create tensor with proper shape (1, 28, 28, 1) for NHWC format
-        var shape = new TensorShape(1, 28, 28, 1);
-        using (var inputTensor = new Tensor<float>(shape, imageData))
+        // Raw points for in-graph preprocessing, or a 28x28 image
+        using (var inputTensor = CreateInputTensor(points))
         {
             // Run inference
             worker.Schedule(inputTensor);
@@ -129,6 +128,44 @@ public class SentisGestureRecognizer : MonoBehaviour
         return null;
     }
 
+    private Tensor<float> CreateInputTensor(List<Vector2> points)
+    {
+        if (pointInputModel)
+        {
+            // Normalization and rasterization run inside the model
+            FillPointBuffer(points);
+            return new Tensor<float>(new TensorShape(1, pointInputLength, 2), pointBuffer);
+        }
+
+        // Normalize points and convert them to a 28x28 image, shape (1, 28, 28, 1) for NHWC format
+        var normalizedPoints = NormalizePoints(points);
+        var imageData = PointsToImage(normalizedPoints, 28, 28);
+        return new Tensor<float>(new TensorShape(1, 28, 28, 1), imageData);
+    }
+
+    /// <summary>
+    /// Copy raw points into the reused (P, 2) buffer, padding by repeating the last point.
+    /// Repeated points are zero-length segments, so they don't change the in-graph raster.
+    /// </summary>
+    private void FillPointBuffer(List<Vector2> points)
+    {
+        if (pointBuffer == null || pointBuffer.Length != pointInputLength * 2)
+        {
+            pointBuffer = new float[pointInputLength * 2];
+        }
+
+        int count = points.Count;
+        for (int i = 0; i < pointInputLength; i++)
+        {
+            // Longer strokes are subsampled evenly so both ends are kept
+            int source = count <= pointInputLength
+                ? Mathf.Min(i, count - 1)
+                : Mathf.RoundToInt(i * (count - 1) / (float)(pointInputLength - 1));
+            pointBuffer[2 * i] = points[source].x;
+            pointBuffer[2 * i + 1] = points[source].y;
+        }
+    }
+
     private float[] PointsToImage(List<Vector2> points, int width, int height)
     {
         var image = new float[width * height];
@@ -265,15 +302,8 @@ public class SentisGestureRecognizer : MonoBehaviour
                     warmupPoints[j] += new Vector2(i * 0.1f, i * 0.1f);
                 }
                 
-                // Normalize points
-                var normalizedPoints = NormalizePoints(warmupPoints);
-                
-                // Convert to image data
-                var imageData = PointsToImage(normalizedPoints, 28, 28);
-                
                 // Create tensor and run inference
-                var shape = new TensorShape(1, 28, 28, 1);
-                using (var inputTensor = new Tensor<float>(shape, imageData))
+                using (var inputTensor = CreateInputTensor(warmupPoints))
                 {
                     worker.Schedule(inputTensor);
                     var outputTensor = worker.PeekOutput() as Tensor<float>;
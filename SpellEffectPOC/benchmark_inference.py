@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Headless inference benchmark for the exported gesture models
+
+Replays the real XML recordings through each model (onnxruntime CPU for
+.onnx, Keras for .h5/.keras) and writes a JSON report so model versions
+can be compared:
+
+    python benchmark_inference.py [models...] [--runs 500] [--out inference_benchmark.json]
+
+Every model is measured in a freshly spawned process, so cold start
+(runtime import + model load) and first-inference latency are real cold
+numbers, like the first cast after MLWarmupManager would see.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import time
+from datetime import datetime, timezone
+import numpy as np
+from gesture_preprocessing import load_training_data
+
+DEFAULT_MODELS = ['vr_gesture_model.onnx', 'vr_gesture_model.h5']
+BATCH_SIZES = [1, 8, 32, 128]
+OUT_JSON = 'inference_benchmark.json'
+
+# --- RUNTIME ADAPTERS ---
+def load_onnx(path):
+    """Return (predict, fixed_batch) for an ONNX model on the CPU provider"""
+    import onnxruntime as ort
+
+    session = ort.InferenceSession(path, providers=['CPUExecutionProvider'])
+    model_input = session.get_inputs()[0]
+    batch_dim = model_input.shape[0]
+    fixed_batch = batch_dim if isinstance(batch_dim, int) else None
+
+    def predict(x):
+        return session.run(None, {model_input.name: x})[0]
+    return predict, fixed_batch
+
+def load_keras(path):
+    """Return (predict, fixed_batch) for a Keras model"""
+    from tensorflow import keras
+
+    model = keras.models.load_model(path, compile=False)
+
+    def predict(x):
+        return model(x, training=False).numpy()
+    return predict, None
+
+def _runtime_for(path):
+    return 'onnxruntime' if path.endswith('.onnx') else 'keras'
+
+# --- MEASUREMENT ---
+def latency_stats(samples_ms):
+    """Mean, percentile and max summary of latency samples in milliseconds"""
+    samples_ms = np.asarray(samples_ms)
+    return {
+        'mean': float(samples_ms.mean()),
+        'p50': float(np.percentile(samples_ms, 50)),
+        'p95': float(np.percentile(samples_ms, 95)),
+        'p99': float(np.percentile(samples_ms, 99)),
+        'max': float(samples_ms.max()),
+    }
+
+def benchmark_model(path, X, runs=500, batch_sizes=BATCH_SIZES):
+    """Measure one model; meant to run in a fresh process"""
+    runtime = _runtime_for(path)
+    result = {
+        'model': path,
+        'runtime': runtime,
+        'size_bytes': os.path.getsize(path),
+    }
+
+    start = time.perf_counter()
+    predict, fixed_batch = (load_onnx if runtime == 'onnxruntime' else load_keras)(path)
+    result['cold_start_ms'] = (time.perf_counter() - start) * 1000
+    result['fixed_batch'] = fixed_batch
+
+    # First inference on the first real recording
+    start = time.perf_counter()
+    predict(X[:1])
+    result['first_inference_ms'] = (time.perf_counter() - start) * 1000
+
+    # Batch-1 latency, replaying recordings in order
+    latencies = []
+    for i in range(runs):
+        sample = X[i % len(X)][None]
+        start = time.perf_counter()
+        predict(sample)
+        latencies.append((time.perf_counter() - start) * 1000)
+    result['latency_ms'] = latency_stats(latencies)
+
+    # Throughput at larger batches
+    result['throughput'] = {}
+    for batch_size in batch_sizes:
+        if fixed_batch is not None and batch_size != fixed_batch:
+            result['throughput'][str(batch_size)] = None  # Graph only accepts its fixed batch
+            continue
+        batch = np.resize(X, (batch_size,) + X.shape[1:])
+        iterations = max(1, runs // batch_size)
+        predict(batch)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            predict(batch)
+        elapsed = time.perf_counter() - start
+        result['throughput'][str(batch_size)] = {
+            'samples_per_s': batch_size * iterations / elapsed,
+            'batch_ms': elapsed / iterations * 1000,
+        }
+
+    return result
+
+def evaluate_onnx(path, X, y, runs=300):
+    """Size, batch-1 latency and accuracy of one ONNX model on labelled inputs"""
+    predict, fixed_batch = load_onnx(path)
+
+    if fixed_batch == 1:
+        predictions = np.concatenate([predict(x[None]) for x in X])
+    else:
+        predictions = predict(X)
+    accuracy = float(np.mean(np.argmax(predictions, axis=1) == y))
+
+    predict(X[:1])
+    latencies = []
+    for i in range(runs):
+        sample = X[i % len(X)][None]
+        start = time.perf_counter()
+        predict(sample)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'model': path,
+        'size_bytes': os.path.getsize(path),
+        'accuracy': accuracy,
+        'latency_ms': latency_stats(latencies),
+    }
+
+def _print_result(result):
+    latency = result['latency_ms']
+    print(f"\n📦 {result['model']} ({result['runtime']}, {result['size_bytes'] / 1024:.0f} KB)")
+    print(f"   cold start: {result['cold_start_ms']:.1f} ms, first inference: {result['first_inference_ms']:.2f} ms")
+    print(f"   batch 1: p50 {latency['p50']:.3f} ms, p95 {latency['p95']:.3f} ms, p99 {latency['p99']:.3f} ms")
+    for batch_size, stats in result['throughput'].items():
+        if stats is None:
+            print(f"   batch {batch_size:>4}: unsupported (fixed batch {result['fixed_batch']})")
+        else:
+            print(f"   batch {batch_size:>4}: {stats['samples_per_s']:,.0f} samples/s")
+
+def run_benchmarks(models, X, runs=500, batch_sizes=BATCH_SIZES):
+    """Benchmark every model in its own spawned process and return the results"""
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    for path in models:
+        if not os.path.exists(path):
+            print(f"⚠️  Skipping missing model: {path}")
+            continue
+        with ctx.Pool(1) as pool:
+            try:
+                result = pool.apply(benchmark_model, (path, X, runs, batch_sizes))
+            except Exception as e:
+                print(f"❌ Benchmark failed for {path}: {e}")
+                continue
+        _print_result(result)
+        results.append(result)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark exported gesture models")
+    parser.add_argument('models', nargs='*', default=DEFAULT_MODELS, help="ONNX/H5/Keras model files")
+    parser.add_argument('--runs', type=int, default=500, help="Batch-1 inferences to time")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=BATCH_SIZES)
+    parser.add_argument('--out', default=OUT_JSON, help="JSON report path")
+    args = parser.parse_args()
+
+    print("📂 Loading recordings to replay...")
+    X, y, _ = load_training_data()
+    X = X.reshape(-1, 28, 28, 1).astype(np.float32)
+
+    results = run_benchmarks(args.models, X, args.runs, args.batch_sizes)
+
+    report = {
+        'created': datetime.now(timezone.utc).isoformat(),
+        'host': {
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+            'python': platform.python_version(),
+        },
+        'samples': len(X),
+        'runs': args.runs,
+        'models': results,
+    }
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Report saved: {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,8 @@
 Convert the trained H5 model to ONNX format for Unity
 """
 
-import tensorflow as tf
 from tensorflow import keras
-import tf2onnx
+from gesture_onnx_export import export_keras_model
 
 def convert_model():
     print("🔄 Converting VR gesture model to ONNX...")
@@ -14,16 +13,9 @@ def convert_model():
     model = keras.models.load_model('vr_gesture_model.h5')
     print(f"✅ Loaded model: {model.input_shape}")
     
-    # Convert to ONNX
-    input_signature = [tf.TensorSpec([1, 28, 28, 1], tf.float32, name="input")]
-    
+    # Convert to ONNX (dynamic batch, named I/O, optimized graph)
     try:
-        onnx_model, _ = tf2onnx.convert.from_keras(
-            model, 
-            input_signature, 
-            opset=13,
-            output_path="vr_gesture_model.onnx"
-        )
+        export_keras_model(model, "vr_gesture_model.onnx")
         
         print("✅ ONNX conversion successful!")
         print("📁 Files created:")
@@ -1,86 +1,124 @@
-import xml.etree.ElementTree as ET
+import argparse
 import numpy as np
-import cv2
 import os
+from multiprocessing import Pool
 from tqdm import tqdm
+from gesture_dataset import DATASET_DIR, GestureDataset, append_gestures, create_dataset
+from gesture_preprocessing import MIN_POINTS, pack_points, packed_points_to_images
+from gesture_xml import read_gesture_xml
 
 # --- CONFIGURATION ---
 # Set these paths before running
 XML_DIR = '/Users/roisolomon/Downloads/GesturesRecordings'  # Directory containing your extracted XML files
 OUT_IMAGE_DIR = 'gesture_images'     # Directory to save PNG images for inspection
-OUT_NPY_IMAGES = 'vr_gesture_images.npy'  # Output numpy file for images
-OUT_NPY_LABELS = 'vr_gesture_labels.npy'  # Output numpy file for labels
+OUT_DATASET_DIR = DATASET_DIR        # Memory-mapped dataset (rasters, labels, raw points)
 IMG_SIZE = 28
+SHARDS_PER_WORKER = 4  # Smaller shards keep every core busy until the end
 
 # --- UTILITY FUNCTIONS ---
-def xml_to_points(xml_file):
-    tree = ET.parse(xml_file)
-    root = tree.getroot()
-    points = []
-    for point in root.find('Stroke').findall('Point'):
-        x = float(point.get('X'))
-        y = float(point.get('Y'))
-        points.append((x, y))
-    return np.array(points)
-
-def points_to_image(points, size=28):
-    if len(points) < 2:
-        return np.zeros((size, size), dtype=np.uint8)
-    # Normalize and center points
-    min_xy = points.min(axis=0)
-    max_xy = points.max(axis=0)
-    scale = (size - 2) / max((max_xy - min_xy).max(), 1e-5)
-    points = (points - min_xy) * scale + 1  # Padding of 1 pixel
-    img = np.zeros((size, size), dtype=np.uint8)
-    for i in range(1, len(points)):
-        pt1 = tuple(np.clip(points[i-1].astype(int), 0, size-1))
-        pt2 = tuple(np.clip(points[i].astype(int), 0, size-1))
-        cv2.line(img, pt1, pt2, 255, 1)
-    return img
+def convert_shard(shard):
+    """Parse, rasterize and save PNGs for one shard of XML files
 
-# --- MAIN SCRIPT ---
-def main():
-    os.makedirs(OUT_IMAGE_DIR, exist_ok=True)
-    images = []
+    Every file is parsed exactly once. Returns compact arrays rather than
+    Python lists: the label names, uint8 images and packed (values, offsets)
+    points of every kept file.
+    """
+    xml_dir, fnames, out_image_dir = shard
+    kept = []
     labels = []
-    label_map = {}
-    label_counter = 0
-
-    xml_files = [f for f in os.listdir(XML_DIR) if f.endswith('.xml')]
-    print(f"Found {len(xml_files)} XML files.")
+    points_list = []
 
-    for fname in tqdm(xml_files):
-        xml_path = os.path.join(XML_DIR, fname)
-        # Label: try to get from filename or XML attribute
+    for fname in fnames:
         try:
-            tree = ET.parse(xml_path)
-            root = tree.getroot()
-            label = root.attrib.get('Name')
-            if not label:
-                label = fname.split('_')[0]
+            label, points = read_gesture_xml(os.path.join(xml_dir, fname))
         except Exception as e:
             print(f"Error parsing {fname}: {e}")
             continue
-        if label not in label_map:
-            label_map[label] = label_counter
-            label_counter += 1
-        label_idx = label_map[label]
-        # Points to image
-        points = xml_to_points(xml_path)
-        img = points_to_image(points, IMG_SIZE)
-        images.append(img)
-        labels.append(label_idx)
-        # Save PNG for inspection
-        out_png = os.path.join(OUT_IMAGE_DIR, f"{os.path.splitext(fname)[0]}.png")
-        cv2.imwrite(out_png, img)
-
-    images = np.array(images, dtype=np.uint8)
-    labels = np.array(labels, dtype=np.int64)
-    print(f"Saving {len(images)} images and {len(labels)} labels...")
-    np.save(OUT_NPY_IMAGES, images)
-    np.save(OUT_NPY_LABELS, labels)
+        if len(points) < MIN_POINTS:
+            print(f"Skipping {fname}: too few points")
+            continue
+        # Label: try to get from XML attribute or filename
+        labels.append(label or fname.split('_')[0])
+        points_list.append(points)
+        kept.append(fname)
+
+    values, offsets = pack_points(points_list)
+    images = (packed_points_to_images(values, offsets, IMG_SIZE) * 255).astype(np.uint8)
+
+    # Save PNGs for inspection
+    if out_image_dir:
+        import cv2  # Only needed for the inspection PNGs
+
+        for fname, img in zip(kept, images):
+            out_png = os.path.join(out_image_dir, f"{os.path.splitext(fname)[0]}.png")
+            cv2.imwrite(out_png, img)
+
+    return np.array(labels, dtype=str), images, values.astype(np.float32), offsets
+
+def make_shards(xml_dir, xml_files, out_image_dir, n_shards):
+    """Split the file list into contiguous shards, preserving index order"""
+    bounds = np.linspace(0, len(xml_files), n_shards + 1).astype(int)
+    return [(xml_dir, xml_files[start:end], out_image_dir)
+            for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+def build_dataset(xml_dir, workers=1, out_image_dir=OUT_IMAGE_DIR):
+    """Convert every XML file in xml_dir into (label_names, images, values, offsets)"""
+    # Sorted so the output order, and therefore the .npy files, are deterministic
+    xml_files = sorted(f for f in os.listdir(xml_dir) if f.endswith('.xml'))
+    print(f"Found {len(xml_files)} XML files.")
+
+    if out_image_dir:
+        os.makedirs(out_image_dir, exist_ok=True)
+
+    shards = make_shards(xml_dir, xml_files, out_image_dir, workers * SHARDS_PER_WORKER)
+    if workers > 1:
+        with Pool(workers) as pool:
+            # imap keeps shard order, so results come back in index order
+            results = list(tqdm(pool.imap(convert_shard, shards), total=len(shards)))
+    else:
+        results = [convert_shard(shard) for shard in tqdm(shards)]
+
+    if not results:
+        return [], np.zeros((0, IMG_SIZE, IMG_SIZE), dtype=np.uint8), np.zeros((0, 2), dtype=np.float32), np.zeros(1, dtype=np.int64)
+
+    names = [str(name) for r in results for name in r[0]]
+    images = np.concatenate([r[1] for r in results])
+    values = np.concatenate([r[2] for r in results])
+
+    # Shift each shard's offsets past the points of the shards before it
+    shard_starts = np.cumsum([0] + [r[3][-1] for r in results[:-1]])
+    offsets = np.concatenate([[0]] + [r[3][1:] + start for r, start in zip(results, shard_starts)]).astype(np.int64)
+
+    return names, images, values, offsets
+
+# --- MAIN SCRIPT ---
+def main():
+    parser = argparse.ArgumentParser(description="Convert VR gesture XML files to a 28x28 image dataset")
+    parser.add_argument('--xml-dir', default=XML_DIR, help="Directory containing the XML files")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of worker processes (default: 1, 0 = all cores)")
+    parser.add_argument('--no-png', action='store_true', help="Skip writing PNGs for inspection")
+    parser.add_argument('--out', default=OUT_DATASET_DIR, help="Output dataset directory")
+    parser.add_argument('--append', action='store_true',
+                        help="Append to an existing dataset instead of rebuilding it")
+    args = parser.parse_args()
+
+    workers = args.workers if args.workers > 0 else os.cpu_count()
+    names, images, values, offsets = build_dataset(
+        args.xml_dir, workers, None if args.no_png else OUT_IMAGE_DIR
+    )
+
+    if not (args.append and os.path.exists(os.path.join(args.out, 'header.json'))):
+        create_dataset(args.out, IMG_SIZE, overwrite=True)
+
+    print(f"Saving {len(images)} images and labels to {args.out}...")
+    append_gestures(args.out, images, names, values, offsets, source=os.path.abspath(args.xml_dir))
+
+    dataset = GestureDataset(args.out)
+    label_map = {name: i for i, name in enumerate(dataset.label_names)}
+    print(f"Dataset now holds {len(dataset)} gestures")
     print("Label map:", label_map)
-    print("Done! You can now use these .npy files for model training.")
+    print("Done! You can now use this dataset for model training.")
 
 if __name__ == "__main__":
     main()
@@ -88,11 +126,13 @@ if __name__ == "__main__":
 """
 INSTRUCTIONS:
 1. Set XML_DIR to the folder where you extracted your VR gesture XML files from the headset.
-2. Run this script: python convert_vr_gestures_to_images.py
+2. Run this script: python convert_vr_gestures_to_images.py [--workers N] [--xml-dir DIR]
+   (--workers 0 uses every core, --no-png skips the inspection PNGs)
 3. The script will create:
    - gesture_images/ : PNGs of each gesture for visual inspection
-   - vr_gesture_images.npy : Numpy array of shape (N, 28, 28) with all gesture images
-   - vr_gesture_labels.npy : Numpy array of shape (N,) with integer labels
+   - vr_gesture_dataset/ : memory-mapped dataset with the (N, 28, 28) images, integer
+     labels, the raw points of every gesture and the saved label table (see gesture_dataset.py)
    - Prints the label map (int to gesture name)
-4. Use these .npy files to fine-tune your model in Keras or PyTorch.
+   Pass --append to add a new recording session without rewriting the existing data.
+4. Open it with gesture_dataset.GestureDataset to fine-tune your model in Keras or PyTorch.
 """ 
\ No newline at end of file
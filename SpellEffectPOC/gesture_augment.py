@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Stroke-level data augmentation for VR gestures
+
+Augments the raw points before rasterization instead of warping the
+28x28 bitmap, so the re-rasterized lines stay sharp 1-pixel strokes.
+Every stage works on the packed (values, offsets) batch from
+gesture_preprocessing and is vectorized across all gestures:
+
+    endpoint trimming -> point dropout -> speed/resampling jitter -> random affine
+
+All randomness comes from one np.random.Generator, so a seed reproduces a run.
+
+Run directly to measure augmented variants per second on the training corpus:
+    python gesture_augment.py
+"""
+
+import time
+import numpy as np
+from gesture_preprocessing import IMG_SIZE, load_training_points, packed_points_to_images, points_to_sequences
+
+DEFAULT_STROKE_AUGMENTATION = {
+    'trim_range': 0.1,        # Up to this fraction of points cut from each end
+    'dropout': 0.1,           # Probability of dropping an interior point
+    'speed_range': 0.3,       # Drawing-speed warp exponent in exp([-s, s])
+    'resample_jitter': 0.3,   # Per-point jitter of resampling positions, in point spacings
+    'rotation_range': 15,     # degrees
+    'shear_range': 10,        # degrees
+    'scale_range': 0.15,      # Independent x/y scale in [1 - s, 1 + s]
+}
+
+def _gesture_index(offsets):
+    """Gesture index and position within the gesture of every packed point"""
+    lengths = np.diff(offsets)
+    gesture_idx = np.repeat(np.arange(len(lengths)), lengths)
+    local = np.arange(offsets[-1]) - offsets[:-1][gesture_idx]
+    return lengths, gesture_idx, local
+
+def _compress(values, offsets, keep):
+    """Drop masked points and recompute offsets"""
+    lengths, gesture_idx, _ = _gesture_index(offsets)
+    new_offsets = np.zeros_like(offsets)
+    np.cumsum(np.bincount(gesture_idx[keep], minlength=len(lengths)), out=new_offsets[1:])
+    return values[keep], new_offsets
+
+def trim_and_drop(values, offsets, rng, trim_range=0.0, dropout=0.0):
+    """Cut random runs of points off both ends, then drop random interior points
+
+    Every gesture keeps at least its two (new) endpoints.
+    """
+    lengths, gesture_idx, local = _gesture_index(offsets)
+    n = len(lengths)
+
+    start = np.floor(rng.uniform(0, trim_range, n) * lengths).astype(np.int64)
+    end = np.floor(rng.uniform(0, trim_range, n) * lengths).astype(np.int64)
+    start = np.minimum(start, np.maximum(lengths - 2, 0))
+    end = np.minimum(end, np.maximum(lengths - start - 2, 0))
+    last = lengths - end - 1
+
+    keep = (local >= start[gesture_idx]) & (local <= last[gesture_idx])
+    endpoint = (local == start[gesture_idx]) | (local == last[gesture_idx])
+    keep &= endpoint | (rng.random(len(values)) >= dropout)
+    return _compress(values, offsets, keep)
+
+def resample_jitter(values, offsets, rng, speed_range=0.0, resample_jitter=0.0):
+    """Re-sample every stroke at warped, jittered positions along its point sequence
+
+    Positions u in [0, 1] are warped by u ** exp(U(-speed, speed)) per gesture,
+    which mimics drawing faster at the start or at the end, then jittered
+    per point. The point count of each gesture is unchanged.
+    """
+    lengths, gesture_idx, local = _gesture_index(offsets)
+    spans = np.maximum(lengths - 1, 1)[gesture_idx]
+
+    gamma = np.exp(rng.uniform(-speed_range, speed_range, len(lengths)))
+    u = (local / spans) ** gamma[gesture_idx]
+    u += rng.uniform(-resample_jitter, resample_jitter, len(values)) / spans
+    # Pin both endpoints so the stroke keeps its extent
+    u[local == 0] = 0.0
+    u[local == spans] = 1.0
+
+    position = np.clip(u, 0.0, 1.0) * spans
+    i0 = np.minimum(np.floor(position).astype(np.int64), spans - 1)
+    frac = (position - i0)[:, None]
+    base = offsets[:-1][gesture_idx] + i0
+    i1 = np.minimum(base + 1, offsets[1:][gesture_idx] - 1)
+    return values[base] * (1 - frac) + values[i1] * frac, offsets
+
+def random_affine(values, offsets, rng, rotation_range=0.0, shear_range=0.0, scale_range=0.0):
+    """Apply a random rotation, shear and anisotropic scale to each gesture
+
+    Translation and uniform scale are left out: the rasterizer re-centers and
+    re-scales every bounding box anyway.
+    """
+    lengths, gesture_idx, _ = _gesture_index(offsets)
+    n = len(lengths)
+
+    theta = np.deg2rad(rng.uniform(-rotation_range, rotation_range, n))
+    shear = np.deg2rad(rng.uniform(-shear_range, shear_range, n))
+    sx = rng.uniform(1 - scale_range, 1 + scale_range, n)
+    sy = rng.uniform(1 - scale_range, 1 + scale_range, n)
+
+    # Rotation @ shear @ scale, one 2x2 matrix per gesture
+    cos, sin, tan = np.cos(theta), np.sin(theta), np.tan(shear)
+    matrices = np.empty((n, 2, 2))
+    matrices[:, 0, 0] = cos * sx
+    matrices[:, 0, 1] = (cos * tan - sin) * sy
+    matrices[:, 1, 0] = sin * sx
+    matrices[:, 1, 1] = (sin * tan + cos) * sy
+
+    return np.einsum('mij,mj->mi', matrices[gesture_idx], values), offsets
+
+def augment_points(values, offsets, rng=None, augmentation=None):
+    """Run every augmentation stage over a packed gesture batch"""
+    rng = np.random.default_rng(rng)
+    params = dict(DEFAULT_STROKE_AUGMENTATION, **(augmentation or {}))
+    values = np.asarray(values, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+
+    values, offsets = trim_and_drop(values, offsets, rng, params['trim_range'], params['dropout'])
+    values, offsets = resample_jitter(values, offsets, rng, params['speed_range'], params['resample_jitter'])
+    values, offsets = random_affine(values, offsets, rng, params['rotation_range'],
+                                    params['shear_range'], params['scale_range'])
+    return values, offsets
+
+def augment_to_images(values, offsets, rng=None, augmentation=None, size=IMG_SIZE):
+    """Augment a packed batch and re-rasterize it to (N, size, size) float32"""
+    values, offsets = augment_points(values, offsets, rng, augmentation)
+    return packed_points_to_images(values, offsets, size)
+
+def iter_augmented_batches(values, offsets, labels, batch_size=32, rng=None, augmentation=None,
+                           sequence_points=None):
+    """Yield one epoch of freshly augmented (inputs, labels) batches
+
+    The whole epoch is augmented and rasterized in one vectorized call, then
+    shuffled. Call again for the next epoch to get new variants. Inputs are
+    (B, 28, 28, 1) rasters, or (B, K, 2) point sequences if sequence_points=K.
+    """
+    rng = np.random.default_rng(rng)
+    labels = np.asarray(labels)
+    values, offsets = augment_points(values, offsets, rng, augmentation)
+    if sequence_points:
+        inputs = points_to_sequences(values, offsets, sequence_points)
+    else:
+        inputs = packed_points_to_images(values, offsets)[..., None]
+    order = rng.permutation(len(labels))
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        yield inputs[batch], labels[batch]
+
+def main():
+    values, offsets, y, _ = load_training_points()
+    rng = np.random.default_rng(0)
+
+    epochs = 20
+    start = time.perf_counter()
+    for _ in range(epochs):
+        augment_to_images(values, offsets, rng)
+    elapsed = time.perf_counter() - start
+
+    print(f"📊 {len(y)} gestures x {epochs} epochs in {elapsed:.2f}s")
+    print(f"   {len(y) * epochs / elapsed:,.0f} augmented variants/s ({elapsed / epochs * 1000:.1f} ms per epoch)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Persistent per-file cache of parsed gesture points and rasters
+
+Entries are keyed by file path and validated by mtime, size and a content
+hash, so a retrain only re-parses and re-rasterizes recordings that were
+added or changed since the last run. A file whose mtime changed but whose
+content hash did not (e.g. re-copied by sync_gesture_files.sh) is reused.
+"""
+
+import hashlib
+import os
+from collections import namedtuple
+import numpy as np
+
+CACHE_PATH = 'gesture_cache.npz'
+CACHE_VERSION = 1
+
+# points is None for files that failed to parse or had too few points
+CacheEntry = namedtuple('CacheEntry', ['mtime_ns', 'size', 'digest', 'points', 'image'])
+
+def file_digest(data):
+    """Content hash of a recording's raw bytes"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def load_cache(cache_path, settings):
+    """Load cache entries as {path: CacheEntry}, or {} if missing or built with other settings"""
+    if not cache_path or not os.path.exists(cache_path):
+        return {}
+
+    try:
+        with np.load(cache_path) as data:
+            if not np.array_equal(data['settings'], np.asarray(settings, dtype=np.float64)):
+                print(f"Preprocessing settings changed, rebuilding {cache_path}")
+                return {}
+            paths = data['paths']
+            mtimes = data['mtime_ns']
+            sizes = data['size']
+            digests = data['digest']
+            valid = data['valid']
+            offsets = data['offsets']
+            values = data['values']
+            images = data['images']
+    except Exception as e:
+        print(f"Ignoring unreadable cache {cache_path}: {e}")
+        return {}
+
+    entries = {}
+    for i, path in enumerate(paths):
+        points = values[offsets[i]:offsets[i + 1]] if valid[i] else None
+        entries[str(path)] = CacheEntry(int(mtimes[i]), int(sizes[i]), str(digests[i]), points, images[i])
+    return entries
+
+def save_cache(cache_path, entries, settings, image_shape):
+    """Write all entries to cache_path atomically"""
+    paths = sorted(entries)
+    lengths = [len(entries[p].points) if entries[p].points is not None else 0 for p in paths]
+    offsets = np.zeros(len(paths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    values = np.zeros((offsets[-1], 2), dtype=np.float32)
+    images = np.zeros((len(paths),) + tuple(image_shape), dtype=np.uint8)
+    for i, path in enumerate(paths):
+        entry = entries[path]
+        if entry.points is not None:
+            values[offsets[i]:offsets[i + 1]] = entry.points
+            images[i] = entry.image
+
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(
+            f,
+            settings=np.asarray(settings, dtype=np.float64),
+            paths=np.array(paths, dtype=str),
+            mtime_ns=np.array([entries[p].mtime_ns for p in paths], dtype=np.int64),
+            size=np.array([entries[p].size for p in paths], dtype=np.int64),
+            digest=np.array([entries[p].digest for p in paths], dtype=str),
+            valid=np.array([entries[p].points is not None for p in paths], dtype=bool),
+            offsets=offsets,
+            values=values,
+            images=images,
+        )
+    os.replace(tmp_path, cache_path)
+
+def find_stale(entries, xml_files):
+    """Return ([(path, stat, digest, data)], refreshed) for files that must be (re)processed
+
+    Files with unchanged mtime and size are trusted without reading them.
+    Files whose content hash still matches only get their mtime refreshed.
+    """
+    stale = []
+    refreshed = 0
+    for path in xml_files:
+        st = os.stat(path)
+        entry = entries.get(path)
+        if entry is not None and entry.mtime_ns == st.st_mtime_ns and entry.size == st.st_size:
+            continue
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = file_digest(data)
+        if entry is not None and entry.digest == digest:
+            entries[path] = entry._replace(mtime_ns=st.st_mtime_ns, size=st.st_size)
+            refreshed += 1
+            continue
+
+        stale.append((path, st, digest, data))
+    return stale, refreshed
+
+def prune_deleted(entries, xml_files):
+    """Drop entries for files that no longer exist; return how many were dropped"""
+    listed = set(xml_files)
+    deleted = [p for p in entries if p not in listed and not os.path.exists(p)]
+    for path in deleted:
+        del entries[path]
+    return len(deleted)
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Early-exit cascade: cheap stroke-feature classifier first, CNN only when unsure
+
+Stage 1 is a multinomial logistic regression over a handful of handcrafted
+features of the resampled stroke (closure distance, turning-angle
+histogram, total/net turning, corner count, aspect ratio, drawing
+direction at both ends). Its logits are
+temperature-scaled on out-of-fold predictions so its confidence means what
+it says, and the exit threshold is the lowest confidence at which stage 1
+is still at least TARGET_PRECISION accurate on those predictions. Below the
+threshold the cast goes to the CNN (stage 2).
+
+Exports OUT_DIR with:
+    stage1.onnx    float32 (batch, NUM_FEATURES) features -> "probabilities"
+                   (standardization and temperature folded into one Gemm)
+    stage2.onnx    copy of the CNN
+    cascade.json   threshold, class names, feature settings and the raw
+                   stage-1 weights for a C# port of stroke_features()
+
+and reports the early-exit fraction and mean per-cast latency on the
+held-out recordings, end to end against the CNN alone and broken down
+into its parts:
+
+    python gesture_cascade.py [--model vr_gesture_model.onnx] [--target-precision 0.995]
+"""
+
+import argparse
+import json
+import math
+import os
+import shutil
+import time
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from benchmark_inference import latency_stats, load_onnx
+from gesture_preprocessing import (
+    load_training_points, pack_points, packed_points_to_images, resample_gestures
+)
+
+# --- CONFIGURATION ---
+CNN_MODEL = 'vr_gesture_model.onnx'
+OUT_DIR = 'gesture_cascade'
+FEATURE_POINTS = 32       # Resampled points the features are computed on
+TURN_BINS = 8             # Signed turning-angle histogram bins over [-pi, pi)
+CORNER_ANGLE = np.pi / 4  # A turn sharper than this counts as a corner
+STRAIGHT_TURN = 1e-9      # Smaller turns are rounding noise on collinear points and count as 0
+STAGE1_C = 10.0           # Inverse L2 strength of the logistic regression
+CALIBRATION_FOLDS = 5
+TARGET_PRECISION = 0.995  # Stage-1 accuracy required on the casts it keeps
+FEATURE_NAMES = (['closure'] + [f'turn_hist_{i}' for i in range(TURN_BINS)]
+                 + ['total_turning', 'net_turning', 'corners', 'log_aspect',
+                    'start_cos', 'start_sin', 'end_cos', 'end_sin', 'chord_cos', 'chord_sin'])
+NUM_FEATURES = len(FEATURE_NAMES)
+
+# --- STAGE 1 FEATURES ---
+def _direction(vectors):
+    """Unit (cos, sin) columns of (N, 2) vectors; zero vectors give (0, 0)"""
+    length = np.hypot(vectors[:, 0], vectors[:, 1])[:, None]
+    return np.divide(vectors, length, out=np.zeros_like(vectors), where=length > 0)
+
+def stroke_features(sequences):
+    """(N, NUM_FEATURES) float32 features of (N, K, 2) equally spaced stroke points
+
+    Every feature is invariant to translation and uniform scale, so raw
+    recordings only need resampling, not normalization.
+    """
+    sequences = np.asarray(sequences, dtype=np.float64)
+    d = np.diff(sequences, axis=1)
+    path = np.maximum(np.hypot(d[..., 0], d[..., 1]).sum(axis=1), 1e-9)
+
+    # Gap between the two ends relative to the stroke length: ~0 for a closed circle
+    chord = sequences[:, -1] - sequences[:, 0]
+    closure = np.hypot(chord[:, 0], chord[:, 1]) / path
+
+    heading = np.arctan2(d[..., 1], d[..., 0])
+    turn = (np.diff(heading, axis=1) + np.pi) % (2 * np.pi) - np.pi
+    turn[np.abs(turn) < STRAIGHT_TURN] = 0.0
+    bins = np.minimum(((turn + np.pi) * (TURN_BINS / (2 * np.pi))).astype(np.int64), TURN_BINS - 1)
+    hist = (bins[..., None] == np.arange(TURN_BINS)).mean(axis=1)
+
+    abs_turn = np.abs(turn)
+    total_turning = abs_turn.sum(axis=1) / (2 * np.pi)
+    net_turning = np.abs(turn.sum(axis=1)) / (2 * np.pi)
+    corners = (abs_turn > CORNER_ANGLE).sum(axis=1)
+
+    extent = sequences.max(axis=1) - sequences.min(axis=1)
+    log_aspect = np.log((extent[:, 0] + 1e-3 * path) / (extent[:, 1] + 1e-3 * path))
+
+    # Drawing direction at both ends, over the first/last 3 segments
+    start = _direction(sequences[:, 3] - sequences[:, 0])
+    end = _direction(sequences[:, -1] - sequences[:, -4])
+
+    return np.column_stack([closure, hist, total_turning, net_turning, corners, log_aspect,
+                            start, end, _direction(chord)]).astype(np.float32)
+
+def gesture_features(values, offsets):
+    """Stage-1 features of a packed gesture batch"""
+    return stroke_features(resample_gestures(values, offsets, FEATURE_POINTS))
+
+def cast_features(points, num_points=FEATURE_POINTS):
+    """(1, NUM_FEATURES) stage-1 features of one gesture, in plain Python floats
+
+    Same values as gesture_features (to rounding) for a single cast. The
+    NumPy version pays per-call overhead on dozens of tiny arrays, which
+    made stage 1 slower than the CNN it is meant to skip; a 32-point loop
+    in plain Python is several times faster for one cast.
+    """
+    pts = points.tolist() if isinstance(points, np.ndarray) else [list(p) for p in points]
+    arc = [0.0]
+    for (x0, y0), (x1, y1) in zip(pts, pts[1:]):
+        arc.append(arc[-1] + math.hypot(x1 - x0, y1 - y0))
+
+    # Resample to num_points equally spaced along the path, like resample_gestures
+    total, last = arc[-1], len(pts) - 1
+    if total == 0:
+        seq = [tuple(pts[0])] * num_points
+    else:
+        seq, j = [], 0
+        for k in range(num_points - 1):
+            target = total * k / (num_points - 1)
+            while j < last - 1 and arc[j + 1] <= target:
+                j += 1
+            span = arc[j + 1] - arc[j]
+            t = (target - arc[j]) / span if span > 0 else 0.0
+            (x0, y0), (x1, y1) = pts[j], pts[j + 1]
+            seq.append((x0 + t * (x1 - x0), y0 + t * (y1 - y0)))
+        seq.append(tuple(pts[-1]))
+
+    # Same features as stroke_features
+    dx = [b[0] - a[0] for a, b in zip(seq, seq[1:])]
+    dy = [b[1] - a[1] for a, b in zip(seq, seq[1:])]
+    path = max(sum(map(math.hypot, dx, dy)), 1e-9)
+    chord = (seq[-1][0] - seq[0][0], seq[-1][1] - seq[0][1])
+    closure = math.hypot(*chord) / path
+
+    heading = list(map(math.atan2, dy, dx))
+    turn = [(h1 - h0 + math.pi) % (2 * math.pi) - math.pi for h0, h1 in zip(heading, heading[1:])]
+    turn = [a if abs(a) >= STRAIGHT_TURN else 0.0 for a in turn]
+    hist = [0.0] * TURN_BINS
+    for a in turn:
+        hist[min(int((a + math.pi) * (TURN_BINS / (2 * math.pi))), TURN_BINS - 1)] += 1.0 / len(turn)
+    abs_turn = [abs(a) for a in turn]
+    corners = sum(a > CORNER_ANGLE for a in abs_turn)
+
+    xs, ys = [p[0] for p in seq], [p[1] for p in seq]
+    log_aspect = math.log((max(xs) - min(xs) + 1e-3 * path) / (max(ys) - min(ys) + 1e-3 * path))
+
+    def direction(vx, vy):
+        length = math.hypot(vx, vy)
+        return (vx / length, vy / length) if length > 0 else (0.0, 0.0)
+
+    return np.array([[closure, *hist, sum(abs_turn) / (2 * math.pi), abs(sum(turn)) / (2 * math.pi), corners,
+                      log_aspect, *direction(seq[3][0] - seq[0][0], seq[3][1] - seq[0][1]),
+                      *direction(seq[-1][0] - seq[-4][0], seq[-1][1] - seq[-4][1]), *direction(*chord)]],
+                    dtype=np.float32)
+
+# --- STAGE 1 MODEL ---
+def softmax(logits):
+    z = logits - logits.max(axis=1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=1, keepdims=True)
+
+def train_stage1(features, y, C=STAGE1_C):
+    """Fit the standardized logistic regression; returns its parameters as a dict"""
+    mean = features.mean(axis=0)
+    std = np.where(features.std(axis=0) > 1e-6, features.std(axis=0), 1.0)
+    classifier = LogisticRegression(C=C, max_iter=2000)
+    classifier.fit((features - mean) / std, y)
+    return {
+        'mean': mean.astype(np.float32),
+        'std': std.astype(np.float32),
+        'weights': classifier.coef_.astype(np.float32),      # (classes, features)
+        'bias': classifier.intercept_.astype(np.float32),
+        'temperature': 1.0,
+    }
+
+def stage1_logits(stage1, features):
+    return ((features - stage1['mean']) / stage1['std']) @ stage1['weights'].T + stage1['bias']
+
+def stage1_probabilities(stage1, features):
+    return softmax(stage1_logits(stage1, features) / stage1['temperature'])
+
+def out_of_fold_logits(features, y, folds=CALIBRATION_FOLDS, seed=42):
+    """Stage-1 logits of every sample from a model that never saw it (k-fold)"""
+    logits = np.zeros((len(y), len(np.unique(y))))
+    for fit_idx, held_idx in StratifiedKFold(folds, shuffle=True, random_state=seed).split(features, y):
+        logits[held_idx] = stage1_logits(train_stage1(features[fit_idx], y[fit_idx]), features[held_idx])
+    return logits
+
+def fit_temperature(logits, y, grid=np.exp(np.linspace(np.log(0.05), np.log(20), 400))):
+    """Temperature minimizing the negative log-likelihood of the labels"""
+    nll = [-np.mean(np.log(softmax(logits / t)[np.arange(len(y)), y] + 1e-12)) for t in grid]
+    return float(grid[int(np.argmin(nll))])
+
+def expected_calibration_error(probabilities, y, bins=10):
+    """Weighted gap between confidence and accuracy over equal-width confidence bins"""
+    confidence = probabilities.max(axis=1)
+    correct = probabilities.argmax(axis=1) == y
+    which = np.minimum((confidence * bins).astype(np.int64), bins - 1)
+    error = 0.0
+    for b in range(bins):
+        in_bin = which == b
+        if in_bin.any():
+            error += in_bin.mean() * abs(correct[in_bin].mean() - confidence[in_bin].mean())
+    return float(error)
+
+def choose_threshold(confidence, correct, target_precision=TARGET_PRECISION):
+    """Lowest confidence whose accepted casts (confidence >= it) reach target_precision
+
+    Returns 1.0 (practically never exit) if even the most confident cast misses it.
+    """
+    order = np.argsort(-confidence, kind='stable')
+    precision = np.cumsum(correct[order]) / np.arange(1, len(order) + 1)
+    ok = np.nonzero(precision >= target_precision)[0]
+    return float(confidence[order][ok[-1]]) if len(ok) else 1.0
+
+# --- EXPORT ---
+def export_stage1_onnx(stage1, path):
+    """Features -> probabilities as Gemm + Softmax, with standardization and temperature folded in"""
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+    from gesture_onnx_export import BATCH_DIM, INPUT_NAME, OPSET, OUTPUT_NAME
+
+    scale = 1.0 / (stage1['std'] * stage1['temperature'])
+    weights = (stage1['weights'] * scale).T.astype(np.float32)                     # (features, classes)
+    bias = ((stage1['bias'] - (stage1['mean'] / stage1['std']) @ stage1['weights'].T)
+            / stage1['temperature']).astype(np.float32)
+    num_classes = weights.shape[1]
+
+    graph = helper.make_graph(
+        [helper.make_node('Gemm', [INPUT_NAME, 'W', 'B'], ['logits']),
+         helper.make_node('Softmax', ['logits'], [OUTPUT_NAME], axis=1)],
+        'gesture_cascade_stage1',
+        [helper.make_tensor_value_info(INPUT_NAME, TensorProto.FLOAT, [BATCH_DIM, NUM_FEATURES])],
+        [helper.make_tensor_value_info(OUTPUT_NAME, TensorProto.FLOAT, [BATCH_DIM, num_classes])],
+        [numpy_helper.from_array(weights, 'W'), numpy_helper.from_array(bias, 'B')],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', OPSET)])
+    model.ir_version = 7  # Opset 13's IR version, loadable by older onnxruntime and Sentis
+    onnx.checker.check_model(model)
+    onnx.save(model, path)
+    return path
+
+def export_cascade(stage1, threshold, class_names, cnn_path, out_dir=OUT_DIR):
+    """Write stage1.onnx, stage2.onnx and cascade.json into out_dir"""
+    os.makedirs(out_dir, exist_ok=True)
+    export_stage1_onnx(stage1, os.path.join(out_dir, 'stage1.onnx'))
+    shutil.copyfile(cnn_path, os.path.join(out_dir, 'stage2.onnx'))
+
+    config = {
+        'threshold': threshold,
+        'class_names': list(class_names),
+        'stage1': 'stage1.onnx',
+        'stage2': 'stage2.onnx',
+        'features': {
+            'names': FEATURE_NAMES,
+            'points': FEATURE_POINTS,
+            'turn_bins': TURN_BINS,
+            'corner_angle': CORNER_ANGLE,
+            'straight_turn': STRAIGHT_TURN,
+        },
+        'stage1_params': {k: np.asarray(v).tolist() for k, v in stage1.items()},
+    }
+    with open(os.path.join(out_dir, 'cascade.json'), 'w') as f:
+        json.dump(config, f, indent=2)
+    return out_dir
+
+def load_cascade(out_dir=OUT_DIR):
+    """Return predict(points) -> (class index, confidence, stage) for an exported cascade"""
+    with open(os.path.join(out_dir, 'cascade.json')) as f:
+        config = json.load(f)
+    stage1, _ = load_onnx(os.path.join(out_dir, config['stage1']))
+    stage2, _ = load_onnx(os.path.join(out_dir, config['stage2']))
+    threshold = config['threshold']
+
+    def predict(points):
+        probabilities = stage1(cast_features(points))[0]
+        best = int(np.argmax(probabilities))
+        if probabilities[best] >= threshold:
+            return best, float(probabilities[best]), 1
+        probabilities = stage2(packed_points_to_images(*pack_points([points]))[..., None])[0]
+        best = int(np.argmax(probabilities))
+        return best, float(probabilities[best]), 2
+    return predict
+
+# --- MAIN ---
+def time_casts(predict, points_list, repeats=3):
+    """Per-cast latencies (ms, best of repeats) and the last predictions"""
+    predict(points_list[0])
+    latencies = np.full(len(points_list), np.inf)
+    results = []
+    for _ in range(repeats):
+        results = []
+        for i, points in enumerate(points_list):
+            start = time.perf_counter()
+            results.append(predict(points))
+            latencies[i] = min(latencies[i], (time.perf_counter() - start) * 1000)
+    return latencies, results
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and evaluate the early-exit gesture cascade")
+    parser.add_argument('--model', default=CNN_MODEL, help="Stage-2 CNN (ONNX)")
+    parser.add_argument('--target-precision', type=float, default=TARGET_PRECISION)
+    parser.add_argument('--out', default=OUT_DIR)
+    args = parser.parse_args()
+
+    print("🪜 Early-Exit Gesture Cascade")
+    print("=" * 40)
+
+    values, offsets, y, class_names = load_training_points()
+    # Same held-out split as the training scripts. Temperature and threshold
+    # come from out-of-fold logits over the training part, so they are picked
+    # on predictions for casts stage 1 never saw
+    train_idx, test_idx = train_test_split(np.arange(len(y)), test_size=0.2, stratify=y, random_state=42)
+    features = gesture_features(values, offsets)
+    y_train = y[train_idx]
+
+    calib_logits = out_of_fold_logits(features[train_idx], y_train)
+    temperature = fit_temperature(calib_logits, y_train)
+    ece_before = expected_calibration_error(softmax(calib_logits), y_train)
+    calib_probabilities = softmax(calib_logits / temperature)
+    ece_after = expected_calibration_error(calib_probabilities, y_train)
+    threshold = choose_threshold(calib_probabilities.max(axis=1),
+                                 calib_probabilities.argmax(axis=1) == y_train, args.target_precision)
+
+    stage1_params = train_stage1(features[train_idx], y_train)
+    stage1_params['temperature'] = temperature
+
+    print(f"📐 Stage 1: {NUM_FEATURES} features, {len(train_idx)} training casts, {CALIBRATION_FOLDS}-fold calibration")
+    print(f"   temperature {temperature:.2f}, ECE {ece_before:.3f} -> {ece_after:.3f}")
+    print(f"   exit threshold {threshold:.4f} (precision >= {args.target_precision} out of fold)")
+
+    export_cascade(stage1_params, threshold, class_names, args.model, args.out)
+    print(f"💾 Exported {args.out}/ (stage1.onnx, stage2.onnx, cascade.json)")
+
+    # Held-out evaluation, one cast at a time like the headset sees them
+    points_list = [values[offsets[i]:offsets[i + 1]] for i in test_idx]
+    single = np.concatenate([cast_features(points) for points in points_list])
+    print(f"🔍 cast_features vs gesture_features on held-out casts: max difference "
+          f"{np.abs(single - features[test_idx]).max():.2e}")
+    cascade_ms, cascade_results = time_casts(load_cascade(args.out), points_list)
+    cnn, _ = load_onnx(args.model)
+
+    def cnn_only(points):
+        probabilities = cnn(packed_points_to_images(*pack_points([points]))[..., None])[0]
+        return int(np.argmax(probabilities)), float(probabilities.max()), 2
+
+    cnn_ms, cnn_results = time_casts(cnn_only, points_list)
+
+    y_test = y[test_idx]
+    predicted = np.array([r[0] for r in cascade_results])
+    stages = np.array([r[2] for r in cascade_results])
+    early = stages == 1
+    cnn_accuracy = float(np.mean(np.array([r[0] for r in cnn_results]) == y_test))
+    stage1_test = stage1_probabilities(stage1_params, features[test_idx]).argmax(axis=1)
+
+    print(f"\n📊 Held-out casts: {len(test_idx)}")
+    print(f"   stage 1 alone accuracy: {np.mean(stage1_test == y_test):.4f}")
+    print(f"   early exits: {early.mean():.1%} (accuracy {np.mean(predicted[early] == y_test[early]) if early.any() else float('nan'):.4f})")
+    for name, exits in zip(class_names, [early[y_test == c].mean() for c in range(len(class_names))]):
+        print(f"      {name:<24} {exits:.1%}")
+    print(f"   cascade accuracy: {np.mean(predicted == y_test):.4f}, CNN only: {cnn_accuracy:.4f}")
+    cascade_stats, cnn_stats = latency_stats(cascade_ms), latency_stats(cnn_ms)
+    print(f"   mean latency: cascade {cascade_stats['mean']:.3f} ms "
+          f"(p95 {cascade_stats['p95']:.3f}), CNN only {cnn_stats['mean']:.3f} ms (p95 {cnn_stats['p95']:.3f})")
+    if early.any():
+        print(f"   early-exit casts: {cascade_ms[early].mean():.3f} ms, "
+              f"CNN casts: {cascade_ms[~early].mean() if (~early).any() else float('nan'):.3f} ms")
+
+    # Where a cast's time goes
+    packed = [pack_points([points]) for points in points_list]
+    stage1_onnx, _ = load_onnx(os.path.join(args.out, 'stage1.onnx'))  # What load_cascade runs
+    images = [packed_points_to_images(*p)[..., None] for p in packed]
+    parts = {
+        'stage-1 features': time_casts(lambda i: cast_features(points_list[i]), range(len(points_list)))[0],
+        'stage-1 model': time_casts(lambda i: stage1_onnx(single[i:i + 1]), range(len(points_list)))[0],
+        'rasterize': time_casts(lambda i: packed_points_to_images(*packed[i]), range(len(points_list)))[0],
+        'CNN': time_casts(lambda i: cnn(images[i]), range(len(points_list)))[0],
+    }
+    print("   per-cast parts: " + ", ".join(f"{name} {ms.mean():.3f} ms" for name, ms in parts.items()))
+    print(f"   cascade mean is {cascade_stats['mean'] / cnn_stats['mean']:.0%} of CNN only")
+
+if __name__ == "__main__":
+    main()
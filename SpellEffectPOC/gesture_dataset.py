@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Memory-mapped, append-only VR gesture dataset
+
+A dataset is a directory holding a JSON header and four flat binary files:
+
+    header.json     format version, image size, label table, row/point counts, chunk list
+    images.u8       (N, 28, 28) uint8 rasters (0 or 255)
+    labels.i32      (N,) int32 indices into the header's label table
+    offsets.i64     (N+1,) int64 offsets into points.f32 (gesture i is points[offsets[i]:offsets[i+1]])
+    points.f32      (M, 2) float32 raw points, all gestures back to back
+
+Appending writes a new chunk to the end of each binary file and then
+replaces the header, so existing data is never rewritten. The header is
+the commit point: readers only trust the row and point counts it records,
+and bytes left behind by an interrupted append are truncated by the next one.
+"""
+
+import json
+import os
+import numpy as np
+
+DATASET_DIR = 'vr_gesture_dataset'
+FORMAT_NAME = 'spellstorm-gestures'
+FORMAT_VERSION = 1
+IMG_SIZE = 28
+
+HEADER_FILE = 'header.json'
+IMAGES_FILE = 'images.u8'
+LABELS_FILE = 'labels.i32'
+OFFSETS_FILE = 'offsets.i64'
+POINTS_FILE = 'points.f32'
+
+def _empty_header(image_size=IMG_SIZE):
+    return {
+        'format': FORMAT_NAME,
+        'version': FORMAT_VERSION,
+        'image_size': image_size,
+        'count': 0,
+        'num_points': 0,
+        'labels': [],
+        'chunks': [],
+    }
+
+def read_header(path):
+    """Read and validate a dataset header"""
+    with open(os.path.join(path, HEADER_FILE)) as f:
+        header = json.load(f)
+    if header.get('format') != FORMAT_NAME or header.get('version') != FORMAT_VERSION:
+        raise ValueError(f"{path} is not a version {FORMAT_VERSION} {FORMAT_NAME} dataset")
+    return header
+
+def _write_header(path, header):
+    tmp_path = os.path.join(path, HEADER_FILE + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(header, f, indent=2)
+    os.replace(tmp_path, os.path.join(path, HEADER_FILE))
+
+def _append_raw(path, filename, array, committed_bytes):
+    """Append array bytes after the committed part of a file, dropping any uncommitted tail"""
+    with open(os.path.join(path, filename), 'r+b') as f:
+        f.truncate(committed_bytes)
+        f.seek(committed_bytes)
+        f.write(np.ascontiguousarray(array).tobytes())
+
+def create_dataset(path=DATASET_DIR, image_size=IMG_SIZE, overwrite=False):
+    """Create an empty dataset directory"""
+    if os.path.exists(os.path.join(path, HEADER_FILE)) and not overwrite:
+        raise FileExistsError(f"Dataset already exists: {path}")
+    os.makedirs(path, exist_ok=True)
+    for filename in (IMAGES_FILE, LABELS_FILE, OFFSETS_FILE, POINTS_FILE):
+        open(os.path.join(path, filename), 'wb').close()
+    _append_raw(path, OFFSETS_FILE, np.zeros(1, dtype=np.int64), 0)
+    _write_header(path, _empty_header(image_size))
+
+def append_gestures(path, images, label_names, values, offsets, source=None):
+    """Append a chunk of gestures without rewriting existing data
+
+    images is (n, size, size) uint8, label_names holds one class name per
+    gesture, and (values, offsets) is the packed point batch. New class
+    names are added to the persisted label table.
+    """
+    header = read_header(path)
+    size = header['image_size']
+    images = np.asarray(images, dtype=np.uint8).reshape(-1, size, size)
+    values = np.asarray(values, dtype=np.float32).reshape(-1, 2)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    n = len(images)
+    if len(label_names) != n or len(offsets) != n + 1:
+        raise ValueError("images, label_names and offsets describe a different number of gestures")
+
+    label_ids = {name: i for i, name in enumerate(header['labels'])}
+    for name in label_names:
+        if name not in label_ids:
+            label_ids[name] = len(label_ids)
+            header['labels'].append(name)
+    labels = np.array([label_ids[name] for name in label_names], dtype=np.int32)
+
+    count = header['count']
+    num_points = header['num_points']
+    _append_raw(path, IMAGES_FILE, images, count * size * size)
+    _append_raw(path, LABELS_FILE, labels, count * 4)
+    # The leading 0 of the chunk's offsets is already stored as the previous end
+    _append_raw(path, OFFSETS_FILE, offsets[1:] - offsets[0] + num_points, (count + 1) * 8)
+    _append_raw(path, POINTS_FILE, values[offsets[0]:offsets[-1]], num_points * 8)
+
+    header['count'] = count + n
+    header['num_points'] = num_points + int(offsets[-1] - offsets[0])
+    header['chunks'].append({'start': count, 'count': n, 'source': source})
+    _write_header(path, header)
+    return labels
+
+def _memmap(path, filename, dtype, shape):
+    """Zero-copy read-only view of a raw file (np.memmap can't map zero bytes)"""
+    if np.prod(shape) == 0:
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(os.path.join(path, filename), dtype=dtype, mode='r', shape=shape)
+
+class GestureDataset:
+    """Read-only memory-mapped view of a gesture dataset"""
+
+    def __init__(self, path=DATASET_DIR):
+        self.path = path
+        self.header = read_header(path)
+        size = self.header['image_size']
+        count = self.header['count']
+
+        self.label_names = list(self.header['labels'])
+        self.images = _memmap(path, IMAGES_FILE, np.uint8, (count, size, size))
+        self.labels = _memmap(path, LABELS_FILE, np.int32, (count,))
+        self.offsets = _memmap(path, OFFSETS_FILE, np.int64, (count + 1,))
+        self.values = _memmap(path, POINTS_FILE, np.float32, (self.header['num_points'], 2))
+
+    def __len__(self):
+        return self.header['count']
+
+    def points(self, i):
+        """Raw points of gesture i"""
+        return self.values[self.offsets[i]:self.offsets[i + 1]]
+
+    def load_images(self, indices=None):
+        """Gather rasters as float32 (n, size, size, 1) in [0, 1]"""
+        images = self.images if indices is None else self.images[np.asarray(indices)]
+        return (images.astype(np.float32) / 255.0)[..., None]
+
+    def iter_batches(self, batch_size=32, indices=None, shuffle=True, seed=None):
+        """Stream (images, labels) batches without loading the whole dataset
+
+        Only the rows of the current batch are read from disk.
+        """
+        indices = np.arange(len(self)) if indices is None else np.asarray(indices)
+        if shuffle:
+            indices = np.random.default_rng(seed).permutation(indices)
+
+        for start in range(0, len(indices), batch_size):
+            # Sorted rows turn random access into forward reads within the batch
+            batch = np.sort(indices[start:start + batch_size])
+            images = self.images[batch].astype(np.float32) / 255.0
+            yield images[..., None], self.labels[batch].astype(np.int64)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Replay load generator for gesture_server.py
+
+Replays the TrainingRecordingDataXMLs corpus against the server as an
+open-loop load: request i is sent at start + i / qps no matter how many
+answers are still outstanding, spread over several connections like
+concurrent sessions. Reports achieved throughput, tail latency, mean
+server batch size and accuracy against the recording labels:
+
+    python gesture_load_test.py [--qps 200 1000 5000] [--duration 10] [--connections 16]
+    python gesture_load_test.py --spawn vr_gesture_model.onnx   # start a server for the run
+"""
+
+import argparse
+import asyncio
+import json
+import signal
+import subprocess
+import sys
+import time
+import numpy as np
+from benchmark_inference import latency_stats
+from gesture_preprocessing import load_training_points
+from gesture_server import HOST, PORT
+
+# --- CONFIGURATION ---
+QPS_LEVELS = [200, 1000, 5000]
+DURATION_S = 10.0
+CONNECTIONS = 16
+RESPONSE_TIMEOUT_S = 30.0
+
+def encode_points(values, offsets):
+    """JSON point list per recording, as {"X", "Y"} objects like the XML <Point> data"""
+    return [json.dumps([{'X': float(x), 'Y': float(y)} for x, y in values[offsets[i]:offsets[i + 1]]])
+            for i in range(len(offsets) - 1)]
+
+async def _read_responses(reader, pending):
+    while line := await reader.readline():
+        response = json.loads(line)
+        future = pending.pop(response.get('id'), None)
+        if future is not None and not future.done():
+            future.set_result((time.perf_counter(), response))
+
+async def replay(encoded, labels, qps, duration, host=HOST, port=PORT, connections=CONNECTIONS):
+    """Send len = qps * duration requests on schedule and collect the answers"""
+    streams = [await asyncio.open_connection(host, port, limit=2 ** 20) for _ in range(connections)]
+    pending = [{} for _ in streams]
+    readers = [asyncio.create_task(_read_responses(r, p)) for (r, _), p in zip(streams, pending)]
+
+    loop = asyncio.get_running_loop()
+    total = max(1, int(qps * duration))
+    sent, futures = [], []
+    start = time.perf_counter()
+    for i in range(total):
+        delay = start + i / qps - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        conn = i % connections
+        future = loop.create_future()
+        # Each send gets a unique id; the recording is i modulo the corpus size
+        pending[conn][i] = future
+        streams[conn][1].write(f'{{"id": {i}, "points": {encoded[i % len(encoded)]}}}\n'.encode())
+        sent.append(time.perf_counter())
+        futures.append(future)
+        if i % 64 == 63:
+            await asyncio.gather(*(w.drain() for _, w in streams))
+    send_seconds = time.perf_counter() - start
+
+    done, _ = await asyncio.wait(futures, timeout=RESPONSE_TIMEOUT_S)
+    for task in readers:
+        task.cancel()
+    for _, writer in streams:
+        writer.close()
+
+    latencies, correct, batch_sizes, errors = [], [], [], 0
+    last = start
+    for i, future in enumerate(futures):
+        if future not in done:
+            continue
+        received, response = future.result()
+        if 'error' in response:
+            errors += 1
+            continue
+        last = max(last, received)
+        latencies.append((received - sent[i]) * 1000)
+        correct.append(response['class_index'] == labels[i % len(labels)])
+        batch_sizes.append(response['batch_size'])
+
+    return {
+        'target_qps': qps,
+        'sent': total,
+        'completed': len(latencies),
+        'errors': errors,
+        'timeouts': total - len(done),
+        'send_seconds': send_seconds,
+        'throughput': len(latencies) / max(last - start, 1e-9),
+        'latency_ms': latency_stats(latencies) if latencies else None,
+        'mean_batch': float(np.mean(batch_sizes)) if batch_sizes else 0.0,
+        'accuracy': float(np.mean(correct)) if correct else float('nan'),
+    }
+
+async def wait_for_server(host, port, timeout=30.0):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+async def run(args, encoded, labels):
+    await wait_for_server(args.host, args.port)
+    print(f"\n{'target qps':>10} {'sent':>7} {'done':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'max ms':>8} {'batch':>6} {'accuracy':>9}")
+    results = []
+    for qps in args.qps:
+        r = await replay(encoded, labels, qps, args.duration, args.host, args.port, args.connections)
+        results.append(r)
+        latency = r['latency_ms'] or dict.fromkeys(('p50', 'p95', 'p99', 'max'), float('nan'))
+        print(f"{qps:>10} {r['sent']:>7} {r['completed']:>7} {r['throughput']:>8.0f} {latency['p50']:>8.2f} "
+              f"{latency['p95']:>8.2f} {latency['p99']:>8.2f} {latency['max']:>8.2f} {r['mean_batch']:>6.1f} "
+              f"{r['accuracy']:>9.4f}")
+        if r['errors'] or r['timeouts']:
+            print(f"{'':>10} ⚠️  {r['errors']} errors, {r['timeouts']} timeouts")
+        if r['send_seconds'] > args.duration * 1.1:
+            print(f"{'':>10} ⚠️  load generator fell behind ({r['send_seconds']:.1f}s to send)")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay the recording corpus against gesture_server.py")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--qps', type=float, nargs='+', default=QPS_LEVELS)
+    parser.add_argument('--duration', type=float, default=DURATION_S, help="Seconds per QPS level")
+    parser.add_argument('--connections', type=int, default=CONNECTIONS)
+    parser.add_argument('--spawn', metavar='MODEL', default=None,
+                        help="Start gesture_server.py with this model for the run")
+    parser.add_argument('--server-args', nargs=argparse.REMAINDER, default=[],
+                        help="Extra gesture_server.py arguments for --spawn (e.g. --max-wait-ms 2)")
+    args = parser.parse_args()
+
+    values, offsets, labels, _ = load_training_points()
+    encoded = encode_points(values, offsets)
+    print(f"📼 Replaying {len(encoded)} recordings over {args.connections} connections")
+
+    server = None
+    if args.spawn:
+        server = subprocess.Popen([sys.executable, 'gesture_server.py', args.spawn,
+                                   '--host', args.host, '--port', str(args.port)] + args.server_args)
+    try:
+        asyncio.run(run(args, encoded, labels))
+    finally:
+        if server is not None:
+            server.send_signal(signal.SIGINT)  # Lets the server print its batching summary
+            server.wait()
+
+if __name__ == "__main__":
+    main()
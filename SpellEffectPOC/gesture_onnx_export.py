@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Shared ONNX export for the gesture models
+
+Every training script and convert_to_onnx.py export through here, so all
+ONNX files look the same to Unity Sentis and to onnxruntime:
+
+    input        "input"          float32 (batch, 28, 28, 1), or (batch, 28, 2) for point-sequence models
+    output       "probabilities"  float32 (batch, num_classes)
+
+The batch dimension is symbolic, so the same file scores one gesture on
+device or a whole batch offline. The graph is then run through
+onnxruntime's offline optimizer (constant folding, redundant node
+elimination, Conv+BatchNormalization/Add/Mul fusion) and the optimized
+graph is what gets saved.
+
+Run directly to upgrade an existing export in place (no TensorFlow needed):
+    python gesture_onnx_export.py [vr_gesture_model.onnx] [--out path] [--level basic|extended]
+    python gesture_onnx_export.py --check-reshape   # batch rewrite on Flatten/pooling graphs
+"""
+
+import argparse
+import os
+import sys
+import numpy as np
+
+INPUT_NAME = 'input'
+OUTPUT_NAME = 'probabilities'
+BATCH_DIM = 'batch'
+OPSET = 13
+IMG_SIZE = 28
+
+# 'basic' only rewrites into standard ONNX ops, so Unity Sentis can still load
+# the result. 'extended' adds onnxruntime contrib ops (e.g. FusedConv for
+# Conv+ReLU) and is only meant for onnxruntime-based scoring.
+OPTIMIZATION_LEVELS = ('none', 'basic', 'extended')
+
+def rename_value(graph, old_name, new_name):
+    """Rename a tensor everywhere it is produced or consumed"""
+    if old_name == new_name:
+        return
+    for node in graph.node:
+        node.input[:] = [new_name if name == old_name else name for name in node.input]
+        node.output[:] = [new_name if name == old_name else name for name in node.output]
+    for value in list(graph.input) + list(graph.output) + list(graph.value_info):
+        if value.name == old_name:
+            value.name = new_name
+
+def make_batch_dynamic(onnx_model):
+    """Give the graph a symbolic batch dimension and the standard I/O names
+
+    Reshape targets that tf2onnx baked in for a fixed batch of 1 (e.g.
+    [1, 576], or [1, -1] for a Flatten) get a free batch axis: -1 when no
+    other axis is -1, otherwise 0 (copy the batch from the Reshape input).
+    """
+    from onnx import numpy_helper
+
+    graph = onnx_model.graph
+    rename_value(graph, graph.input[0].name, INPUT_NAME)
+    rename_value(graph, graph.output[0].name, OUTPUT_NAME)
+    for value in (graph.input[0], graph.output[0]):
+        batch = value.type.tensor_type.shape.dim[0]
+        batch.Clear()
+        batch.dim_param = BATCH_DIM
+
+    initializers = {init.name: init for init in graph.initializer}
+    consumers = {}
+    for node in graph.node:
+        for name in node.input:
+            consumers.setdefault(name, []).append(node)
+
+    for node in graph.node:
+        if node.op_type != 'Reshape' or node.input[1] not in initializers:
+            continue
+        # Only touch shape constants that nothing but Reshape nodes read
+        if any(consumer.op_type != 'Reshape' for consumer in consumers[node.input[1]]):
+            continue
+        init = initializers[node.input[1]]
+        shape = numpy_helper.to_array(init)
+        if len(shape) < 2 or shape[0] != 1:
+            continue
+        shape = shape.copy()
+        if -1 not in shape[1:]:
+            shape[0] = -1
+        elif not any(attr.name == 'allowzero' and attr.i for attr in node.attribute):
+            shape[0] = 0
+        else:
+            # With allowzero a 0 is a literal size, so the batch cannot be freed here
+            print(f"⚠️  Reshape {node.name} keeps a fixed batch of 1 (target {shape.tolist()}, allowzero=1)")
+            continue
+        init.CopyFrom(numpy_helper.from_array(shape, init.name))
+
+    del graph.value_info[:]  # Shapes inferred for batch 1 are stale now
+    return onnx_model
+
+def optimize_onnx(input_path, output_path=None, level='basic'):
+    """Run onnxruntime's offline graph optimizations and save the optimized graph"""
+    import onnxruntime as ort
+
+    output_path = output_path or input_path
+    if level == 'none':
+        return output_path
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = {
+        'basic': ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+        'extended': ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    }[level]
+    tmp_path = output_path + '.tmp'
+    options.optimized_model_filepath = tmp_path
+    ort.InferenceSession(input_path, options, providers=['CPUExecutionProvider'])
+    os.replace(tmp_path, output_path)
+    return output_path
+
+def save_onnx(onnx_model, output_path, level='basic'):
+    """Standardize I/O, save, and optimize an ONNX model"""
+    import onnx
+
+    onnx.save(make_batch_dynamic(onnx_model), output_path)
+    try:
+        optimize_onnx(output_path, level=level)
+    except ImportError:
+        print("onnxruntime not installed, saved unoptimized graph. Install with: pip install onnxruntime")
+    return output_path
+
+def export_keras_model(model, output_path='vr_gesture_model.onnx', level='basic',
+                       input_shape=(IMG_SIZE, IMG_SIZE, 1)):
+    """Convert a Keras gesture model to a dynamic-batch, optimized ONNX file
+
+    input_shape is the per-sample shape, e.g. (28, 2) for point-sequence models.
+    """
+    import tensorflow as tf
+    import tf2onnx
+
+    input_signature = [tf.TensorSpec([None, *input_shape], tf.float32, name=INPUT_NAME)]
+    onnx_model, _ = tf2onnx.convert.from_keras(model, input_signature, opset=OPSET)
+    return save_onnx(onnx_model, output_path, level)
+
+def model_stats(path):
+    """Parameter count and per-sample FLOPs (2 per multiply-add) of an ONNX model
+
+    FLOPs cover Conv, Gemm/MatMul and GRU/LSTM nodes, which dominate these
+    models; elementwise ops and pooling are ignored.
+    """
+    import onnx
+    from onnx import numpy_helper
+
+    model = onnx.shape_inference.infer_shapes(onnx.load(path))
+    graph = model.graph
+    weights = {init.name: numpy_helper.to_array(init) for init in graph.initializer}
+    shapes = {}
+    for value in list(graph.input) + list(graph.output) + list(graph.value_info):
+        dims = value.type.tensor_type.shape.dim
+        shapes[value.name] = [d.dim_value if d.HasField('dim_value') else 1 for d in dims]
+
+    params = sum(int(np.prod(w.shape)) for w in weights.values() if w.dtype.kind == 'f')
+    flops = 0
+    for node in graph.node:
+        if node.op_type == 'Conv' and node.input[1] in weights and node.output[0] in shapes:
+            kernel = weights[node.input[1]].shape  # (out, in / groups, *spatial)
+            flops += 2 * int(np.prod(shapes[node.output[0]][1:])) * int(np.prod(kernel[1:]))
+        elif node.op_type in ('Gemm', 'MatMul') and node.input[1] in weights:
+            flops += 2 * int(np.prod(weights[node.input[1]].shape))
+        elif node.op_type in ('GRU', 'LSTM') and node.input[0] in shapes:
+            gates = 3 if node.op_type == 'GRU' else 4
+            hidden = weights[node.input[2]].shape[-1] if node.input[2] in weights else 0
+            steps, _, features = shapes[node.input[0]]
+            flops += 2 * gates * hidden * (features + hidden) * steps
+    return {'params': params, 'flops': flops}
+
+def check_batch_consistency(path, batch_size=32, seed=0):
+    """Largest difference between one batched run and per-sample runs of the model"""
+    import onnxruntime as ort
+
+    session = ort.InferenceSession(path, providers=['CPUExecutionProvider'])
+    sample_shape = [d if isinstance(d, int) else 1 for d in session.get_inputs()[0].shape[1:]]
+    x = np.random.default_rng(seed).random((batch_size, *sample_shape), dtype=np.float32)
+    batched = session.run([OUTPUT_NAME], {INPUT_NAME: x})[0]
+    single = np.concatenate([session.run([OUTPUT_NAME], {INPUT_NAME: x[i:i + 1]})[0]
+                             for i in range(batch_size)])
+    return float(np.abs(batched - single).max())
+
+# --- RESHAPE CHECK ---
+def _batch1_graph(head, tail_shape, name):
+    """Fixed-batch-1 graph like tf2onnx exports: Conv, ReLU, then head ('flatten', 'pool' or 'sequence')
+
+    tail_shape is the Reshape target baked in for batch 1.
+    """
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+
+    rng = np.random.default_rng(0)
+    channels, classes = 4, 4
+    conv_size = (IMG_SIZE - 2) ** 2
+    features = {'flatten': conv_size * channels, 'pool': channels, 'sequence': channels}[head]
+    initializers = [
+        numpy_helper.from_array(rng.normal(size=(channels, 1, 3, 3)).astype(np.float32), 'conv_w'),
+        numpy_helper.from_array(np.array(tail_shape, dtype=np.int64), 'tail_shape'),
+        numpy_helper.from_array((rng.normal(size=(features, classes)) * 0.1).astype(np.float32), 'dense_w'),
+    ]
+    nodes = [
+        helper.make_node('Transpose', ['x'], ['nchw'], perm=[0, 3, 1, 2]),
+        helper.make_node('Conv', ['nchw', 'conv_w'], ['conv']),
+        helper.make_node('Relu', ['conv'], ['relu']),
+        helper.make_node('Transpose', ['relu'], ['nhwc'], perm=[0, 2, 3, 1]),
+    ]
+    if head == 'flatten':
+        nodes.append(helper.make_node('Reshape', ['nhwc', 'tail_shape'], ['flat'], name='flatten'))
+    elif head == 'pool':
+        nodes.append(helper.make_node('ReduceMean', ['nhwc'], ['pooled'], axes=[1, 2], keepdims=1))
+        nodes.append(helper.make_node('Reshape', ['pooled', 'tail_shape'], ['flat'], name='pool_reshape'))
+    else:
+        # (1, H * W, C) point sequence, then mean over the sequence
+        nodes.append(helper.make_node('Reshape', ['nhwc', 'tail_shape'], ['seq'], name='sequence_reshape'))
+        nodes.append(helper.make_node('ReduceMean', ['seq'], ['flat'], axes=[1], keepdims=0))
+    nodes += [
+        helper.make_node('MatMul', ['flat', 'dense_w'], ['logits']),
+        helper.make_node('Softmax', ['logits'], ['probs'], axis=-1),
+    ]
+    graph = helper.make_graph(
+        nodes, name,
+        [helper.make_tensor_value_info('x', TensorProto.FLOAT, [1, IMG_SIZE, IMG_SIZE, 1])],
+        [helper.make_tensor_value_info('probs', TensorProto.FLOAT, [1, classes])],
+        initializers,
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', OPSET)])
+    model.ir_version = 7  # Opset 13's IR version, like the tf2onnx exports
+    return model
+
+def check_reshape(tolerance=1e-5):
+    """Batch 32 vs per-sample runs after make_batch_dynamic on Flatten and pooling graphs"""
+    import tempfile
+    import onnx
+    from onnx import numpy_helper
+
+    cases = [
+        ('flatten [1, -1]', 'flatten', [1, -1]),
+        ('flatten [1, 2704]', 'flatten', [1, (IMG_SIZE - 2) ** 2 * 4]),
+        ('pooling [1, 4]', 'pool', [1, 4]),
+        ('sequence [1, -1, 4]', 'sequence', [1, -1, 4]),
+    ]
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, head, tail_shape in cases:
+            path = os.path.join(tmp, f'{head}.onnx')
+            model = make_batch_dynamic(_batch1_graph(head, tail_shape, head))
+            onnx.save(model, path)
+            target = next(numpy_helper.to_array(init).tolist() for init in model.graph.initializer
+                          if init.name == 'tail_shape')
+            try:
+                difference = check_batch_consistency(path)
+                ok = difference < tolerance
+                detail = f"batch-32 vs batch-1 max difference {difference:.2e}"
+            except Exception as e:
+                ok, detail = False, f"{type(e).__name__}: {str(e).splitlines()[0]}"
+            failures += not ok
+            print(f"{'✅' if ok else '❌'} {label:>20} -> {str(target):<12} {detail}")
+    return 1 if failures else 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Upgrade an ONNX gesture model to dynamic batch and optimize it")
+    parser.add_argument('model', nargs='?', default='vr_gesture_model.onnx')
+    parser.add_argument('--out', default=None, help="Output path (default: overwrite the input)")
+    parser.add_argument('--level', choices=OPTIMIZATION_LEVELS, default='basic')
+    parser.add_argument('--check-reshape', action='store_true',
+                        help="Check the batch rewrite on small Flatten and pooling graphs (no TensorFlow)")
+    args = parser.parse_args()
+
+    if args.check_reshape:
+        return check_reshape()
+
+    import onnx
+
+    out = args.out or args.model
+    size_before = os.path.getsize(args.model)
+    save_onnx(onnx.load(args.model), out, args.level)
+
+    graph = onnx.load(out).graph
+    print(f"✅ Saved {out} ({size_before / 1024:.0f} KB -> {os.path.getsize(out) / 1024:.0f} KB)")
+    print(f"   {len(graph.node)} nodes: {', '.join(node.op_type for node in graph.node)}")
+    stats = model_stats(out)
+    print(f"   {stats['params']:,} parameters, {stats['flops']:,} FLOPs per sample")
+    print(f"   batch-32 vs batch-1 max difference: {check_batch_consistency(out):.2e}")
+
+if __name__ == "__main__":
+    sys.exit(main())
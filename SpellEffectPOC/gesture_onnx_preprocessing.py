@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+In-graph gesture preprocessing for the exported ONNX models
+
+Builds an ONNX subgraph that does what gesture_preprocessing does for the
+CNN input, so the device can send raw points and preprocessing runs in the
+inference engine:
+
+    points  "points"  float32 (batch, P, 2)  raw points, padded by repeating the last one
+    ->  bounding-box normalization (center, longest side = DRAW_SCALE pixels)
+    ->  round half to even, clamp to the image
+    ->  every segment expanded into its pixel steps with the draw_segments
+        (cv2.line) rule, turned into x/y one-hots and summed into the 28x28
+        grid with one MatMul
+    ->  "input"   float32 (batch, 28, 28, 1)
+
+Repeating the last point only adds zero-length segments onto a pixel that
+is already set, so padding never changes the raster. Only standard opset 13
+float ops are used (Sentis has no double tensors), and the subgraph is
+merged in front of an exported CNN. Run directly to build the point-input
+model and check it against the Python rasterizer on the whole corpus:
+
+    python gesture_onnx_preprocessing.py [vr_gesture_model.onnx] [--points 64] [--out vr_gesture_model_points.onnx]
+"""
+
+import argparse
+import sys
+import numpy as np
+from gesture_onnx_export import BATCH_DIM, INPUT_NAME, OPSET, OUTPUT_NAME, optimize_onnx
+from gesture_preprocessing import DRAW_SCALE, IMG_SIZE
+
+# --- CONFIGURATION ---
+POINTS_NAME = 'points'
+NUM_POINTS = 64  # Longest recording in the corpus has 49 points
+POINTS_MODEL = 'vr_gesture_model_points.onnx'
+
+def pad_points(values, offsets, num_points=NUM_POINTS):
+    """(N, num_points, 2) float32 batch, each gesture padded by repeating its last point"""
+    lengths = np.diff(offsets)
+    if len(lengths) and lengths.max() > num_points:
+        raise ValueError(f"gesture with {lengths.max()} points does not fit in {num_points}")
+    # Index of the source point for every slot: its own point, or the gesture's last one
+    slot = np.minimum(np.arange(num_points)[None, :], np.maximum(lengths, 1)[:, None] - 1)
+    padded = np.asarray(values, dtype=np.float32)[offsets[:-1][:, None] + slot]
+    padded[lengths == 0] = 0
+    return padded
+
+def build_preprocessing_model(num_points=NUM_POINTS, size=IMG_SIZE, scale=DRAW_SCALE):
+    """ONNX model mapping (batch, num_points, 2) raw points to (batch, size, size, 1) rasters"""
+    from onnx import TensorProto, helper, numpy_helper
+
+    nodes = []
+    constants = {
+        'half': np.array(0.5, dtype=np.float32),
+        'one': np.array(1.0, dtype=np.float32),
+        'two': np.array(2.0, dtype=np.float32),
+        'zero': np.array(0.0, dtype=np.float32),
+        'scale': np.array(scale, dtype=np.float32),
+        'center_px': np.array(size / 2, dtype=np.float32),
+        'max_px': np.array(size - 1, dtype=np.float32),
+        # Pixel step k along a segment: at most size - 1 steps after clamping
+        'steps_k': np.arange(size, dtype=np.float32).reshape(1, 1, size),
+        'grid': np.arange(size, dtype=np.float32).reshape(1, 1, 1, size),
+        'x_index': np.array([0], dtype=np.int64),
+        'y_index': np.array([1], dtype=np.int64),
+        'start_0': np.array([0], dtype=np.int64),
+        'start_1': np.array([1], dtype=np.int64),
+        'stop_last': np.array([num_points - 1], dtype=np.int64),
+        'stop_end': np.array([num_points], dtype=np.int64),
+        'axis_1': np.array([1], dtype=np.int64),
+        'axis_3': np.array([3], dtype=np.int64),
+        'flat_shape': np.array([0, (num_points - 1) * size, size], dtype=np.int64),
+        'image_shape': np.array([-1, size, size, 1], dtype=np.int64),
+    }
+
+    def node(op, inputs, output, **attrs):
+        nodes.append(helper.make_node(op, inputs, [output], **attrs))
+        return output
+
+    # Bounding box per gesture -> pixel coordinates, like normalize_points + segment_endpoints
+    low = node('ReduceMin', [POINTS_NAME], 'low', axes=[1], keepdims=1)            # (B, 1, 2)
+    high = node('ReduceMax', [POINTS_NAME], 'high', axes=[1], keepdims=1)
+    center = node('Mul', [node('Add', [high, low], 'box_sum'), 'half'], 'center')
+    max_dim = node('ReduceMax', [node('Sub', [high, low], 'extent')], 'max_dim', axes=[2], keepdims=1)
+    has_size = node('Greater', [max_dim, 'zero'], 'has_size')
+    safe_dim = node('Where', [has_size, max_dim, 'one'], 'safe_dim')
+    factor = node('Where', [has_size, node('Div', ['scale', safe_dim], 'fit'), 'one'], 'factor')
+    pixels = node('Add', [node('Mul', [node('Sub', [POINTS_NAME, center], 'centered'), factor], 'scaled'),
+                          'center_px'], 'pixels_f')
+    pixels = node('Clip', [node('Round', [pixels], 'pixels_r'), 'zero', 'max_px'], 'pixels')  # (B, P, 2)
+
+    # Segment endpoints (B, S, 1) with the left endpoint first, as in draw_segments
+    start = node('Slice', [pixels, 'start_0', 'stop_last', 'axis_1'], 'seg_start')
+    end = node('Slice', [pixels, 'start_1', 'stop_end', 'axis_1'], 'seg_end')
+    coords = {}
+    for name, source in (('x0', start), ('x1', end)):
+        coords[name] = node('Gather', [source, 'x_index'], name, axis=2)
+    for name, source in (('y0', start), ('y1', end)):
+        coords[name] = node('Gather', [source, 'y_index'], name, axis=2)
+    swap = node('Less', [coords['x1'], coords['x0']], 'swap')
+    x0 = node('Where', [swap, coords['x1'], coords['x0']], 'left_x')
+    x1 = node('Where', [swap, coords['x0'], coords['x1']], 'right_x')
+    y0 = node('Where', [swap, coords['y1'], coords['y0']], 'left_y')
+    y1 = node('Where', [swap, coords['y0'], coords['y1']], 'right_y')
+
+    dx = node('Sub', [x1, x0], 'dx')
+    dy = node('Sub', [y1, y0], 'dy')
+    abs_dx = node('Abs', [dx], 'abs_dx')
+    abs_dy = node('Abs', [dy], 'abs_dy')
+    steps = node('Max', [abs_dx, abs_dy], 'steps')
+    n = node('Max', [steps, 'one'], 'n')
+    two_n = node('Mul', [n, 'two'], 'two_n')
+    n_minus_1 = node('Sub', [n, 'one'], 'n_minus_1')
+
+    # Offset along an axis with extent d: floor((2 k |d| + n - 1) / (2 n)). Small
+    # integers in float32, and a quotient never rounds up to the next integer
+    def axis_pixels(origin, delta, abs_delta, prefix):
+        numerator = node('Add', [node('Mul', [node('Mul', ['steps_k', abs_delta], prefix + '_k_d'), 'two'],
+                                      prefix + '_2k_d'), n_minus_1], prefix + '_num')
+        offset = node('Floor', [node('Div', [numerator, two_n], prefix + '_q')], prefix + '_offset')
+        return node('Add', [origin, node('Mul', [node('Sign', [delta], prefix + '_sign'), offset],
+                                         prefix + '_signed')], prefix + '_pixels')  # (B, S, K)
+
+    xs = axis_pixels(x0, dx, abs_dx, 'x')
+    ys = axis_pixels(y0, dy, abs_dy, 'y')
+    valid = node('Cast', [node('LessOrEqual', ['steps_k', steps], 'in_segment')], 'valid', to=TensorProto.FLOAT)
+
+    # One-hot rows per pixel step; Y^T X counts how often each (y, x) is drawn
+    def one_hot(values, prefix, mask=None):
+        expanded = node('Unsqueeze', [values, 'axis_3'], prefix + '_expanded')  # (B, S, K, 1)
+        hits = node('Cast', [node('Equal', [expanded, 'grid'], prefix + '_eq')], prefix + '_hot', to=TensorProto.FLOAT)
+        if mask is not None:
+            hits = node('Mul', [hits, node('Unsqueeze', [mask, 'axis_3'], prefix + '_mask')], prefix + '_masked')
+        return node('Reshape', [hits, 'flat_shape'], prefix + '_flat')  # (B, S*K, size)
+
+    x_hot = one_hot(xs, 'x')
+    y_hot = one_hot(ys, 'y', mask=valid)
+    counts = node('MatMul', [node('Transpose', [y_hot], 'y_hot_t', perm=[0, 2, 1]), x_hot], 'counts')
+    image = node('Min', [counts, 'one'], 'image')
+    node('Reshape', [image, 'image_shape'], INPUT_NAME)
+
+    initializers = [numpy_helper.from_array(value, name) for name, value in constants.items()]
+
+    graph = helper.make_graph(
+        nodes, 'gesture_preprocessing',
+        [helper.make_tensor_value_info(POINTS_NAME, TensorProto.FLOAT, [BATCH_DIM, num_points, 2])],
+        [helper.make_tensor_value_info(INPUT_NAME, TensorProto.FLOAT, [BATCH_DIM, size, size, 1])],
+        initializers,
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', OPSET)])
+    model.ir_version = 7  # Opset 13's IR version, like the tf2onnx exports
+    return model
+
+def prepend_preprocessing(onnx_model, num_points=NUM_POINTS):
+    """Merge the preprocessing subgraph in front of an exported image model"""
+    import onnx
+    from onnx import compose
+
+    preprocessing = build_preprocessing_model(num_points)
+    preprocessing.ir_version = onnx_model.ir_version
+    # Match the CNN's opset imports (e.g. ai.onnx.ml) so the models can be merged
+    del preprocessing.opset_import[:]
+    preprocessing.opset_import.extend(onnx_model.opset_import)
+
+    cnn_input = onnx_model.graph.input[0].name
+    cnn_output = 'cnn/' + onnx_model.graph.output[0].name
+    merged = compose.merge_models(preprocessing, onnx_model, io_map=[(INPUT_NAME, cnn_input)], prefix2='cnn/')
+    graph = merged.graph
+    # The only output is the CNN's; give it the standard name
+    for node in graph.node:
+        node.output[:] = [OUTPUT_NAME if name == cnn_output else name for name in node.output]
+    graph.output[0].name = OUTPUT_NAME
+    # A CNN exported with a fixed batch of 1 keeps it on the point input
+    cnn_batch = onnx_model.graph.input[0].type.tensor_type.shape.dim[0]
+    if cnn_batch.HasField('dim_value'):
+        graph.input[0].type.tensor_type.shape.dim[0].dim_value = cnn_batch.dim_value
+    onnx.checker.check_model(merged)
+    return merged
+
+def check_raster(num_points=NUM_POINTS, batch_size=256):
+    """Compare the in-graph raster with packed_points_to_images on every recording
+
+    Returns (gestures checked, gestures that differ, pixels that differ).
+    """
+    import onnxruntime as ort
+    from gesture_preprocessing import load_training_points, packed_points_to_images, select_gestures
+
+    session = ort.InferenceSession(build_preprocessing_model(num_points).SerializeToString(),
+                                   providers=['CPUExecutionProvider'])
+    values, offsets, _, _ = load_training_points()
+    gestures = bad_gestures = bad_pixels = 0
+    for start in range(0, len(offsets) - 1, batch_size):
+        batch = np.arange(start, min(start + batch_size, len(offsets) - 1))
+        batch_values, batch_offsets = select_gestures(values, offsets, batch)
+        # Device side sends float32, so the reference sees the same float32 points
+        expected = packed_points_to_images(batch_values.astype(np.float32), batch_offsets)[..., None]
+        actual = session.run([INPUT_NAME], {POINTS_NAME: pad_points(batch_values, batch_offsets, num_points)})[0]
+        diff = actual != expected
+        gestures += len(batch)
+        bad_gestures += int(diff.reshape(len(batch), -1).any(axis=1).sum())
+        bad_pixels += int(diff.sum())
+    return gestures, bad_gestures, bad_pixels
+
+def check_end_to_end(points_model, image_model, num_points=NUM_POINTS):
+    """Largest probability difference between the point-input model and the CNN on Python rasters"""
+    from benchmark_inference import load_onnx
+    from gesture_preprocessing import load_training_points, packed_points_to_images
+
+    values, offsets, _, _ = load_training_points()
+    points = pad_points(values, offsets, num_points)
+    images = packed_points_to_images(values.astype(np.float32), offsets)[..., None]
+    (predict_points, batch_points), (predict_images, _) = load_onnx(points_model), load_onnx(image_model)
+    if batch_points == 1:
+        return max(float(np.abs(predict_points(p[None]) - predict_images(x[None])).max())
+                   for p, x in zip(points, images))
+    return float(np.abs(predict_points(points) - predict_images(images)).max())
+
+def main():
+    parser = argparse.ArgumentParser(description="Prepend in-graph point preprocessing to an exported gesture model")
+    parser.add_argument('model', nargs='?', default='vr_gesture_model.onnx', help="Exported image-input model")
+    parser.add_argument('--points', type=int, default=NUM_POINTS, help="Fixed number of input points")
+    parser.add_argument('--out', default=POINTS_MODEL)
+    parser.add_argument('--check-only', action='store_true', help="Only run the pixel-exact raster check")
+    args = parser.parse_args()
+
+    gestures, bad_gestures, bad_pixels = check_raster(args.points)
+    print(f"🔍 In-graph raster vs Python rasterizer: {gestures - bad_gestures}/{gestures} gestures identical, "
+          f"{bad_pixels} differing pixels")
+    if bad_pixels:
+        print("❌ In-graph preprocessing does not match the Python rasterizer")
+        sys.exit(1)
+    if args.check_only:
+        return
+
+    import onnx
+
+    onnx.save(prepend_preprocessing(onnx.load(args.model), args.points), args.out)
+    optimize_onnx(args.out, level='basic')
+    print(f"✅ Saved {args.out}: input \"{POINTS_NAME}\" (batch, {args.points}, 2) raw points -> \"{OUTPUT_NAME}\"")
+    print(f"   max probability difference vs {args.model} on Python rasters: "
+          f"{check_end_to_end(args.out, args.model, args.points):.2e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+NumPy port of the $P point-cloud recognizer in Assets/PDollar
+
+Gesture normalization (Scale -> TranslateTo(Centroid) -> Resample) follows
+PDollarGestureRecognizer.Gesture step by step in float32, and classify()
+returns the same class and score as PointCloudRecognizer.Classify.
+
+GreedyCloudMatch is batched: the squared-distance matrices between a
+candidate and every template are computed at once by broadcasting, and
+all greedy runs (every template x start index x direction) advance
+together, one matched point per step. The recordings are single-stroke,
+so every point is treated as stroke 0.
+
+Run directly to compare $P with the CNN on the held-out split:
+    python gesture_pdollar.py [--model vr_gesture_model.onnx]
+"""
+
+import argparse
+import time
+import numpy as np
+from sklearn.model_selection import train_test_split
+from gesture_preprocessing import load_training_points, select_gestures
+
+SAMPLING_RESOLUTION = 32
+EPS = 0.5  # Controls the number of greedy search trials, in [0, 1]
+NO_MATCH = "No match"
+
+def scale(points):
+    """Scale normalization with shape preservation into [0, 1] x [0, 1]"""
+    points = np.asarray(points, dtype=np.float32)
+    low = points.min(axis=0)
+    size = np.max(points.max(axis=0) - low)
+    return (points - low) / size
+
+def centroid(points):
+    """Mean point, accumulated in order like Gesture.Centroid"""
+    total = np.cumsum(points, axis=0, dtype=np.float32)[-1]
+    return total / np.float32(len(points))
+
+def translate_to(points, p):
+    """Translate the points by -p"""
+    return points - p
+
+def path_length(points):
+    """Sum of segment lengths, accumulated in order like Gesture.PathLength"""
+    d = np.diff(points, axis=0)
+    lengths = np.sqrt((d[:, 0] * d[:, 0] + d[:, 1] * d[:, 1]).astype(np.float64)).astype(np.float32)
+    return np.cumsum(lengths, dtype=np.float32)[-1] if len(lengths) else np.float32(0)
+
+def resample(points, n=SAMPLING_RESOLUTION):
+    """Resample into n equally spaced points (scalar float32 port of Gesture.Resample)"""
+    f32 = np.float32
+    points = np.asarray(points, dtype=np.float32)
+    new_points = [points[0]]
+
+    interval = path_length(points) / f32(n - 1)
+    D = f32(0)
+    for i in range(1, len(points)):
+        p0, p1 = points[i - 1], points[i]
+        dx, dy = p0[0] - p1[0], p0[1] - p1[1]
+        d = f32(np.sqrt(float(dx * dx + dy * dy)))
+        if D + d >= interval:
+            first = p0
+            while D + d >= interval:
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    t = min(max((interval - D) / d, f32(0)), f32(1))
+                if np.isnan(t):
+                    t = f32(0.5)
+                new_points.append(((f32(1) - t) * first + t * p1).astype(np.float32))
+                d = D + d - interval
+                D = f32(0)
+                first = new_points[-1]
+            D = d
+        else:
+            D += d
+
+    # Sometimes a rounding error short of the last point
+    if len(new_points) == n - 1:
+        new_points.append(points[-1])
+    # The C# version would leave null points here; repeat the last one instead
+    while len(new_points) < n:
+        new_points.append(new_points[-1])
+    return np.array(new_points[:n], dtype=np.float32)
+
+def normalize(points, n=SAMPLING_RESOLUTION):
+    """Same preprocessing as the PDollar Gesture constructor"""
+    points = scale(points)
+    points = translate_to(points, centroid(points))
+    return resample(points, n)
+
+def normalize_all(values, offsets, n=SAMPLING_RESOLUTION):
+    """Normalize every gesture of a packed batch into an (N, n, 2) float32 array"""
+    return np.stack([normalize(values[offsets[i]:offsets[i + 1]], n) for i in range(len(offsets) - 1)])
+
+def _start_indices(n, eps=EPS):
+    step = int(np.floor(n ** (1.0 - eps)))
+    return np.arange(0, n, step)
+
+def cloud_distances(candidate, templates, eps=EPS):
+    """GreedyCloudMatch of one normalized candidate (n, 2) against templates (T, n, 2)
+
+    Returns (T,) float32 distances. Each template gets both matching
+    directions from every start index, all run in lockstep.
+    """
+    templates = np.asarray(templates, dtype=np.float32)
+    num_templates, n, _ = templates.shape
+    diff_x = candidate[None, :, None, 0] - templates[:, None, :, 0]
+    diff_y = candidate[None, :, None, 1] - templates[:, None, :, 1]
+    sq = diff_x * diff_x + diff_y * diff_y  # (T, n, n): candidate point i vs template point j
+
+    # Non-negative float32 bits sort like the floats, so (bits << INDEX_BITS | j)
+    # finds the smallest distance and, on ties, the first j (the strict < in
+    # CloudDistance) with a single min over the leading axis.
+    index_bits = max(int(n - 1).bit_length(), 1)
+    j = np.arange(n, dtype=np.int64)[:, None, None]
+    bits = sq.view(np.int32).astype(np.int64)
+    keys = np.empty((n, 2 * n, num_templates), dtype=np.int64)
+    keys[:, :n] = bits.transpose(2, 1, 0) << index_bits | j  # [j, i, t]: candidate i -> template j
+    keys[:, n:] = bits.transpose(1, 2, 0) << index_bits | j  # [j, i, t]: template i -> candidate j
+
+    starts = _start_indices(n, eps)
+    runs = 2 * len(starts)
+    matched = np.zeros((n, runs, num_templates), dtype=np.int64)
+    sums = np.zeros((runs, num_templates), dtype=np.float32)
+    r_idx = np.arange(runs)[:, None]
+    t_idx = np.arange(num_templates)[None, :]
+    for k in range(n):
+        i = (starts + k) % n
+        rows = keys[:, np.concatenate([i, i + n])]  # (n, runs, T)
+        rows |= matched
+        best = rows.min(axis=0)
+        matched[best & (2 ** index_bits - 1), r_idx, t_idx] = np.int64(1) << 62
+        weight = np.float32(1.0) - np.float32(k) / np.float32(n)
+        sums += weight * (best >> index_bits).astype(np.int32).view(np.float32)
+    return sums.min(axis=0)
+
+def score_from_distance(distance):
+    """Score formula of PointCloudRecognizer.Classify"""
+    return max((np.float32(distance) - np.float32(2.0)) / np.float32(-2.0), np.float32(0.0))
+
+def classify(candidate, templates, template_names, eps=EPS):
+    """Return (class, score) of the closest template, like PointCloudRecognizer.Classify"""
+    if len(templates) == 0:
+        return NO_MATCH, 0.0
+    distances = cloud_distances(candidate, templates, eps)
+    best = int(np.argmin(distances))  # First minimum wins, as in the template loop
+    return template_names[best], float(score_from_distance(distances[best]))
+
+def classify_all(candidates, templates, template_labels, eps=EPS):
+    """Classify many normalized candidates; returns (labels, distances)"""
+    template_labels = np.asarray(template_labels)
+    labels = np.empty(len(candidates), dtype=template_labels.dtype)
+    distances = np.empty(len(candidates), dtype=np.float32)
+    for i, candidate in enumerate(candidates):
+        d = cloud_distances(candidate, templates, eps)
+        best = int(np.argmin(d))
+        labels[i], distances[i] = template_labels[best], d[best]
+    return labels, distances
+
+def _cnn_accuracy(model_path, values, offsets, y):
+    """Held-out CNN accuracy through onnxruntime, or None if unavailable"""
+    try:
+        from benchmark_inference import load_onnx
+        from gesture_preprocessing import packed_points_to_images
+        predict, fixed_batch = load_onnx(model_path)
+    except Exception as e:
+        print(f"⚠️  CNN comparison skipped: {e}")
+        return None
+    X = packed_points_to_images(values, offsets)[..., None]
+    if fixed_batch == 1:
+        probabilities = np.concatenate([predict(x[None]) for x in X])
+    else:
+        probabilities = predict(X)
+    return float(np.mean(np.argmax(probabilities, axis=1) == y))
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the $P recognizer on the recording corpus")
+    parser.add_argument('--model', default='vr_gesture_model.onnx', help="CNN to compare against")
+    args = parser.parse_args()
+
+    values, offsets, y, class_names = load_training_points()
+    train_idx, test_idx = train_test_split(np.arange(len(y)), test_size=0.2, stratify=y, random_state=42)
+
+    start = time.perf_counter()
+    templates = normalize_all(*select_gestures(values, offsets, train_idx))
+    candidates = normalize_all(*select_gestures(values, offsets, test_idx))
+    normalize_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predicted, _ = classify_all(candidates, templates, y[train_idx])
+    match_time = time.perf_counter() - start
+
+    accuracy = float(np.mean(predicted == y[test_idx]))
+    print(f"📊 $P: {len(templates)} templates, {len(candidates)} held-out gestures")
+    print(f"   normalize: {normalize_time:.2f}s, classify: {match_time:.2f}s "
+          f"({match_time / len(candidates) * 1000:.1f} ms per gesture)")
+    print(f"   accuracy: {accuracy:.4f}")
+
+    cnn = _cnn_accuracy(args.model, *select_gestures(values, offsets, test_idx), y[test_idx])
+    if cnn is not None:
+        print(f"   CNN ({args.model}) accuracy: {cnn:.4f}")
+
+if __name__ == "__main__":
+    main()
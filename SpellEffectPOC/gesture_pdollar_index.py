@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Template index and pruning for the $P recognizer
+
+Shrinks the $P training set to a few representative templates per class
+(k-medoids or k-centers under the $P distance) and avoids full
+GreedyCloudMatch calls at query time in two ways:
+
+    shortlist    cheap features (bounding-box ratio, relative path length,
+                 4x4 grid occupancy) keep only the nearest templates; approximate
+    lower bound  each remaining template gets a bound from nearest-point
+                 distances; templates are matched in bound order and the search
+                 stops once the bound reaches the best distance; exact
+
+The reduced set is exported as PDollar XML that GestureIO.ReadGestureFromFile
+loads, and a report shows held-out accuracy against full matches per query:
+
+    python gesture_pdollar_index.py [--templates-per-class 8] [--method medoids|centers]
+"""
+
+import argparse
+import json
+import os
+import time
+import numpy as np
+from sklearn.model_selection import train_test_split
+from gesture_pdollar import EPS, SAMPLING_RESOLUTION, _start_indices, cloud_distances, normalize_all, scale
+from gesture_preprocessing import load_training_points
+
+# --- CONFIGURATION ---
+OUT_TEMPLATE_DIR = 'pdollar_templates'
+INDEX_FILE = 'template_index.json'
+GRID_SIZE = 4
+MATCH_CHUNK = 8  # Templates matched per batched GreedyCloudMatch call
+REPORT_TEMPLATES_PER_CLASS = [1, 2, 4, 8, 16, None]  # None = every training template
+REPORT_SHORTLISTS = [None, 32, 16]
+
+# --- FEATURES ---
+def template_features(values, offsets, normalized):
+    """(N, 2 + GRID_SIZE**2) cheap shape features of every gesture
+
+    Log bounding-box aspect ratio and path length relative to the longest
+    bounding-box side from the raw points, plus the fraction of the
+    resampled points in each cell of a coarse grid.
+    """
+    features = np.zeros((len(normalized), 2 + GRID_SIZE * GRID_SIZE), dtype=np.float32)
+    for i in range(len(normalized)):
+        points = scale(values[offsets[i]:offsets[i + 1]])  # Longest side is 1
+        extent = points.max(axis=0)
+        features[i, 0] = np.log((extent[0] + 1e-3) / (extent[1] + 1e-3))
+        features[i, 1] = np.sum(np.linalg.norm(np.diff(points, axis=0), axis=1))
+
+    # Occupancy of the $P-resampled points, shifted back into the unit box
+    points = normalized - normalized.min(axis=1, keepdims=True)
+    cells = np.clip((points * GRID_SIZE).astype(np.int64), 0, GRID_SIZE - 1)
+    flat = cells[..., 1] * GRID_SIZE + cells[..., 0]
+    for i in range(len(normalized)):
+        features[i, 2:] = np.bincount(flat[i], minlength=GRID_SIZE * GRID_SIZE) / normalized.shape[1]
+    return features
+
+def feature_distances(feature, features):
+    """L1 distance between one feature vector and many"""
+    return np.abs(features - feature).sum(axis=1)
+
+def lower_bounds(candidate, templates, eps=EPS):
+    """(T,) lower bounds of the $P distance to every template
+
+    Greedy matching picks the nearest still unmatched point, which is never
+    closer than the nearest point overall, so weighting the nearest-point
+    distances like CloudDistance bounds every run from below.
+    """
+    diff = candidate[None, :, None, :] - templates[:, None, :, :]
+    sq = (diff * diff).sum(axis=-1, dtype=np.float64)  # (T, n, n)
+    n = sq.shape[1]
+    starts = _start_indices(n, eps)
+    weights = 1.0 - ((np.arange(n)[None, :] - starts[:, None]) % n) / n  # (S, n)
+    bound = np.minimum(sq.min(axis=2) @ weights.T, sq.min(axis=1) @ weights.T).min(axis=1)
+    return bound * (1.0 - 1e-6)  # Margin for float32 rounding in the real match
+
+def search(candidate, templates, candidate_features=None, features=None, shortlist=None):
+    """Nearest template with shortlist and lower-bound pruning
+
+    Returns (template index, distance, full matches performed).
+    """
+    indices = np.arange(len(templates))
+    if shortlist is not None and shortlist < len(templates):
+        indices = np.argsort(feature_distances(candidate_features, features), kind='stable')[:shortlist]
+
+    bounds = lower_bounds(candidate, templates[indices])
+    order = np.argsort(bounds, kind='stable')
+    best, best_distance, matches = -1, np.inf, 0
+    for start in range(0, len(order), MATCH_CHUNK):
+        if bounds[order[start]] >= best_distance:
+            break
+        block = indices[order[start:start + MATCH_CHUNK]]
+        distances = cloud_distances(candidate, templates[block])
+        matches += len(block)
+        i = int(np.argmin(distances))
+        if distances[i] < best_distance:
+            best, best_distance = int(block[i]), float(distances[i])
+    return best, best_distance, matches
+
+# --- TEMPLATE SELECTION ---
+def pairwise_distances(normalized):
+    """Symmetric (N, N) $P distance matrix"""
+    return np.stack([cloud_distances(candidate, normalized) for candidate in normalized])
+
+def select_medoids(distances, k, max_iterations=20):
+    """k-medoids: greedy BUILD, then alternate assignment and medoid update"""
+    n = len(distances)
+    if k >= n:
+        return np.arange(n)
+    medoids = [int(np.argmin(distances.sum(axis=1)))]
+    nearest = distances[medoids[0]].copy()
+    while len(medoids) < k:
+        gain = np.maximum(nearest[None, :] - distances, 0).sum(axis=1)
+        gain[medoids] = -1
+        medoids.append(int(np.argmax(gain)))
+        nearest = np.minimum(nearest, distances[medoids[-1]])
+
+    medoids = np.array(medoids)
+    for _ in range(max_iterations):
+        assignment = np.argmin(distances[:, medoids], axis=1)
+        updated = medoids.copy()
+        for c in range(k):
+            members = np.flatnonzero(assignment == c)
+            if len(members):
+                updated[c] = members[np.argmin(distances[np.ix_(members, members)].sum(axis=1))]
+        if np.array_equal(updated, medoids):
+            break
+        medoids = updated
+    return np.sort(medoids)
+
+def select_k_centers(distances, k):
+    """Farthest-first k-centers, seeded with the overall medoid"""
+    n = len(distances)
+    if k >= n:
+        return np.arange(n)
+    centers = [int(np.argmin(distances.sum(axis=1)))]
+    nearest = distances[centers[0]].copy()
+    while len(centers) < k:
+        centers.append(int(np.argmax(nearest)))
+        nearest = np.minimum(nearest, distances[centers[-1]])
+    return np.sort(np.array(centers))
+
+def build_index(normalized, labels, method='medoids'):
+    """Compute per-class $P distances once; returns pick(k) -> template indices
+
+    pick(None) keeps every template.
+    """
+    select = select_medoids if method == 'medoids' else select_k_centers
+    class_distances = {}
+    selected = {}
+    for label in np.unique(labels):
+        members = np.flatnonzero(labels == label)
+        class_distances[label] = pairwise_distances(normalized[members])
+        selected[label] = members
+
+    def pick(k):
+        if k is None:
+            return np.arange(len(labels))
+        return np.sort(np.concatenate([
+            members[select(class_distances[label], k)] for label, members in selected.items()
+        ]))
+    return pick
+
+# --- EXPORT ---
+def write_pdollar_xml(path, points, name):
+    """Write one gesture in the layout GestureIO.WriteGesture produces"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="utf-8" standalone="yes"?>\n')
+        f.write(f'<Gesture Name = "{name}">\n')
+        f.write('\t<Stroke>\n')
+        for x, y in points:
+            f.write(f'\t\t<Point X = "{float(x):.9g}" Y = "{float(y):.9g}" T = "0" Pressure = "0" />\n')
+        f.write('\t</Stroke>\n')
+        f.write('</Gesture>\n')
+
+def export_templates(out_dir, values, offsets, labels, class_names, indices, features):
+    """Write the selected templates as PDollar XML plus an index of their features"""
+    os.makedirs(out_dir, exist_ok=True)
+    index = {'grid_size': GRID_SIZE, 'sampling_resolution': SAMPLING_RESOLUTION, 'templates': []}
+    counts = {}
+    for i in indices:
+        name = class_names[labels[i]]
+        counts[name] = counts.get(name, 0) + 1
+        filename = f"{name}_{counts[name]:03d}.xml"
+        write_pdollar_xml(os.path.join(out_dir, filename), values[offsets[i]:offsets[i + 1]], name)
+        index['templates'].append({'file': filename, 'name': name, 'features': features[i].tolist()})
+    with open(os.path.join(out_dir, INDEX_FILE), 'w') as f:
+        json.dump(index, f, indent=2)
+    return counts
+
+# --- REPORT ---
+def evaluate(queries, query_features, query_labels, templates, features, labels, shortlist=None):
+    """Accuracy, mean full matches and mean time per query"""
+    correct, matches = 0, 0
+    start = time.perf_counter()
+    for query, feature, label in zip(queries, query_features, query_labels):
+        best, _, performed = search(query, templates, feature, features, shortlist)
+        correct += labels[best] == label
+        matches += performed
+    elapsed = time.perf_counter() - start
+    return correct / len(queries), matches / len(queries), elapsed / len(queries) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Pick and export a reduced $P template set")
+    parser.add_argument('--templates-per-class', type=int, default=8)
+    parser.add_argument('--method', choices=['medoids', 'centers'], default='medoids')
+    parser.add_argument('--out', default=OUT_TEMPLATE_DIR, help="Directory for the PDollar XML templates")
+    parser.add_argument('--no-report', action='store_true', help="Skip the accuracy/matches sweep")
+    args = parser.parse_args()
+
+    values, offsets, y, class_names = load_training_points()
+    normalized = normalize_all(values, offsets)
+    features = template_features(values, offsets, normalized)
+    train_idx, test_idx = train_test_split(np.arange(len(y)), test_size=0.2, stratify=y, random_state=42)
+
+    print(f"🔎 Building {args.method} index over {len(train_idx)} training templates...")
+    start = time.perf_counter()
+    pick = build_index(normalized[train_idx], y[train_idx], args.method)
+    print(f"   pairwise $P distances in {time.perf_counter() - start:.1f}s")
+
+    if not args.no_report:
+        print(f"\n{'per class':>10} {'shortlist':>10} {'accuracy':>9} {'matches/query':>14} {'ms/query':>9}")
+        for k in REPORT_TEMPLATES_PER_CLASS:
+            chosen = train_idx[pick(k)]
+            for shortlist in REPORT_SHORTLISTS:
+                if shortlist is not None and shortlist >= len(chosen):
+                    continue
+                accuracy, matches, ms = evaluate(
+                    normalized[test_idx], features[test_idx], y[test_idx],
+                    normalized[chosen], features[chosen], y[chosen], shortlist)
+                print(f"{k or 'all':>10} {shortlist or 'all':>10} {accuracy:>9.4f} {matches:>14.1f} {ms:>9.1f}")
+
+    # The exported set is picked from every recording, not just the training split
+    pick_all = build_index(normalized, y, args.method)
+    chosen = pick_all(args.templates_per_class)
+    counts = export_templates(args.out, values, offsets, y, class_names, chosen, features)
+    print(f"\n📁 Exported {len(chosen)} templates to {args.out}/ ({INDEX_FILE} holds their features)")
+    for name, count in counts.items():
+        print(f"   {name}: {count}")
+
+if __name__ == "__main__":
+    main()
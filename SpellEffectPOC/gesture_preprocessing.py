@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Shared VR gesture preprocessing: XML loading and batch rasterization
+
+Gestures are handled as a ragged batch: one flat (M, 2) array of points
+plus an (N+1,) offsets array, so gesture i is values[offsets[i]:offsets[i+1]].
+Normalization and line drawing run as NumPy array operations over every
+gesture at once instead of one cv2.line call per segment.
+"""
+
+import numpy as np
+import glob
+import os
+from gesture_cache import CACHE_PATH, CACHE_VERSION, CacheEntry, find_stale, load_cache, prune_deleted, save_cache
+from gesture_xml import parse_gesture_bytes, read_gesture_xml
+
+# --- CONFIGURATION ---
+TRAINING_DATA_DIR = "TrainingRecordingDataXMLs/GestureTraining"
+CLASS_NAMES = ['cast_bombardo', 'cast_protego', 'cast_stupefy', 'cast_expecto_patronum']
+IMG_SIZE = 28
+DRAW_SCALE = 26.0  # Longest bounding-box side in pixels (leaves a 1-pixel border)
+MIN_POINTS = 5     # Recordings with fewer points are skipped
+SEQUENCE_POINTS = 28  # Points per gesture for sequence models, like MovementRecognizer.NormalizeAndResamplePoints
+
+def load_gesture_xml(xml_file):
+    """Load a single XML gesture file and return points"""
+    try:
+        _, points = read_gesture_xml(xml_file)
+    except Exception as e:
+        print(f"Error loading {xml_file}: {e}")
+        return None
+
+    return points if len(points) >= MIN_POINTS else None
+
+def pack_points(points_list):
+    """Pack a list of (P, 2) point arrays into flat values and offsets"""
+    lengths = np.fromiter((len(p) for p in points_list), dtype=np.int64, count=len(points_list))
+    offsets = np.zeros(len(points_list) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    if offsets[-1] == 0:
+        return np.zeros((0, 2), dtype=np.float64), offsets
+
+    values = np.concatenate([np.asarray(p, dtype=np.float64).reshape(-1, 2) for p in points_list])
+    return values, offsets
+
+def select_gestures(values, offsets, indices):
+    """Packed sub-batch holding the given gestures, in the given order"""
+    indices = np.asarray(indices, dtype=np.int64)
+    lengths = np.diff(offsets)[indices]
+    new_offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_offsets[1:])
+
+    source = np.repeat(offsets[:-1][indices] - new_offsets[:-1], lengths) + np.arange(new_offsets[-1])
+    return values[source], new_offsets
+
+def normalize_points(values, offsets, size=IMG_SIZE, scale=DRAW_SCALE):
+    """Center each gesture's bounding box in the image and scale it to fit
+
+    Returns the pixel-space (M, 2) coordinates and the gesture index of every point.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    lengths = np.diff(offsets)
+    gesture_idx = np.repeat(np.arange(len(lengths)), lengths)
+
+    if len(values) == 0:
+        return np.zeros((0, 2), dtype=np.float64), gesture_idx
+
+    # reduceat misbehaves on empty groups, so only reduce over gestures that have points
+    nonempty = lengths > 0
+    min_xy = np.zeros((len(lengths), 2))
+    max_xy = np.zeros((len(lengths), 2))
+    min_xy[nonempty] = np.minimum.reduceat(values, offsets[:-1][nonempty], axis=0)
+    max_xy[nonempty] = np.maximum.reduceat(values, offsets[:-1][nonempty], axis=0)
+
+    center = (max_xy + min_xy) / 2
+    max_dim = (max_xy - min_xy).max(axis=1)
+    factor = np.ones(len(lengths))
+    np.divide(scale, max_dim, out=factor, where=max_dim > 0)
+
+    pixels = (values - center[gesture_idx]) * factor[gesture_idx][:, None] + size / 2
+    return pixels, gesture_idx
+
+def segment_endpoints(values, offsets, size=IMG_SIZE, scale=DRAW_SCALE):
+    """Integer pixel endpoints (x0, y0, x1, y1) and gesture index of every line segment"""
+    pixels, gesture_idx = normalize_points(values, offsets, size, scale)
+
+    # Round half to even like Python's round(), then clamp to the image
+    pixels = np.clip(np.rint(pixels), 0, size - 1).astype(np.int64)
+
+    # Consecutive points only form a segment inside the same gesture
+    same = gesture_idx[:-1] == gesture_idx[1:]
+    start = pixels[:-1][same]
+    end = pixels[1:][same]
+    return start[:, 0], start[:, 1], end[:, 0], end[:, 1], gesture_idx[:-1][same]
+
+def draw_segments(images, gesture_idx, x0, y0, x1, y1, value=1.0):
+    """Draw 1-pixel lines into images[gesture_idx] in one vectorized pass
+
+    Reproduces cv2.line(..., thickness=1) exactly: OpenCV walks every line
+    left to right, and ties on the minor axis round toward the left endpoint.
+    """
+    swap = x1 < x0
+    x0, x1 = np.where(swap, x1, x0), np.where(swap, x0, x1)
+    y0, y1 = np.where(swap, y1, y0), np.where(swap, y0, y1)
+
+    dx = x1 - x0
+    dy = y1 - y0
+    steps = np.maximum(np.abs(dx), np.abs(dy))
+    counts = steps + 1
+
+    # Expand every segment into its pixel steps k = 0..steps
+    seg = np.repeat(np.arange(len(counts)), counts)
+    k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    n = np.maximum(steps, 1)[seg]
+
+    # Offset along an axis with extent d is round(k * |d| / n), ties toward k = 0.
+    # On the major axis |d| == n so this reduces to k itself.
+    xs = x0[seg] + np.sign(dx[seg]) * ((2 * k * np.abs(dx[seg]) + n - 1) // (2 * n))
+    ys = y0[seg] + np.sign(dy[seg]) * ((2 * k * np.abs(dy[seg]) + n - 1) // (2 * n))
+
+    images[gesture_idx[seg], ys, xs] = value
+    return images
+
+def points_to_images(points_list, size=IMG_SIZE, scale=DRAW_SCALE, dtype=np.float32):
+    """Convert N gestures of 2D points to an (N, size, size) image batch"""
+    values, offsets = pack_points(points_list)
+    return packed_points_to_images(values, offsets, size, scale, dtype)
+
+def packed_points_to_images(values, offsets, size=IMG_SIZE, scale=DRAW_SCALE, dtype=np.float32):
+    """Rasterize an already packed (values, offsets) gesture batch"""
+    images = np.zeros((len(offsets) - 1, size, size), dtype=dtype)
+    x0, y0, x1, y1, gesture_idx = segment_endpoints(values, offsets, size, scale)
+    return draw_segments(images, gesture_idx, x0, y0, x1, y1)
+
+def points_to_image(points, size=IMG_SIZE, scale=DRAW_SCALE):
+    """Convert 2D points to a single 28x28 image"""
+    return points_to_images([points], size, scale)[0]
+
+def resample_gestures(values, offsets, num_points=SEQUENCE_POINTS):
+    """Resample every gesture to num_points equally spaced along its path, as (N, K, 2)
+
+    The equal-spacing resample MovementRecognizer.NormalizeAndResamplePoints
+    is meant to do, for the whole batch at once: arc length comes from one
+    cumsum over the flat values, and all N * K targets are located with a
+    single searchsorted. Each gesture's arc is mapped to [2i, 2i + 1] so
+    the keys increase across the batch. The first and last points are kept
+    exactly; empty gestures give zeros.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    lengths = np.diff(offsets)
+    nonempty = lengths > 0
+    resampled = np.zeros((len(lengths), num_points, 2))
+    if not nonempty.any():
+        return resampled
+    starts, ends = offsets[:-1][nonempty], offsets[1:][nonempty] - 1
+    gesture = np.repeat(np.arange(len(starts)), lengths[nonempty])
+
+    seg = np.zeros(len(values))
+    d = np.diff(values, axis=0)
+    np.hypot(d[:, 0], d[:, 1], out=seg[1:])
+    seg[starts] = 0.0
+    arc = np.cumsum(seg)
+    total = arc[ends] - arc[starts]
+    scale = 1.0 / np.where(total > 0, total, 1.0)
+    key = (arc - arc[starts][gesture]) * scale[gesture] + 2.0 * gesture
+
+    # Per unit of key along the segment starting at each point (0 after a gesture's last point)
+    span = np.diff(key, append=key[-1])
+    span[ends] = 0.0
+    with np.errstate(divide='ignore'):
+        inv_span = np.where(span > 0, 1.0 / span, 0.0)
+
+    targets = np.linspace(0.0, 1.0, num_points) + 2.0 * np.arange(len(starts))[:, None]
+    j = np.searchsorted(key, targets, side='right') - 1
+    t = (targets - key[j]) * inv_span[j]
+    out = np.empty((len(starts), num_points, 2))
+    for c in range(2):
+        coord = values[:, c]
+        out[..., c] = coord[j] + t * np.diff(coord, append=coord[-1])[j]
+    resampled[nonempty] = out
+    return resampled
+
+def points_to_sequences(values, offsets, num_points=SEQUENCE_POINTS):
+    """Point-sequence model input: (N, K, 2) float32 resampled points
+
+    Each gesture's bounding box is centered on the origin and its longest
+    side scaled to 1, the same normalization the rasterizer uses.
+    """
+    normalized, _ = normalize_points(values, offsets, size=0, scale=1.0)
+    return resample_gestures(normalized, offsets, num_points).astype(np.float32)
+
+def truncate_gestures(values, offsets, fraction):
+    """Packed prefixes holding the first `fraction` of each gesture's path length
+
+    The prefix ends exactly at that arc length: the last point is
+    interpolated on the segment the cut falls into.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    lengths = np.diff(offsets)
+    gesture_idx = np.repeat(np.arange(len(lengths)), lengths)
+    if len(values) == 0:
+        return values.reshape(0, 2), np.zeros_like(offsets)
+
+    # Arc length of every point from the start of its own gesture
+    seg = np.zeros(len(values))
+    seg[1:] = np.linalg.norm(np.diff(values, axis=0), axis=1)
+    seg[offsets[:-1][lengths > 0]] = 0.0
+    arc = np.cumsum(seg)
+    arc -= arc[offsets[:-1][gesture_idx]]
+
+    total = np.zeros(len(lengths))
+    total[lengths > 0] = arc[offsets[1:][lengths > 0] - 1]
+    target = fraction * total
+    keep = arc <= target[gesture_idx]
+
+    # A cut strictly inside a segment adds one interpolated end point
+    kept = np.bincount(gesture_idx[keep], minlength=len(lengths))
+    last = offsets[:-1] + kept - 1
+    extra = (kept > 0) & (kept < lengths)
+    extra[extra] = target[extra] > arc[last[extra]]
+    cut = last[extra]
+    t = ((target[extra] - arc[cut]) / (arc[cut + 1] - arc[cut]))[:, None]
+    cut_points = values[cut] + t * (values[cut + 1] - values[cut])
+
+    new_offsets = np.zeros_like(offsets)
+    np.cumsum(kept + extra, out=new_offsets[1:])
+    out = np.empty((new_offsets[-1], 2))
+    out[new_offsets[:-1][gesture_idx[keep]] + (np.arange(len(values)) - offsets[:-1][gesture_idx])[keep]] = values[keep]
+    out[new_offsets[1:][extra] - 1] = cut_points
+    return out, new_offsets
+
+class IncrementalRasterizer:
+    """28x28 raster of a stroke that is still being drawn, updated point by point
+
+    Gives exactly the image packed_points_to_images would draw for the
+    points so far. While a new point stays inside the current bounding box
+    the normalization is unchanged, so only the new segment is drawn into
+    the buffer (in plain Python, which beats NumPy for a single short
+    line). A point that grows the box moves every pixel and triggers a
+    vectorized full redraw.
+    """
+
+    def __init__(self, size=IMG_SIZE, scale=DRAW_SCALE):
+        self.size = size
+        self.scale = scale
+        self.reset()
+
+    def reset(self):
+        self.image = np.zeros((self.size, self.size), dtype=np.float32)
+        self.points = []
+        self.redraws = 0
+        self.segments = 0
+        self._box = None  # (min_x, min_y, max_x, max_y)
+
+    def _pixel(self, x, y):
+        """Same float64 arithmetic as normalize_points + segment_endpoints for one point"""
+        min_x, min_y, max_x, max_y = self._box
+        max_dim = max(max_x - min_x, max_y - min_y)
+        factor = self.scale / max_dim if max_dim > 0 else 1.0
+        px = round((x - (max_x + min_x) / 2) * factor + self.size / 2)
+        py = round((y - (max_y + min_y) / 2) * factor + self.size / 2)
+        return min(max(px, 0), self.size - 1), min(max(py, 0), self.size - 1)
+
+    def _draw_segment(self, x0, y0, x1, y1):
+        """One line with the draw_segments (cv2.line) pixel rule"""
+        if x1 < x0:
+            x0, y0, x1, y1 = x1, y1, x0, y0
+        dx, dy = x1 - x0, y1 - y0
+        steps = max(abs(dx), abs(dy))
+        n = max(steps, 1)
+        sx, sy = (dx > 0) - (dx < 0), (dy > 0) - (dy < 0)
+        ax, ay = abs(dx), abs(dy)
+        for k in range(steps + 1):
+            self.image[y0 + sy * ((2 * k * ay + n - 1) // (2 * n)), x0 + sx * ((2 * k * ax + n - 1) // (2 * n))] = 1.0
+
+    def add_point(self, x, y):
+        """Append one point and return the updated image"""
+        x, y = float(x), float(y)
+        self.points.append((x, y))
+        if self._box is None:
+            self._box = (x, y, x, y)
+            return self.image
+
+        min_x, min_y, max_x, max_y = self._box
+        if min_x <= x <= max_x and min_y <= y <= max_y:
+            self.segments += 1
+            self._draw_segment(*self._pixel(*self.points[-2]), *self._pixel(x, y))
+            return self.image
+
+        self._box = (min(min_x, x), min(min_y, y), max(max_x, x), max(max_y, y))
+        self.redraws += 1
+        self.image[:] = 0
+        values = np.array(self.points)
+        x0, y0, x1, y1, gesture_idx = segment_endpoints(values, np.array([0, len(values)]), self.size, self.scale)
+        draw_segments(self.image[None], gesture_idx, x0, y0, x1, y1)
+        return self.image
+
+def _cache_settings():
+    """Preprocessing settings a cache must have been built with"""
+    return (CACHE_VERSION, IMG_SIZE, DRAW_SCALE, MIN_POINTS)
+
+def _process_stale(entries, stale):
+    """Parse and batch-rasterize new or changed recordings into cache entries"""
+    parsed = []
+    for path, st, digest, data in stale:
+        try:
+            _, points = parse_gesture_bytes(data)
+        except Exception as e:
+            print(f"Error loading {path}: {e}")
+            points = None
+        if points is not None and len(points) < MIN_POINTS:
+            points = None
+        parsed.append(points)
+
+    images = iter(points_to_images([p for p in parsed if p is not None], dtype=np.uint8))
+    blank = np.zeros((IMG_SIZE, IMG_SIZE), dtype=np.uint8)
+    for (path, st, digest, _), points in zip(stale, parsed):
+        image = next(images) if points is not None else blank
+        entries[path] = CacheEntry(st.st_mtime_ns, st.st_size, digest, points, image)
+
+def _load_cached_entries(base_path, class_names, cache_path):
+    """Refresh the cache for the training tree and return per-class file lists and entries"""
+    class_files = [glob.glob(os.path.join(base_path, class_name, "*.xml")) for class_name in class_names]
+    all_files = [f for files in class_files for f in files]
+
+    entries = load_cache(cache_path, _cache_settings())
+    stale, refreshed = find_stale(entries, all_files)
+    _process_stale(entries, stale)
+    removed = prune_deleted(entries, all_files)
+
+    if cache_path:
+        print(f"Cache: {len(all_files) - len(stale)} reused, {len(stale)} processed, {removed} removed")
+        if stale or refreshed or removed:
+            save_cache(cache_path, entries, _cache_settings(), (IMG_SIZE, IMG_SIZE))
+
+    return class_files, entries
+
+def _valid_entries(class_names, class_files, entries, verbose=True):
+    """Yield (class_idx, entry) for every usable recording, class by class"""
+    for class_idx, (class_name, xml_files) in enumerate(zip(class_names, class_files)):
+        if verbose:
+            print(f"Loading {len(xml_files)} files for {class_name}")
+
+        valid_count = 0
+        for xml_file in xml_files:
+            entry = entries[xml_file]
+            if entry.points is not None:
+                yield class_idx, entry
+                valid_count += 1
+
+        if verbose:
+            print(f"  -> {valid_count} valid gestures loaded")
+
+def load_training_data(base_path=TRAINING_DATA_DIR, class_names=CLASS_NAMES, cache_path=CACHE_PATH):
+    """Load all training data
+
+    Points and rasters are cached in cache_path (None disables the cache),
+    so only recordings added or changed since the last run are processed.
+    """
+    class_files, entries = _load_cached_entries(base_path, class_names, cache_path)
+
+    images, y = [], []
+    for class_idx, entry in _valid_entries(class_names, class_files, entries):
+        images.append(entry.image)
+        y.append(class_idx)
+
+    X = np.array(images, dtype=np.float32).reshape(-1, IMG_SIZE, IMG_SIZE)
+    return X, np.array(y, dtype=np.int64), list(class_names)
+
+def load_training_points(base_path=TRAINING_DATA_DIR, class_names=CLASS_NAMES, cache_path=CACHE_PATH):
+    """Load the raw points of all training data as packed (values, offsets, y, class_names)
+
+    Same samples in the same order as load_training_data.
+    """
+    class_files, entries = _load_cached_entries(base_path, class_names, cache_path)
+
+    points_list, y = [], []
+    for class_idx, entry in _valid_entries(class_names, class_files, entries):
+        points_list.append(entry.points)
+        y.append(class_idx)
+
+    values, offsets = pack_points(points_list)
+    return values, offsets, np.array(y, dtype=np.int64), list(class_names)
+
+def load_training_sources(base_path=TRAINING_DATA_DIR, class_names=CLASS_NAMES, cache_path=CACHE_PATH):
+    """Content digests and mtimes (ns) of all training data, as (digests, mtime_ns)
+
+    Same samples in the same order as load_training_data, so a model can
+    record which recordings it was trained on.
+    """
+    class_files, entries = _load_cached_entries(base_path, class_names, cache_path)
+    valid = [entry for _, entry in _valid_entries(class_names, class_files, entries, verbose=False)]
+    return [entry.digest for entry in valid], np.array([entry.mtime_ns for entry in valid], dtype=np.int64)
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Micro-batching gesture inference server
+
+Loads the exported ONNX model once and scores casts sent by many concurrent
+clients (spectator mode, anti-cheat review, analytics). The protocol is
+newline-delimited JSON over TCP, one request per line, with points in the
+same form as the XML <Point X="..." Y="..."/> data:
+
+    -> {"id": 7, "points": [{"X": 0.1, "Y": 0.4}, ...]}     ([x, y] pairs work too)
+<- {"id": 7, "label": "cast_protego", "class_index": 1, "confidence": 0.98,
+        "probabilities": [...], "batch_size": 12}
+
+Requests from all connections go into one queue. A batch closes when it
+holds --max-batch requests or when its oldest request has waited
+--max-wait-ms, whichever comes first; it is then rasterized with the shared
+preprocessing and scored in a single onnxruntime call on a worker thread,
+so the event loop keeps collecting the next batch meanwhile.
+
+    python gesture_server.py [vr_gesture_model.onnx] [--port 8765] [--max-batch 64] [--max-wait-ms 5]
+    python gesture_server.py --check-errors   # malformed and failing requests in a shared batch
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from benchmark_inference import load_onnx
+from gesture_preprocessing import CLASS_NAMES, MIN_POINTS, pack_points, packed_points_to_images
+
+# --- CONFIGURATION ---
+MODEL_PATH = 'vr_gesture_model.onnx'
+HOST = '127.0.0.1'
+PORT = 8765
+MAX_BATCH = 64
+MAX_WAIT_MS = 5.0
+
+def parse_points(raw):
+    """(P, 2) float array from [{"X": x, "Y": y}, ...] or [[x, y], ...]
+
+    Raises ValueError for no points or non-finite coordinates (JSON NaN /
+    Infinity, or a range too wide to normalize), which would otherwise
+    fail the rasterizer and with it every request in the same batch.
+    """
+    if raw and isinstance(raw[0], dict):
+        points = np.array([[float(p['X']), float(p['Y'])] for p in raw], dtype=np.float64)
+    else:
+        points = np.asarray(raw, dtype=np.float64).reshape(-1, 2)
+    if len(points) == 0:
+        raise ValueError("no points")
+    with np.errstate(over='ignore'):
+        finite = np.isfinite(points).all() and np.isfinite(np.ptp(points, axis=0)).all()
+    if not finite:
+        raise ValueError("points must be finite numbers")
+    return points
+
+class MicroBatcher:
+    """Groups concurrent predict() calls into batches under a latency deadline"""
+
+    def __init__(self, model_path, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.predict, fixed_batch = load_onnx(model_path)
+        self.per_sample = fixed_batch == 1
+        if self.per_sample:
+            print(f"⚠️  {model_path} has a fixed batch of 1, batches are scored sample by sample. "
+                  f"Upgrade it with: python gesture_onnx_export.py {model_path}")
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.batches = 0
+        self.requests = 0
+
+    async def predict_points(self, points):
+        """Probabilities for one gesture; resolves when its batch has been scored"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        await self.queue.put((loop.time(), points, future))
+        return await future
+
+    def _score(self, points_list):
+        images = packed_points_to_images(*pack_points(points_list))[..., None]
+        if self.per_sample:
+            return np.concatenate([self.predict(image[None]) for image in images])
+        return self.predict(images)
+
+    async def _score_each(self, batch):
+        """Score a failed batch one request at a time, so only the bad ones fail"""
+        loop = asyncio.get_running_loop()
+        for points, future in batch:
+            try:
+                probabilities = await loop.run_in_executor(self.executor, self._score, [points])
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.requests += 1
+            if not future.done():
+                future.set_result((probabilities[0], 1))
+
+    async def run(self):
+        """Batching loop; runs until cancelled"""
+        loop = asyncio.get_running_loop()
+        while True:
+            arrival, points, future = await self.queue.get()
+            batch = [(points, future)]
+            deadline = arrival + self.max_wait
+            while len(batch) < self.max_batch:
+                if self.queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        _, points, future = await asyncio.wait_for(self.queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    _, points, future = self.queue.get_nowait()
+                batch.append((points, future))
+
+            try:
+                probabilities = await loop.run_in_executor(self.executor, self._score, [p for p, _ in batch])
+            except Exception as e:
+                if len(batch) > 1:
+                    print(f"⚠️  Batch of {len(batch)} failed ({type(e).__name__}: {e}), scoring it request by request")
+                    await self._score_each(batch)
+                elif not batch[0][1].done():
+                    batch[0][1].set_exception(e)
+                continue
+
+            self.batches += 1
+            self.requests += len(batch)
+            for (_, future), p in zip(batch, probabilities):
+                if not future.done():
+                    future.set_result((p, len(batch)))
+
+def line_id(line):
+    """The "id" of a request line, or None if it has none or is not valid JSON"""
+    try:
+        request = json.loads(line)
+    except ValueError:
+        return None
+    return request.get('id') if isinstance(request, dict) else None
+
+async def handle_request(batcher, line):
+    """Score one JSON request line and return the JSON response dict"""
+    try:
+        request = json.loads(line)
+    except ValueError as e:
+        return {'error': f"bad request: {e}"}
+    request_id = request.get('id') if isinstance(request, dict) else None
+    try:
+        points = parse_points(request['points'])
+    except (ValueError, KeyError, TypeError, IndexError) as e:
+        return {'id': request_id, 'error': f"bad request: {e}"}
+    if len(points) < MIN_POINTS:
+        return {'id': request_id, 'error': f"too few points ({len(points)} < {MIN_POINTS})"}
+
+    probabilities, batch_size = await batcher.predict_points(points)
+    best = int(np.argmax(probabilities))
+    return {
+        'id': request_id,
+        'label': CLASS_NAMES[best] if best < len(CLASS_NAMES) else str(best),
+        'class_index': best,
+        'confidence': float(probabilities[best]),
+        'probabilities': [float(p) for p in probabilities],
+        'batch_size': batch_size,
+    }
+
+async def serve_connection(batcher, reader, writer):
+    """Read requests line by line; each is answered as soon as its batch is done"""
+    lock = asyncio.Lock()
+    pending = set()
+
+    async def respond(line):
+        try:
+            response = await handle_request(batcher, line)
+        except Exception as e:
+            # Always answer, otherwise the client waits for its timeout
+            print(f"❌ Request {line_id(line)} failed: {type(e).__name__}: {e}")
+            traceback.print_exc()
+            response = {'id': line_id(line), 'error': f"scoring failed: {type(e).__name__}: {e}"}
+        async with lock:
+            writer.write((json.dumps(response) + '\n').encode())
+            await writer.drain()
+
+    try:
+        while line := await reader.readline():
+            if line.strip():
+                task = asyncio.create_task(respond(line))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+async def serve(model_path, host=HOST, port=PORT, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+    batcher = MicroBatcher(model_path, max_batch, max_wait_ms)
+    batch_task = asyncio.create_task(batcher.run())
+    server = await asyncio.start_server(lambda r, w: serve_connection(batcher, r, w), host, port, limit=2 ** 20)
+    print(f"🚀 Serving {model_path} on {host}:{port} (max batch {max_batch}, max wait {max_wait_ms} ms)", flush=True)
+
+    start = time.perf_counter()
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batch_task.cancel()
+        elapsed = time.perf_counter() - start
+        if batcher.batches:
+            print(f"\n📊 {batcher.requests} requests in {batcher.batches} batches "
+                  f"(mean batch {batcher.requests / batcher.batches:.1f}) over {elapsed:.0f}s")
+
+# --- ERROR CHECK ---
+POISON = 1234.5  # Coordinate that the check's injected scoring fault rejects
+
+async def _check_errors(model_path, timeout=5.0):
+    """Valid and malformed requests in one batch window on one connection; every one must get its reply"""
+    batcher = MicroBatcher(model_path, max_wait_ms=50)
+    score, batch_sizes = batcher._score, []
+
+    def faulty_score(points_list):
+        # Stands in for a scoring bug that input validation does not catch
+        batch_sizes.append(len(points_list))
+        if any((points == POISON).any() for points in points_list):
+            raise RuntimeError("injected scoring fault")
+        return score(points_list)
+
+    batcher._score = faulty_score
+    batch_task = asyncio.create_task(batcher.run())
+    server = await asyncio.start_server(lambda r, w: serve_connection(batcher, r, w), HOST, 0)
+    reader, writer = await asyncio.open_connection(HOST, server.sockets[0].getsockname()[1])
+
+    circle = [[float(np.cos(a)), float(np.sin(a))] for a in np.linspace(0, 2 * np.pi, 40)]
+    requests = {
+        1: json.dumps({'id': 1, 'points': circle}),
+        2: '{"id": 2, "points": [[NaN, 0], [1, 1], [2, 2], [3, 3], [4, 4]]}',
+        3: json.dumps({'id': 3, 'points': circle[:-1] + [[POISON, POISON]]}),
+        4: json.dumps({'id': 4, 'points': circle[::-1]}),
+        None: 'not json',
+    }
+    expect_label = {1, 4}
+    failures = 0
+    try:
+        writer.write(''.join(line + '\n' for line in requests.values()).encode())
+        await writer.drain()
+        responses = {}
+        for _ in requests:
+            response = json.loads(await asyncio.wait_for(reader.readline(), timeout))
+            responses[response.get('id')] = response
+        shared = batch_sizes[0] if batch_sizes else 0
+        ok = shared >= 3
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} Valid and faulty requests shared a batch of {shared}")
+        for rid in requests:
+            response = responses.get(rid, {})
+            ok = ('label' in response) if rid in expect_label else ('error' in response)
+            failures += not ok
+            print(f"{'✅' if ok else '❌'} Request {rid}: {response.get('label') or response.get('error', 'no reply')}")
+
+        writer.write((requests[1] + '\n').encode())
+        await writer.drain()
+        response = json.loads(await asyncio.wait_for(reader.readline(), timeout))
+        ok = 'label' in response
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} Server still scores after the failure: {response.get('label', response)}")
+    except asyncio.TimeoutError:
+        failures += 1
+        print(f"❌ No reply within {timeout:g}s")
+    finally:
+        writer.close()
+        await writer.wait_closed()
+        server.close()
+        await server.wait_closed()
+        batch_task.cancel()
+    return 1 if failures else 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-batching ONNX gesture inference server")
+    parser.add_argument('model', nargs='?', default=MODEL_PATH)
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH)
+    parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT_MS,
+                        help="Longest time the oldest request in a batch waits for more requests")
+    parser.add_argument('--check-errors', action='store_true',
+                        help="Check that malformed and failing requests get replies without failing their batch")
+    args = parser.parse_args()
+
+    if args.check_errors:
+        return asyncio.run(_check_errors(args.model))
+
+    try:
+        asyncio.run(serve(args.model, args.host, args.port, args.max_batch, args.max_wait_ms))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    sys.exit(main())
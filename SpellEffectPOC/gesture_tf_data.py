@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Shared tf.data input pipeline for the VR gesture training scripts
+
+Replaces keras.preprocessing.image.ImageDataGenerator.flow: samples are
+cached and shuffled as tensors, then augmented a whole batch at a time
+by a single vectorized projective transform running in parallel map
+calls, with prefetching so the model never waits on input.
+
+Run directly to benchmark steps/second against ImageDataGenerator:
+    python gesture_tf_data.py [--steps 200] [--batch-size 32]
+"""
+
+import argparse
+import math
+import time
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+from gesture_augment import iter_augmented_batches
+from gesture_preprocessing import IMG_SIZE, load_training_data
+
+AUTOTUNE = tf.data.AUTOTUNE
+GATHER_BATCH = 256  # Rows read from a memory-mapped dataset per numpy call
+
+# Same ranges and meaning as the ImageDataGenerator in train_vr_gesture_model_fixed.py
+DEFAULT_AUGMENTATION = {
+    'rotation_range': 10,       # degrees
+    'width_shift_range': 0.1,   # fraction of width
+    'height_shift_range': 0.1,  # fraction of height
+    'shear_range': 0.1,         # degrees
+    'zoom_range': 0.1,          # scale in [1 - z, 1 + z], per axis
+}
+
+def _random_affine_transforms(batch_size, height, width, augmentation, seed=None):
+    """Random output->input projective transforms, one row of 8 per image"""
+    # Distinct op seeds, otherwise every parameter would draw the same sequence
+    seeds = iter(range(seed, seed + 6)) if seed is not None else iter([None] * 6)
+
+    def uniform(low, high):
+        return tf.random.uniform([batch_size], low, high, seed=next(seeds))
+
+    deg = math.pi / 180.0
+    rotation = augmentation.get('rotation_range', 0)
+    shear = augmentation.get('shear_range', 0)
+    width_shift = augmentation.get('width_shift_range', 0)
+    height_shift = augmentation.get('height_shift_range', 0)
+    zoom = augmentation.get('zoom_range', 0)
+
+    theta = uniform(-rotation, rotation) * deg
+    shear = uniform(-shear, shear) * deg
+    tx = uniform(-width_shift, width_shift) * width
+    ty = uniform(-height_shift, height_shift) * height
+    zx = uniform(1 - zoom, 1 + zoom)
+    zy = uniform(1 - zoom, 1 + zoom)
+
+    # Rotation @ shear @ zoom, applied about the image center, then shifted
+    cos, sin = tf.cos(theta), tf.sin(theta)
+    a0 = cos * zx
+    a1 = (-sin * tf.cos(shear) + cos * -tf.sin(shear)) * zy
+    b0 = sin * zx
+    b1 = (cos * tf.cos(shear) + sin * -tf.sin(shear)) * zy
+    cx, cy = (width - 1) / 2.0, (height - 1) / 2.0
+    a2 = cx - a0 * cx - a1 * cy + tx
+    b2 = cy - b0 * cx - b1 * cy + ty
+    zeros = tf.zeros([batch_size])
+    return tf.stack([a0, a1, a2, b0, b1, b2, zeros, zeros], axis=1)
+
+def augment_batch(images, augmentation=None, seed=None):
+    """Apply random ImageDataGenerator-style affine augmentation to a (B, H, W, C) batch"""
+    augmentation = DEFAULT_AUGMENTATION if augmentation is None else augmentation
+    shape = tf.shape(images)
+    transforms = _random_affine_transforms(shape[0], tf.cast(shape[1], tf.float32),
+                                           tf.cast(shape[2], tf.float32), augmentation, seed)
+    return tf.raw_ops.ImageProjectiveTransformV3(
+        images=images,
+        transforms=transforms,
+        output_shape=shape[1:3],
+        fill_value=0.0,
+        interpolation='BILINEAR',
+        fill_mode='CONSTANT',
+    )
+
+def _finish(ds, batch_size, training, augmentation, cache, shuffle_buffer, seed):
+    """Shared cache -> shuffle -> batch -> augment -> prefetch tail"""
+    if cache:
+        ds = ds.cache(cache if isinstance(cache, str) else '')
+    if training:
+        ds = ds.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size)
+    if training and augmentation is not False:
+        ds = ds.map(lambda x, y: (augment_batch(x, augmentation, seed), y),
+                    num_parallel_calls=AUTOTUNE, deterministic=seed is not None)
+    return ds.prefetch(AUTOTUNE)
+
+def make_dataset(X, y, batch_size=32, training=True, augmentation=False, cache=True, seed=None):
+    """Build a tf.data pipeline from in-memory arrays
+
+    augmentation is False (none), None (DEFAULT_AUGMENTATION) or a dict of
+    ImageDataGenerator-style ranges. cache may be a filename to cache on disk.
+    """
+    X = np.asarray(X, dtype=np.float32)
+    X = X.reshape(-1, X.shape[1], X.shape[2], 1)
+    ds = tf.data.Dataset.from_tensor_slices((X, np.asarray(y, dtype=np.int64)))
+    return _finish(ds, batch_size, training, augmentation, cache, len(X), seed)
+
+def make_dataset_from_gesture_dataset(dataset, indices=None, batch_size=32, training=True,
+                                      augmentation=False, cache=False, seed=None):
+    """Stream a memory-mapped gesture_dataset.GestureDataset through tf.data
+
+    Rows are gathered from the memmap in parallel chunks, so the corpus
+    does not have to fit in memory unless cache=True.
+    """
+    indices = np.arange(len(dataset)) if indices is None else np.asarray(indices)
+    size = dataset.header['image_size']
+
+    def gather(idx):
+        order = np.argsort(idx)
+        rows = np.empty((len(idx), size, size, 1), dtype=np.float32)
+        rows[order] = dataset.images[idx[order]][..., None] / np.float32(255.0)
+        return rows, dataset.labels[idx].astype(np.int64)
+
+    def gather_tf(idx):
+        images, labels = tf.numpy_function(gather, [idx], [tf.float32, tf.int64])
+        images.set_shape([None, size, size, 1])
+        labels.set_shape([None])
+        return images, labels
+
+    ds = tf.data.Dataset.from_tensor_slices(indices.astype(np.int64))
+    ds = ds.batch(GATHER_BATCH).map(gather_tf, num_parallel_calls=AUTOTUNE).unbatch()
+    return _finish(ds, batch_size, training, augmentation, cache, min(len(indices), 10000), seed)
+
+def make_stroke_augmented_dataset(values, offsets, y, batch_size=32, augmentation=None, seed=None,
+                                  sequence_points=None):
+    """Training pipeline that re-augments the raw strokes every epoch
+
+    Each pass over the dataset (one Keras epoch) calls the generator again,
+    which augments and rasterizes the whole epoch in one vectorized NumPy
+    call (see gesture_augment.py), so every epoch sees fresh variants.
+    With sequence_points=K it yields (B, K, 2) point sequences instead.
+    """
+    rng = np.random.default_rng(seed)
+    input_shape = [sequence_points, 2] if sequence_points else [IMG_SIZE, IMG_SIZE, 1]
+
+    def epoch():
+        return iter_augmented_batches(values, offsets, y, batch_size, rng, augmentation, sequence_points)
+
+    ds = tf.data.Dataset.from_generator(epoch, output_signature=(
+        tf.TensorSpec([None, *input_shape], tf.float32),
+        tf.TensorSpec([None], tf.int64),
+    ))
+    return ds.prefetch(AUTOTUNE)
+
+def _steps_per_second(iterator, steps, warmup=5):
+    """Time how fast an input pipeline yields batches"""
+    for _ in range(warmup):
+        next(iterator)
+    start = time.perf_counter()
+    for _ in range(steps):
+        next(iterator)
+    return steps / (time.perf_counter() - start)
+
+def benchmark(X, y, steps=200, batch_size=32):
+    """Compare steps/second of ImageDataGenerator.flow and the tf.data pipeline"""
+    X = X.reshape(-1, 28, 28, 1)
+    datagen = keras.preprocessing.image.ImageDataGenerator(
+        fill_mode='constant', cval=0, **DEFAULT_AUGMENTATION
+    )
+    flow = datagen.flow(X, y, batch_size=batch_size)
+    pipeline = make_dataset(X, y, batch_size, training=True, augmentation=None).repeat()
+
+    results = {
+        'ImageDataGenerator': _steps_per_second(iter(flow), steps),
+        'tf.data': _steps_per_second(iter(pipeline), steps),
+    }
+    for name, rate in results.items():
+        print(f"{name:>20}: {rate:8.1f} steps/s")
+    print(f"{'speedup':>20}: {results['tf.data'] / results['ImageDataGenerator']:8.1f}x")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the tf.data gesture input pipeline")
+    parser.add_argument('--steps', type=int, default=200)
+    parser.add_argument('--batch-size', type=int, default=32)
+    args = parser.parse_args()
+
+    X, y, _ = load_training_data()
+    print(f"📊 Benchmarking input pipelines on {len(X)} samples")
+    benchmark(X, y, args.steps, args.batch_size)
+
+if __name__ == "__main__":
+    main()
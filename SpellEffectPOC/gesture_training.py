@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for the VR gesture training scripts
+
+Training manifests record which recordings (by content digest, see
+gesture_cache.py) a model was trained on and which were held out, so a
+later fine-tune knows what is new and evaluates on recordings the model
+has never seen. Also holds the class weighting and conv-block freezing
+used by the fine-tune and transfer scripts.
+"""
+
+import json
+import os
+import sys
+from datetime import datetime, timezone
+import numpy as np
+from gesture_preprocessing import CLASS_NAMES
+
+# --- CONFIGURATION ---
+MANIFEST_PATH = 'vr_gesture_model.manifest.json'
+MANIFEST_VERSION = 2
+HOLDOUT_FRACTION = 0.2
+
+def require_model(path):
+    """Exit with the usual hint when the model to update does not exist"""
+    if not os.path.exists(path):
+        print(f"❌ {path} not found, run train_vr_gesture_model_fixed.py first")
+        sys.exit(1)
+
+def digest_holdout(digests, fraction=HOLDOUT_FRACTION):
+    """Held-out mask decided by each recording's digest alone
+
+    Stays the same however many recordings are added, unlike a
+    train_test_split over the whole corpus.
+    """
+    return np.array([int(d[:8], 16) / 2 ** 32 < fraction for d in digests], dtype=bool)
+
+def write_manifest(trained, held_out, model_path, path=MANIFEST_PATH):
+    """Record the digests a model was trained on and the ones held out from it"""
+    trained, held_out = sorted(set(trained)), sorted(set(held_out))
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'model': model_path,
+        'created': datetime.now(timezone.utc).isoformat(),
+        'trained': trained,
+        'held_out': held_out,
+    }
+    with open(path, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    print(f"📝 Manifest saved: {path} ({len(trained)} trained, {len(held_out)} held out)")
+
+def read_manifest(path=MANIFEST_PATH):
+    """{'trained': set, 'held_out': set} from a manifest, or None if there is none"""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get('version') != MANIFEST_VERSION:
+        print(f"⚠️  Ignoring {path}: manifest version {manifest.get('version')}, expected {MANIFEST_VERSION}")
+        return None
+    return {'trained': set(manifest['trained']), 'held_out': set(manifest['held_out'])}
+
+def assign_split(digests, y, mtime_ns, manifest=None, model_path=None):
+    """(trained, held_out, new) masks over the corpus for updating an existing model
+
+    trained: recordings the model was trained on. held_out: recordings
+    kept out of every training run, including new ones picked by
+    digest_holdout. new: recordings to train on now.
+
+    Without a manifest, recordings modified after model_path count as new
+    and the old ones are split the way the full training scripts do
+    (train_test_split with random_state=42), which reproduces their split
+    as long as the old recordings are unchanged.
+    """
+    from sklearn.model_selection import train_test_split
+
+    digests = list(digests)
+    if manifest is not None:
+        known = np.array([d in manifest['trained'] or d in manifest['held_out'] for d in digests], dtype=bool)
+        trained = np.array([d in manifest['trained'] for d in digests], dtype=bool)
+        # A duplicate of a trained recording is not a held-out one
+        held_out = np.array([d in manifest['held_out'] for d in digests], dtype=bool) & ~trained
+    else:
+        require_model(model_path)
+        print(f"⚠️  No manifest, treating recordings modified after {model_path} as new")
+        known = mtime_ns <= os.stat(model_path).st_mtime_ns
+        old = np.flatnonzero(known)
+        trained = np.zeros(len(digests), dtype=bool)
+        if len(old):
+            old_train, _ = train_test_split(old, test_size=HOLDOUT_FRACTION, stratify=y[old], random_state=42)
+            trained[old_train] = True
+        held_out = known & ~trained
+
+    unknown_held_out = ~known & digest_holdout(digests)
+    held_out |= unknown_held_out
+    new = ~known & ~unknown_held_out
+    return trained, held_out, new
+
+def class_weights(y, num_classes=len(CLASS_NAMES)):
+    """Inverse-frequency class weights, like train_vr_gesture_model_fixed.py"""
+    counts = np.bincount(y, minlength=num_classes)
+    return {i: len(y) / (num_classes * counts[i]) if counts[i] else 1.0 for i in range(num_classes)}
+
+def freeze_conv_blocks(model, blocks):
+    """Freeze every layer before the (blocks + 1)-th Conv2D; returns the frozen layer names"""
+    from tensorflow import keras
+
+    conv = [i for i, layer in enumerate(model.layers) if isinstance(layer, keras.layers.Conv2D)]
+    stop = conv[blocks] if blocks < len(conv) else len(model.layers)
+    for layer in model.layers[:stop]:
+        layer.trainable = False  # BatchNormalization also switches to inference mode
+    return [layer.name for layer in model.layers[:stop] if layer.weights]
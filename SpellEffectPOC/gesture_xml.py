@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Fast reader for gesture XML recordings
+
+MovementRecognizer.SaveGestureToXML always writes the same layout:
+
+    <Gesture Name = "cast_protego">
+        <Stroke>
+            <Point X = "4.67" Y = "1.42" T = "0" Pressure = "0" />
+
+Files in that layout are byte-scanned straight into a float32 buffer without
+building a DOM. Anything else (hand-edited files, other attribute order,
+unparseable numbers) falls back to a streaming ElementTree iterparse.
+"""
+
+import io
+import re
+import numpy as np
+import xml.etree.ElementTree as ET
+
+_GESTURE_NAME_RE = re.compile(rb'<Gesture\s+Name\s*=\s*"([^"]*)"')
+_POINT_TAG = b'<Point'
+_POINT_X = b'<Point X = "'
+_POINT_Y = b'" Y = "'
+_QUOTES_PER_POINT = 8  # X, Y, T and Pressure values
+
+def _scan_fixed_layout(data):
+    """Byte-scan a file in the SaveGestureToXML layout, or return None if it isn't one"""
+    start = data.find(_POINT_TAG)
+    name_match = _GESTURE_NAME_RE.search(data, 0, start if start >= 0 else len(data))
+    if name_match is None:
+        return None
+    name = name_match.group(1).decode('utf-8')
+
+    if start < 0:
+        return name, np.zeros((0, 2), dtype=np.float32)
+
+    # Splitting on quotes leaves every attribute value at a fixed stride
+    parts = data[start:].split(b'"')
+    n = (len(parts) - 1) // _QUOTES_PER_POINT
+    if (len(parts) != n * _QUOTES_PER_POINT + 1
+            or data.count(_POINT_TAG, start) != n
+            or data.count(_POINT_X, start) != n
+            or data.count(_POINT_Y, start) != n):
+        return None
+
+    points = np.empty((n, 2), dtype=np.float32)
+    try:
+        points[:, 0] = parts[1::_QUOTES_PER_POINT]
+        points[:, 1] = parts[3::_QUOTES_PER_POINT]
+    except ValueError:
+        return None
+    return name, points
+
+def _parse_general(data):
+    """Stream any gesture XML with iterparse, skipping points without valid X/Y"""
+    name = None
+    points = np.empty((max(data.count(_POINT_TAG), 1), 2), dtype=np.float32)
+    count = 0
+
+    for event, elem in ET.iterparse(io.BytesIO(data), events=('start', 'end')):
+        if event == 'start':
+            if name is None:
+                name = elem.get('Name', '')
+            continue
+        if elem.tag != 'Point':
+            continue
+
+        x_str = elem.get('X')
+        y_str = elem.get('Y')
+        elem.clear()
+        if not (x_str and y_str):
+            continue
+        try:
+            x = float(x_str.strip())
+            y = float(y_str.strip())
+        except ValueError:
+            continue
+
+        points[count] = x, y
+        count += 1
+
+    return name or None, points[:count]
+
+def parse_gesture_bytes(data):
+    """Parse gesture XML bytes into (name, (P, 2) float32 points)"""
+    result = _scan_fixed_layout(data)
+    if result is None:
+        result = _parse_general(data)
+    return result
+
+def read_gesture_xml(xml_file):
+    """Read a gesture XML file and return its Name attribute and points"""
+    with open(xml_file, 'rb') as f:
+        data = f.read()
+    return parse_gesture_bytes(data)
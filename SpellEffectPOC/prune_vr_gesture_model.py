@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Structured pruning / channel slimming for the VR gesture CNN
+
+Scores every conv filter and hidden dense unit of a trained
+create_cnn_model network on training images (first-order Taylor:
+|sum of activation x gradient|), rebuilds a physically narrower
+create_cnn_model with only the most important ones, copies their weights
+over, fine-tunes briefly and exports through the normal ONNX path. Each
+sparsity level is reported as parameters, FLOPs, latency and accuracy on
+the held-out split, which the importance scores never see:
+
+    python prune_vr_gesture_model.py [vr_gesture_model.h5] [--sparsity 0.25 0.5 0.75] [--finetune-epochs 5]
+"""
+
+import argparse
+import json
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+from sklearn.model_selection import train_test_split
+from benchmark_inference import evaluate_onnx
+from gesture_onnx_export import export_keras_model, model_stats
+from gesture_preprocessing import load_training_data, load_training_points, select_gestures
+from gesture_tf_data import make_dataset, make_stroke_augmented_dataset
+from train_vr_gesture_model_fixed import create_cnn_model
+
+# --- CONFIGURATION ---
+INPUT_MODEL = 'vr_gesture_model.h5'
+SPARSITY_LEVELS = [0.25, 0.5, 0.75]
+FINETUNE_EPOCHS = 5
+PRUNED_PATTERN = 'vr_gesture_pruned_{percent}'  # .h5 / .onnx
+REPORT_JSON = 'pruning_report.json'
+IMPORTANCE_SAMPLES = 512  # Training images the channel importance is scored on
+
+def prunable_layers(model):
+    """Conv2D and hidden Dense layers in order (the output layer is never pruned)"""
+    layers = [layer for layer in model.layers if isinstance(layer, (keras.layers.Conv2D, keras.layers.Dense))]
+    return layers[:-1]
+
+def channel_importance(model, X, y, batch_size=64):
+    """First-order Taylor importance of every output channel/unit of each prunable layer"""
+    layers = prunable_layers(model)
+    probe = keras.Model(model.input, [layer.output for layer in layers] + [model.output])
+    loss_fn = keras.losses.SparseCategoricalCrossentropy()
+    scores = [np.zeros(layer.output.shape[-1]) for layer in layers]
+
+    for start in range(0, len(X), batch_size):
+        x = tf.constant(X[start:start + batch_size], dtype=tf.float32)
+        with tf.GradientTape() as tape:
+            *activations, output = probe(x, training=False)
+            loss = loss_fn(y[start:start + batch_size], output)
+        grads = tape.gradient(loss, activations)
+        for i, (a, g) in enumerate(zip(activations, grads)):
+            # Per-sample contribution of removing the channel, summed over positions
+            axes = list(range(1, len(a.shape) - 1))
+            contribution = tf.reduce_sum(a * g, axis=axes) if axes else a * g
+            scores[i] += np.abs(contribution.numpy()).sum(axis=0)
+    return [score / len(X) for score in scores]
+
+def keep_indices(scores, sparsity):
+    """Indices of the most important channels per layer, in original order"""
+    keep = []
+    for score in scores:
+        count = max(1, int(round(len(score) * (1 - sparsity))))
+        keep.append(np.sort(np.argsort(score)[::-1][:count]))
+    return keep
+
+def slim_model(model, keep):
+    """Build a narrower create_cnn_model and copy the kept filters/units into it"""
+    slim = create_cnn_model(conv_channels=[len(k) for k in keep[:3]], dense_units=[len(k) for k in keep[3:]])
+    groups = iter(keep + [None])  # None: keep every unit of the output layer
+    previous = np.arange(model.input.shape[-1])
+
+    for source, target in zip(model.layers, slim.layers):
+        weights = source.get_weights()
+        if isinstance(source, keras.layers.Conv2D):
+            out = next(groups)
+            out = np.arange(weights[0].shape[-1]) if out is None else out
+            target.set_weights([weights[0][:, :, previous][..., out], weights[1][out]])
+            previous = out
+        elif isinstance(source, keras.layers.Dense):
+            out = next(groups)
+            out = np.arange(weights[0].shape[-1]) if out is None else out
+            target.set_weights([weights[0][previous][:, out], weights[1][out]])
+            previous = out
+        elif isinstance(source, keras.layers.BatchNormalization):
+            target.set_weights([w[previous] for w in weights])
+    return slim
+
+def fine_tune(model, train_ds, test_ds, epochs):
+    """Short low-learning-rate recovery training after slimming"""
+    model.compile(
+        optimizer=keras.optimizers.Adam(learning_rate=0.0003),
+        loss='sparse_categorical_crossentropy',
+        metrics=['accuracy']
+    )
+    if epochs > 0:
+        model.fit(train_ds, epochs=epochs, validation_data=test_ds, verbose=2)
+    return model
+
+def main():
+    parser = argparse.ArgumentParser(description="Prune whole filters/units from the gesture CNN")
+    parser.add_argument('model', nargs='?', default=INPUT_MODEL, help="Trained create_cnn_model network")
+    parser.add_argument('--sparsity', type=float, nargs='+', default=SPARSITY_LEVELS,
+                        help="Fraction of filters/units removed from every prunable layer")
+    parser.add_argument('--finetune-epochs', type=int, default=FINETUNE_EPOCHS)
+    args = parser.parse_args()
+
+    print("✂️  VR Gesture Model Pruning")
+    print("=" * 40)
+
+    X, y, class_names = load_training_data()
+    X = X.reshape(-1, 28, 28, 1).astype(np.float32)
+    train_idx, test_idx = train_test_split(
+        np.arange(len(y)), test_size=0.2, stratify=y, random_state=42
+    )
+    X_test, y_test = X[test_idx], y[test_idx]
+    # Scored on training images so the accuracy reported below stays an unbiased held-out number
+    if len(train_idx) > IMPORTANCE_SAMPLES:
+        importance_idx, _ = train_test_split(
+            train_idx, train_size=IMPORTANCE_SAMPLES, stratify=y[train_idx], random_state=42
+        )
+    else:
+        importance_idx = train_idx
+
+    values, offsets, _, _ = load_training_points()
+    train_ds = make_stroke_augmented_dataset(*select_gestures(values, offsets, train_idx), y[train_idx], batch_size=32)
+    test_ds = make_dataset(X_test, y_test, batch_size=64, training=False)
+
+    model = keras.models.load_model(args.model, compile=False)
+    scores = channel_importance(model, X[importance_idx], y[importance_idx])
+    print(f"📏 Importance scored on {len(importance_idx)} training images")
+    for layer, score in zip(prunable_layers(model), scores):
+        print(f"   {layer.name}: {len(score)} channels, importance {score.min():.2e}..{score.max():.2e}")
+
+    variants = {0.0: PRUNED_PATTERN.format(percent=0) + '.onnx'}
+    export_keras_model(model, variants[0.0])
+    for sparsity in sorted(args.sparsity):
+        percent = int(round(sparsity * 100))
+        keep = keep_indices(scores, sparsity)
+        print(f"\n🔧 Sparsity {percent}%: layer widths {[len(k) for k in keep]}")
+        slim = fine_tune(slim_model(model, keep), train_ds, test_ds, args.finetune_epochs)
+        name = PRUNED_PATTERN.format(percent=percent)
+        slim.save(f"{name}.h5")
+        export_keras_model(slim, f"{name}.onnx")
+        variants[sparsity] = f"{name}.onnx"
+
+    results = []
+    print(f"\n{'sparsity':>9} {'params':>9} {'FLOPs':>11} {'KB':>7} {'p50 ms':>7} {'p95 ms':>7} {'accuracy':>9}")
+    for sparsity, path in variants.items():
+        result = dict(evaluate_onnx(path, X_test, y_test), sparsity=sparsity, **model_stats(path))
+        results.append(result)
+        print(f"{sparsity:>9.0%} {result['params']:>9,} {result['flops']:>11,} {result['size_bytes'] / 1024:>7.1f} "
+              f"{result['latency_ms']['p50']:>7.3f} {result['latency_ms']['p95']:>7.3f} {result['accuracy']:>9.4f}")
+
+    with open(REPORT_JSON, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Report saved: {REPORT_JSON}")
+
+if __name__ == "__main__":
+    main()
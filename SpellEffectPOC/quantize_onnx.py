@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Post-training quantization of the exported gesture model
+
+Produces INT8 (static, calibrated on real gesture rasters) and FP16
+variants of an FP32 ONNX model, then reports size, onnxruntime latency
+and held-out accuracy against the FP32 original and picks the smallest
+variant within the accuracy budget:
+
+    python quantize_onnx.py [vr_gesture_model.onnx] [--max-accuracy-drop 0.01]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import numpy as np
+from sklearn.model_selection import train_test_split
+from benchmark_inference import evaluate_onnx
+from gesture_preprocessing import load_training_data
+
+INPUT_MODEL = 'vr_gesture_model.onnx'
+CALIBRATION_SAMPLES = 200
+LATENCY_RUNS = 300
+REPORT_JSON = 'quantization_report.json'
+
+class GestureCalibrationReader:
+    """Feeds calibration rasters to onnxruntime's static quantizer one at a time"""
+
+    def __init__(self, images, input_name):
+        self.input_name = input_name
+        self.images = images
+        self.reset()
+
+    def get_next(self):
+        image = next(self.iterator, None)
+        return None if image is None else {self.input_name: image[None]}
+
+    def reset(self):
+        self.iterator = iter(self.images)
+
+def calibration_sample(X, y, n=CALIBRATION_SAMPLES, seed=42):
+    """Class-stratified sample of training rasters for calibration"""
+    if n >= len(X):
+        return X
+    sample, _ = train_test_split(X, train_size=n, stratify=y, random_state=seed)
+    return sample
+
+def quantize_int8(fp32_path, out_path, calibration_images):
+    """Static INT8 quantization (QDQ, per-channel weights) calibrated on real gestures"""
+    import onnx
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    input_name = onnx.load(fp32_path).graph.input[0].name
+    prepared_path = out_path + '.prep.onnx'
+    quant_pre_process(fp32_path, prepared_path, skip_symbolic_shape=True)
+    try:
+        quantize_static(
+            prepared_path,
+            out_path,
+            GestureCalibrationReader(calibration_images, input_name),
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+        )
+    finally:
+        os.remove(prepared_path)
+
+def convert_fp16(fp32_path, out_path):
+    """FP16 weights and activations, keeping float32 inputs/outputs for the caller"""
+    import onnx
+    from onnxconverter_common import float16
+
+    model = float16.convert_float_to_float16(onnx.load(fp32_path), keep_io_types=True)
+    onnx.save(model, out_path)
+
+def choose_variant(results, max_accuracy_drop, prefer='size'):
+    """Smallest (or fastest) variant whose accuracy stays within the budget"""
+    baseline = results['fp32']['accuracy']
+    eligible = [name for name, r in results.items() if baseline - r['accuracy'] <= max_accuracy_drop]
+
+    def size(name):
+        return results[name]['size_bytes']
+
+    def speed(name):
+        return results[name]['latency_ms']['p50']
+
+    if prefer == 'speed':
+        return min(eligible, key=lambda name: (speed(name), size(name)))
+    return min(eligible, key=lambda name: (size(name), speed(name)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantize the gesture ONNX model to INT8 and FP16")
+    parser.add_argument('model', nargs='?', default=INPUT_MODEL, help="FP32 ONNX model")
+    parser.add_argument('--max-accuracy-drop', type=float, default=0.01,
+                        help="Largest held-out accuracy loss allowed vs FP32 (default: 0.01)")
+    parser.add_argument('--prefer', choices=['size', 'speed'], default='size',
+                        help="Pick the smallest or the fastest eligible variant (default: size)")
+    parser.add_argument('--calibration-samples', type=int, default=CALIBRATION_SAMPLES)
+    parser.add_argument('--ship', default=None,
+                        help="Copy the chosen variant to this path (e.g. vr_gesture_model.quantized.onnx)")
+    args = parser.parse_args()
+
+    print("🔢 Gesture model quantization")
+    print("=" * 30)
+
+    X, y, _ = load_training_data()
+    X = X.reshape(-1, 28, 28, 1).astype(np.float32)
+
+    # Same held-out split as the training scripts; calibrate on training data only
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, stratify=y, random_state=42
+    )
+    calibration_images = calibration_sample(X_train, y_train, args.calibration_samples)
+    print(f"Calibration: {len(calibration_images)} samples, held-out: {len(X_test)} samples")
+
+    stem = os.path.splitext(args.model)[0]
+    variants = {'fp32': args.model}
+
+    try:
+        quantize_int8(args.model, f"{stem}.int8.onnx", calibration_images)
+        variants['int8'] = f"{stem}.int8.onnx"
+    except ImportError:
+        print("onnxruntime quantization not available. Install with: pip install onnxruntime onnx")
+    except Exception as e:
+        print(f"⚠️  INT8 quantization failed: {e}")
+
+    try:
+        convert_fp16(args.model, f"{stem}.fp16.onnx")
+        variants['fp16'] = f"{stem}.fp16.onnx"
+    except ImportError:
+        print("onnxconverter-common not installed. Install with: pip install onnxconverter-common")
+    except Exception as e:
+        print(f"⚠️  FP16 conversion failed: {e}")
+
+    results = {name: evaluate_onnx(path, X_test, y_test, LATENCY_RUNS) for name, path in variants.items()}
+    baseline = results['fp32']
+
+    print(f"\n{'variant':>8} {'size KB':>9} {'p50 ms':>8} {'p95 ms':>8} {'accuracy':>9} {'delta':>7}")
+    for name, r in results.items():
+        print(f"{name:>8} {r['size_bytes'] / 1024:>9.1f} {r['latency_ms']['p50']:>8.3f} "
+              f"{r['latency_ms']['p95']:>8.3f} {r['accuracy']:>9.4f} {r['accuracy'] - baseline['accuracy']:>+7.4f}")
+
+    chosen = choose_variant(results, args.max_accuracy_drop, args.prefer)
+    label = 'Smallest' if args.prefer == 'size' else 'Fastest'
+    print(f"\n✅ {label} variant within {args.max_accuracy_drop:.2%} accuracy: {chosen} ({variants[chosen]})")
+    if args.ship:
+        shutil.copyfile(variants[chosen], args.ship)
+        print(f"📁 Copied to {args.ship}")
+
+    with open(REPORT_JSON, 'w') as f:
+        json.dump({'max_accuracy_drop': args.max_accuracy_drop, 'chosen': chosen, 'variants': results}, f, indent=2)
+    print(f"💾 Report saved: {REPORT_JSON}")
+
+if __name__ == "__main__":
+    main()
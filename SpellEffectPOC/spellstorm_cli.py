@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""
+Single entry point for the gesture data and model tools
+
+    python spellstorm_cli.py stats [--dataset vr_gesture_dataset] [--points]
+    python spellstorm_cli.py render [xml files/dirs...] [--out gesture_previews] [--sheet sheet.png]
+    python spellstorm_cli.py rename FOLDER [--prefix cast_] [--keep-meta]
+    python spellstorm_cli.py ingest [convert_vr_gestures_to_images.py args...]
+    python spellstorm_cli.py train [--script fixed|finetune|...] [script args...]
+    python spellstorm_cli.py export MODEL [--out path] [--level basic|extended]
+    python spellstorm_cli.py bench [benchmark_inference.py args...]
+    python spellstorm_cli.py check-startup [--budget-ms 1000]
+    python spellstorm_cli.py check-resample [--strokes 100000] [--min-rate 100000]
+    python spellstorm_cli.py check-passthrough
+
+Only the standard library is imported at startup. Data-wrangling commands
+(stats, render, rename, ingest) need nothing beyond NumPy, so cron jobs
+never pay for TensorFlow; train, export and bench import their frameworks
+inside the command. check-startup is the regression check for that: it
+runs the light commands in fresh interpreters, times them and fails if
+any deep-learning or vision module got loaded. check-resample checks the
+batched resampler against a per-gesture np.interp loop and its throughput
+against the --min-rate strokes per second target. check-passthrough checks
+that ingest/train/export/bench forward their unknown arguments unchanged.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+# --- CONFIGURATION ---
+PREVIEW_DIR = 'gesture_previews'
+PREVIEW_SCALE = 4      # Nearest-neighbour upscaling of the 28x28 previews
+SHEET_COLUMNS = 16
+STARTUP_BUDGET_MS = 1000
+STARTUP_RUNS = 3
+HEAVY_MODULES = ('tensorflow', 'keras', 'tf2onnx', 'torch', 'sklearn', 'cv2', 'onnxruntime', 'onnx')
+LIGHT_COMMANDS = [['--help'], ['stats'], ['stats', '--points']]
+RESAMPLE_POINTS = [2, 8, 28, 32, 64]   # K values checked against the reference loop
+RESAMPLE_STROKES = 100000
+RESAMPLE_MIN_RATE = 100000            # Strokes per second on one core
+RESAMPLE_TOLERANCE = 1e-9
+
+# (argv, expected attributes) for check-passthrough; 'args' is what the wrapped script receives
+PASSTHROUGH_CASES = [
+    (['ingest', '--workers', '4', '--no-png'], {'args': ['--workers', '4', '--no-png']}),
+    (['ingest', '--', '--help'], {'args': ['--help']}),
+    (['bench', '--runs', '10', 'vr_gesture_model.onnx'], {'args': ['--runs', '10', 'vr_gesture_model.onnx']}),
+    (['train', '--script', 'finetune', '--dry-run'], {'script': 'finetune', 'args': ['--dry-run']}),
+    (['train', '--epochs', '5', '--script', 'transfer'], {'script': 'transfer', 'args': ['--epochs', '5']}),
+    (['train', '--', '--script', 'x'], {'script': 'fixed', 'args': ['--script', 'x']}),
+    (['export', 'm.h5', '--out', 'x.onnx', '--level', 'none'],
+     {'model': 'm.h5', 'out': 'x.onnx', 'level': 'none', 'args': []}),
+    (['export', 'm.onnx', '--level', 'extended', '--', '--extra'],
+     {'model': 'm.onnx', 'level': 'extended', 'args': ['--extra']}),
+]
+REJECTED_CASES = [['stats', '--workers', '4'], ['rename', 'folder', '--bogus']]
+
+# Scripts behind "train --script"; they are run as __main__ with the remaining arguments
+TRAIN_SCRIPTS = {
+    'fixed': 'train_vr_gesture_model_fixed',
+    'sequence': 'train_vr_sequence_model',
+    'distilled': 'train_vr_distilled_model',
+    'prune': 'prune_vr_gesture_model',
+    'finetune': 'train_vr_finetune',
+    'transfer': 'train_vr_transfer',
+    'sweep': 'sweep_vr_gesture_model',
+    'functional': 'train_vr_functional',
+    'simple': 'train_simple',
+    'legacy': 'train_vr_gesture_model',
+    'quickdraw': 'train_gesture_model',
+}
+
+# --- HELPERS ---
+def run_script(module, args):
+    """Run one of the repo scripts as if it were started from the command line"""
+    import runpy
+
+    sys.argv = [module + '.py'] + list(args)
+    runpy.run_module(module, run_name='__main__', alter_sys=True)
+
+def find_xml_files(paths):
+    """XML files given directly or found recursively under directories, sorted"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in names if name.endswith('.xml'))
+        elif path.endswith('.xml'):
+            files.append(path)
+    return sorted(files)
+
+def write_png(path, image):
+    """Write a 2D uint8 array as a grayscale PNG with only zlib (no cv2/PIL)"""
+    import struct
+    import zlib
+    import numpy as np
+
+    height, width = image.shape
+    # Every scanline starts with filter type 0 (none)
+    raw = np.hstack([np.zeros((height, 1), dtype=np.uint8), image.astype(np.uint8)]).tobytes()
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data))
+
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(raw)))
+        f.write(chunk(b'IEND', b''))
+
+def contact_sheet(images, columns=SHEET_COLUMNS, gap=1):
+    """Tile (N, h, w) images into one grid image with gap-pixel gray lines"""
+    import numpy as np
+
+    count, height, width = images.shape
+    rows = max(1, -(-count // columns))
+    columns = min(columns, max(count, 1))
+    sheet = np.full((rows * (height + gap) + gap, columns * (width + gap) + gap), 64, dtype=np.uint8)
+    for i, image in enumerate(images):
+        top = gap + (i // columns) * (height + gap)
+        left = gap + (i % columns) * (width + gap)
+        sheet[top:top + height, left:left + width] = image
+    return sheet
+
+# --- COMMANDS ---
+def cmd_stats(args):
+    """Samples per class from the XML tree (file listing only) or a memmap dataset"""
+    if args.dataset:
+        import numpy as np
+        from gesture_dataset import GestureDataset
+
+        dataset = GestureDataset(args.dataset)
+        counts = np.bincount(dataset.labels, minlength=len(dataset.label_names))
+        print(f"📊 {args.dataset}: {len(dataset)} gestures, {dataset.header['num_points']:,} points")
+        for name, count in zip(dataset.label_names, counts):
+            print(f"   {name:<24} {count:>6}")
+        return 0
+
+    from gesture_preprocessing import CLASS_NAMES, TRAINING_DATA_DIR
+
+    data_dir = args.data_dir or TRAINING_DATA_DIR
+    if not os.path.isdir(data_dir):
+        print(f"❌ {data_dir} not found")
+        return 1
+    classes = sorted(entry.name for entry in os.scandir(data_dir) if entry.is_dir())
+    counts = {name: len(find_xml_files([os.path.join(data_dir, name)])) for name in classes}
+
+    points = {}
+    if args.points:
+        # Parses through the preprocessing cache, so only new recordings cost anything
+        import numpy as np
+        from gesture_preprocessing import load_training_points
+
+        values, offsets, y, class_names = load_training_points(data_dir, classes)
+        lengths = np.diff(offsets)
+        points = {name: lengths[y == i] for i, name in enumerate(class_names)}
+
+    print(f"📊 {data_dir}: {sum(counts.values())} recordings in {len(classes)} classes")
+    for name in classes:
+        line = f"   {name:<24} {counts[name]:>6}"
+        if name in points:
+            lengths = points[name]
+            line += f"  valid {len(lengths):>5}"
+            if len(lengths):
+                line += f"  points min/median/max {lengths.min()}/{int(np.median(lengths))}/{lengths.max()}"
+        if name not in CLASS_NAMES:
+            line += "  (not a training class)"
+        print(line)
+    return 0
+
+def cmd_render(args):
+    """Rasterize recordings to upscaled PNG previews, one per file or one contact sheet"""
+    import numpy as np
+    from gesture_preprocessing import MIN_POINTS, TRAINING_DATA_DIR, pack_points, packed_points_to_images
+    from gesture_xml import read_gesture_xml
+
+    paths = args.inputs or [TRAINING_DATA_DIR]
+    files = find_xml_files(paths)
+    if args.limit:
+        files = files[:args.limit]
+
+    kept, points_list = [], []
+    for path in files:
+        try:
+            _, points = read_gesture_xml(path)
+        except Exception as e:
+            print(f"Error parsing {path}: {e}")
+            continue
+        if len(points) < MIN_POINTS:
+            print(f"Skipping {path}: too few points")
+            continue
+        kept.append(path)
+        points_list.append(points)
+    if not kept:
+        print("❌ No gestures to render")
+        return 1
+
+    images = (packed_points_to_images(*pack_points(points_list)) * 255).astype(np.uint8)
+    if args.scale > 1:
+        images = images.repeat(args.scale, axis=1).repeat(args.scale, axis=2)
+
+    if args.sheet:
+        write_png(args.sheet, contact_sheet(images, args.columns))
+        print(f"🖼️  {len(kept)} gestures -> {args.sheet}")
+        return 0
+
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in kept])
+    for path, image in zip(kept, images):
+        out_png = os.path.join(args.out, os.path.relpath(os.path.abspath(path), root)[:-len('.xml')] + '.png')
+        os.makedirs(os.path.dirname(out_png), exist_ok=True)
+        write_png(out_png, image)
+    print(f"🖼️  {len(kept)} previews -> {args.out}/")
+    return 0
+
+def cmd_rename(args):
+    """add_cast_prefix.py for any folder"""
+    from add_cast_prefix import add_cast_prefix
+
+    add_cast_prefix(args.folder, args.prefix, delete_meta=not args.keep_meta)
+    return 0
+
+def cmd_ingest(args):
+    run_script('convert_vr_gestures_to_images', args.args)
+    return 0
+
+def cmd_train(args):
+    run_script(TRAIN_SCRIPTS[args.script], args.args)
+    return 0
+
+def cmd_export(args):
+    """Upgrade an existing .onnx in place, or convert a Keras model to ONNX"""
+    if args.model.endswith('.onnx'):
+        out = ['--out', args.out] if args.out else []
+        run_script('gesture_onnx_export', [args.model, '--level', args.level] + out + args.args)
+        return 0
+
+    from tensorflow import keras
+    from gesture_onnx_export import export_keras_model
+
+    if args.args:
+        print(f"❌ Unsupported arguments for a Keras model: {' '.join(args.args)}")
+        return 2
+    out = args.out or os.path.splitext(args.model)[0] + '.onnx'
+    model = keras.models.load_model(args.model, compile=False)
+    export_keras_model(model, out, level=args.level, input_shape=tuple(model.input_shape[1:]))
+    print(f"✅ {args.model} -> {out}")
+    return 0
+
+def cmd_bench(args):
+    run_script('benchmark_inference', args.args)
+    return 0
+
+def time_baseline(runs=STARTUP_RUNS):
+    """Best-of-runs wall time (ms) of an empty interpreter, for reference"""
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'pass'], check=True)
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best
+
+def time_command(command, runs=STARTUP_RUNS):
+    """Best-of-runs wall time (ms) of a CLI command in a fresh interpreter, plus heavy modules it loaded"""
+    marker = '@@heavy-modules@@'
+    probe = (
+        "import runpy, sys\n"
+        f"sys.argv = {[os.path.abspath(__file__)] + command!r}\n"
+        "try:\n"
+        "    runpy.run_path(sys.argv[0], run_name='__main__')\n"
+        "finally:\n"
+        f"    heavy = sorted({{m.split('.')[0] for m in sys.modules}} & set({list(HEAVY_MODULES)!r}))\n"
+        f"    print({marker!r} + ','.join(heavy))\n"
+    )
+    best, heavy = float('inf'), []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True)
+        best = min(best, (time.perf_counter() - start) * 1000)
+        lines = [line for line in result.stdout.splitlines() if line.startswith(marker)]
+        heavy = lines[-1][len(marker):].split(',') if lines and lines[-1] != marker else []
+    return best, heavy
+
+def cmd_check_startup(args):
+    """Fail if a light command loads a heavy framework or starts slower than the budget"""
+    baseline = time_baseline(args.runs)
+    print(f"⏱️  Interpreter baseline: {baseline:.0f} ms (budget {args.budget_ms} ms per command)")
+
+    failures = 0
+    for command in LIGHT_COMMANDS:
+        elapsed, heavy = time_command(command, args.runs)
+        ok = elapsed <= args.budget_ms and not heavy
+        failures += not ok
+        note = f"  loaded {', '.join(heavy)}" if heavy else ""
+        print(f"   {'✅' if ok else '❌'} {' '.join(command):<16} {elapsed:>6.0f} ms{note}")
+
+    if failures:
+        print(f"❌ {failures} command(s) regressed")
+        return 1
+    print("✅ Light commands start without any deep-learning runtime")
+    return 0
+
+def resample_reference(values, offsets, num_points):
+    """One np.interp per gesture and coordinate, the straightforward version of resample_gestures"""
+    import numpy as np
+
+    resampled = np.zeros((len(offsets) - 1, num_points, 2))
+    for i in range(len(offsets) - 1):
+        points = values[offsets[i]:offsets[i + 1]]
+        if len(points) == 0:
+            continue
+        arc = np.concatenate([[0.0], np.cumsum(np.linalg.norm(np.diff(points, axis=0), axis=1))])
+        if arc[-1] == 0:
+            resampled[i] = points[0]
+            continue
+        targets = np.linspace(0, arc[-1], num_points)
+        resampled[i, :, 0] = np.interp(targets, arc, points[:, 0])
+        resampled[i, :, 1] = np.interp(targets, arc, points[:, 1])
+    return resampled
+
+def cmd_check_resample(args):
+    """Fail if resample_gestures disagrees with the reference loop or misses the throughput target"""
+    import numpy as np
+    from gesture_preprocessing import SEQUENCE_POINTS, load_training_points, resample_gestures
+
+    values, offsets, _, _ = load_training_points()
+    failures = 0
+    for num_points in RESAMPLE_POINTS:
+        error = np.abs(resample_gestures(values, offsets, num_points)
+                       - resample_reference(values, offsets, num_points)).max()
+        ok = error <= RESAMPLE_TOLERANCE
+        failures += not ok
+        print(f"   {'✅' if ok else '❌'} K={num_points:<3} max difference {error:.2e}")
+
+    # Tile the corpus up to the requested batch size
+    lengths = np.diff(offsets)
+    reps = -(-args.strokes // len(lengths))
+    tiled_values = np.tile(values, (reps, 1))
+    tiled_offsets = np.concatenate([[0], np.cumsum(np.tile(lengths, reps))])
+    best = float('inf')
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        resample_gestures(tiled_values, tiled_offsets, SEQUENCE_POINTS)
+        best = min(best, time.perf_counter() - start)
+    rate = len(lengths) * reps / best
+    ok = rate >= args.min_rate
+    failures += not ok
+    print(f"   {'✅' if ok else '❌'} {len(lengths) * reps} strokes to K={SEQUENCE_POINTS} in {best * 1000:.0f} ms: "
+          f"{rate:,.0f} strokes/s (target {args.min_rate:,.0f})")
+
+    if failures:
+        print(f"❌ {failures} resampler check(s) failed")
+        return 1
+    print("✅ Batched resampler matches the reference and meets the throughput target")
+    return 0
+
+def cmd_check_passthrough(args):
+    """Fail if a wrapper subcommand does not forward its unknown arguments unchanged"""
+    import contextlib
+    import io
+
+    failures = 0
+    for argv, expected in PASSTHROUGH_CASES:
+        try:
+            parsed = vars(parse_args(argv))
+            wrong = {k: parsed.get(k) for k, v in expected.items() if parsed.get(k) != v}
+        except SystemExit:
+            wrong = {'error': 'rejected'}
+        failures += bool(wrong)
+        note = f"  got {wrong}" if wrong else ""
+        print(f"   {'✅' if not wrong else '❌'} {' '.join(argv)}{note}")
+
+    for argv in REJECTED_CASES:
+        try:
+            with contextlib.redirect_stderr(io.StringIO()):
+                parse_args(argv)
+            ok = False
+        except SystemExit:
+            ok = True
+        failures += not ok
+        print(f"   {'✅' if ok else '❌'} {' '.join(argv)}  (must be rejected)")
+
+    if failures:
+        print(f"❌ {failures} pass-through case(s) failed")
+        return 1
+    print("✅ Wrapper subcommands forward their arguments")
+    return 0
+
+# --- MAIN ---
+def build_parser():
+    parser = argparse.ArgumentParser(description="Hogwarts Spellstorm gesture tools")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    stats = commands.add_parser('stats', help="Samples per class")
+    stats.add_argument('--data-dir', default=None, help="Training XML tree (one folder per class)")
+    stats.add_argument('--dataset', default=None, help="Memory-mapped dataset directory instead of XMLs")
+    stats.add_argument('--points', action='store_true', help="Also parse recordings: valid count and points per gesture")
+    stats.set_defaults(func=cmd_stats)
+
+    render = commands.add_parser('render', help="Rasterize recordings to PNG previews")
+    render.add_argument('inputs', nargs='*', help="XML files or directories (default: training tree)")
+    render.add_argument('--out', default=PREVIEW_DIR)
+    render.add_argument('--sheet', default=None, help="Write one contact-sheet PNG instead of one PNG per file")
+    render.add_argument('--columns', type=int, default=SHEET_COLUMNS)
+    render.add_argument('--scale', type=int, default=PREVIEW_SCALE)
+    render.add_argument('--limit', type=int, default=None, help="Render only the first N files")
+    render.set_defaults(func=cmd_render)
+
+    rename = commands.add_parser('rename', help="Add the cast_ prefix to XML files and delete .meta files")
+    rename.add_argument('folder')
+    rename.add_argument('--prefix', default='cast_')
+    rename.add_argument('--keep-meta', action='store_true')
+    rename.set_defaults(func=cmd_rename)
+
+    ingest = commands.add_parser('ingest', help="Convert XML recordings into the memmap dataset")
+    ingest.set_defaults(func=cmd_ingest, passthrough="convert_vr_gestures_to_images.py")
+
+    train = commands.add_parser('train', help="Run a training script")
+    train.add_argument('--script', choices=sorted(TRAIN_SCRIPTS), default='fixed')
+    train.set_defaults(func=cmd_train, passthrough="the training script")
+
+    export = commands.add_parser('export', help="Export a Keras model, or upgrade an ONNX model")
+    export.add_argument('model')
+    export.add_argument('--out', default=None, help="Output .onnx (default: next to the model)")
+    export.add_argument('--level', choices=('none', 'basic', 'extended'), default='basic')
+    export.set_defaults(func=cmd_export, passthrough="gesture_onnx_export.py (.onnx input only)")
+
+    bench = commands.add_parser('bench', help="Benchmark exported models")
+    bench.set_defaults(func=cmd_bench, passthrough="benchmark_inference.py")
+    for wrapper in (ingest, train, export, bench):
+        wrapper.epilog = f"Other arguments go to {wrapper.get_default('passthrough')} (put -- before its --help)."
+
+    check = commands.add_parser('check-startup', help="Startup-time and lazy-import regression check")
+    check.add_argument('--budget-ms', type=float, default=STARTUP_BUDGET_MS)
+    check.add_argument('--runs', type=int, default=STARTUP_RUNS)
+    check.set_defaults(func=cmd_check_startup)
+
+    check_resample = commands.add_parser('check-resample', help="Resampler equivalence and throughput check")
+    check_resample.add_argument('--strokes', type=int, default=RESAMPLE_STROKES)
+    check_resample.add_argument('--min-rate', type=float, default=RESAMPLE_MIN_RATE, help="Strokes per second")
+    check_resample.add_argument('--runs', type=int, default=STARTUP_RUNS)
+    check_resample.set_defaults(func=cmd_check_resample)
+
+    check_passthrough = commands.add_parser('check-passthrough', help="Argument forwarding check for the wrappers")
+    check_passthrough.set_defaults(func=cmd_check_passthrough)
+    return parser
+
+def parse_args(argv=None):
+    """Parse the CLI arguments; unknown ones go to args.args for the wrapped script
+
+    Only ingest, train, export and bench forward arguments. A leading "--"
+    is dropped, so "train -- --help" shows the training script's help.
+    """
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if extra and extra[0] == '--':
+        extra = extra[1:]
+    if extra and not getattr(args, 'passthrough', None):
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    args.args = extra
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Parallel stratified k-fold sweep over the VR gesture CNN hyperparameters
+
+Every configuration in SEARCH_SPACE (create_cnn_model widths, optimizer
+settings, augmentation) is trained on each of k stratified folds. Jobs run
+in a process pool; every worker caps TensorFlow and BLAS threads so the
+workers don't oversubscribe the CPU, and loads the preprocessed dataset
+once from the shared gesture cache. Results go to a leaderboard with the
+mean and standard deviation of the fold accuracies:
+
+    python sweep_vr_gesture_model.py [--folds 5] [--workers 4] [--threads-per-worker 1] [--samples 20]
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import time
+import numpy as np
+from sklearn.model_selection import StratifiedKFold
+from gesture_preprocessing import load_training_data
+
+# --- CONFIGURATION ---
+SEARCH_SPACE = {
+    'conv_channels': [(16, 32, 64), (32, 64, 128)],
+    'dense_units': [(128, 64), (256, 128)],
+    'learning_rate': [0.001, 0.0003],
+    'batch_size': [32, 64],
+    'epochs': [40],
+    'augmentation': ['stroke', 'image', 'none'],
+}
+LEADERBOARD_JSON = 'sweep_leaderboard.json'
+
+_worker_data = {}
+
+def expand_search_space(space, samples=None, seed=0):
+    """Every combination of the search space, or a random subset of them"""
+    keys = list(space)
+    configs = [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+    if samples is not None and samples < len(configs):
+        picked = np.random.default_rng(seed).choice(len(configs), samples, replace=False)
+        configs = [configs[i] for i in sorted(picked)]
+    return configs
+
+def _init_worker(threads):
+    """Cap threads before TensorFlow loads, then load the cached dataset once"""
+    for var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+                'TF_NUM_INTRAOP_THREADS', 'TF_NUM_INTEROP_THREADS'):
+        os.environ[var] = str(threads)
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(threads)
+
+    from gesture_preprocessing import load_training_points
+    X, y, _ = load_training_data()
+    values, offsets, _, _ = load_training_points()
+    _worker_data.update(X=X.reshape(-1, 28, 28, 1), y=y, values=values, offsets=offsets)
+
+def run_fold(job):
+    """Train one configuration on one fold and return its validation accuracy"""
+    from tensorflow import keras
+    from gesture_preprocessing import select_gestures
+    from gesture_tf_data import make_dataset, make_stroke_augmented_dataset
+    from train_vr_gesture_model_fixed import create_cnn_model
+
+    config_id, config, fold, train_idx, val_idx, seed = job
+    X, y = _worker_data['X'], _worker_data['y']
+    keras.utils.set_random_seed(seed)
+
+    model = create_cnn_model(config['conv_channels'], config['dense_units'])
+    model.compile(
+        optimizer=keras.optimizers.Adam(learning_rate=config['learning_rate']),
+        loss='sparse_categorical_crossentropy',
+        metrics=['accuracy']
+    )
+
+    if config['augmentation'] == 'stroke':
+        values, offsets = select_gestures(_worker_data['values'], _worker_data['offsets'], train_idx)
+        train_ds = make_stroke_augmented_dataset(values, offsets, y[train_idx], config['batch_size'], seed=seed)
+    else:
+        train_ds = make_dataset(X[train_idx], y[train_idx], config['batch_size'], training=True,
+                                augmentation=None if config['augmentation'] == 'image' else False, seed=seed)
+    val_ds = make_dataset(X[val_idx], y[val_idx], 64, training=False)
+
+    start = time.perf_counter()
+    history = model.fit(
+        train_ds,
+        epochs=config['epochs'],
+        validation_data=val_ds,
+        callbacks=[keras.callbacks.EarlyStopping(patience=10, restore_best_weights=True, monitor='val_accuracy')],
+        verbose=0
+    )
+    _, accuracy = model.evaluate(val_ds, verbose=0)
+    return {
+        'config_id': config_id,
+        'fold': fold,
+        'accuracy': float(accuracy),
+        'epochs_run': len(history.history['loss']),
+        'train_seconds': time.perf_counter() - start,
+    }
+
+def make_jobs(configs, y, folds, seed=42):
+    """One job per (configuration, fold); every configuration sees the same folds"""
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed)
+    splits = list(splitter.split(np.zeros(len(y)), y))
+    return [(config_id, config, fold, train_idx, val_idx, seed + fold)
+            for config_id, config in enumerate(configs)
+            for fold, (train_idx, val_idx) in enumerate(splits)]
+
+def leaderboard(configs, fold_results):
+    """Mean/std of fold accuracies per configuration, best first"""
+    rows = []
+    for config_id, config in enumerate(configs):
+        runs = [r for r in fold_results if r['config_id'] == config_id]
+        accuracies = np.array([r['accuracy'] for r in runs])
+        rows.append({
+            'config': {k: list(v) if isinstance(v, tuple) else v for k, v in config.items()},
+            'folds': len(runs),
+            'mean_accuracy': float(accuracies.mean()) if len(runs) else float('nan'),
+            'std_accuracy': float(accuracies.std()) if len(runs) else float('nan'),
+            'mean_epochs': float(np.mean([r['epochs_run'] for r in runs])) if runs else 0.0,
+            'mean_train_seconds': float(np.mean([r['train_seconds'] for r in runs])) if runs else 0.0,
+        })
+    return sorted(rows, key=lambda r: (-r['mean_accuracy'], r['std_accuracy']))
+
+def main():
+    parser = argparse.ArgumentParser(description="k-fold hyperparameter sweep for the gesture CNN")
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--threads-per-worker', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=0, help="Worker processes (0 = cores / threads per worker)")
+    parser.add_argument('--samples', type=int, default=None, help="Random subset of configurations to try")
+    parser.add_argument('--out', default=LEADERBOARD_JSON)
+    args = parser.parse_args()
+
+    workers = args.workers or max(1, (os.cpu_count() or 1) // args.threads_per_worker)
+    configs = expand_search_space(SEARCH_SPACE, args.samples)
+
+    # Builds or refreshes the preprocessing cache once, before the workers read it
+    _, y, _ = load_training_data()
+    jobs = make_jobs(configs, y, args.folds)
+    print(f"🔬 {len(configs)} configurations x {args.folds} folds = {len(jobs)} jobs "
+          f"on {workers} workers x {args.threads_per_worker} threads")
+
+    start = time.perf_counter()
+    fold_results = []
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(workers, initializer=_init_worker, initargs=(args.threads_per_worker,)) as pool:
+        for result in pool.imap_unordered(run_fold, jobs):
+            fold_results.append(result)
+            print(f"   [{len(fold_results)}/{len(jobs)}] config {result['config_id']} fold {result['fold']}: "
+                  f"{result['accuracy']:.4f} ({result['epochs_run']} epochs, {result['train_seconds']:.0f}s)")
+
+    board = leaderboard(configs, fold_results)
+    print(f"\n🏆 Leaderboard ({time.perf_counter() - start:.0f}s total)")
+    for rank, row in enumerate(board[:10], 1):
+        print(f"{rank:>3}. {row['mean_accuracy']:.4f} ± {row['std_accuracy']:.4f}  {row['config']}")
+
+    with open(args.out, 'w') as f:
+        json.dump({'folds': args.folds, 'search_space': {k: [list(v) if isinstance(v, tuple) else v for v in vs]
+                                                          for k, vs in SEARCH_SPACE.items()},
+                   'leaderboard': board, 'runs': fold_results}, f, indent=2)
+    print(f"💾 Leaderboard saved: {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -1,50 +1,136 @@
-import numpy as np
-import tensorflow as tf
-from tensorflow import keras
+#!/usr/bin/env python3
+"""
+Quick, Draw! pretraining for the 4-shape gesture CNN
+
+The numpy_bitmap class files live in a local cache directory and are only
+downloaded when missing, so reruns never touch the network. Each file is
+opened with np.load(mmap_mode='r') and stays uint8: every batch gathers
+its rows from the memory maps and is normalized to float32 [0, 1] inside
+the tf.data pipeline, instead of converting all 280k images up front.
+Training batches are class-balanced: each epoch interleaves a fresh
+permutation of every class, so any 4 consecutive samples hold one of each.
+
+    python train_gesture_model.py [--cache-dir quickdraw_cache] [--epochs 10] [--offline]
+    python train_gesture_model.py --check-loader   # same pixels as the old loader, peak RSS of both
+"""
+
+import argparse
 import os
-import json
-import requests
-import gzip
-import shutil
+import subprocess
+import sys
+import numpy as np
+
+# --- CONFIGURATION ---
+CATEGORIES = ['triangle', 'circle', 'zigzag', 'square']
+BASE_URL = 'https://storage.googleapis.com/quickdraw_dataset/full/numpy_bitmap/'
+CACHE_DIR = os.environ.get('QUICKDRAW_CACHE', 'quickdraw_cache')
+SAMPLES_PER_CLASS = 70000
+VALIDATION_SPLIT = 0.2  # Last fraction of every class
+BATCH_SIZE = 32
+EPOCHS = 10
+SEED = 42
+IMG_SIZE = 28
+ONNX_PATH = 'gesture_model.onnx'
+
+def class_path(category, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, f'{category}.npy')
 
 # Download Quick, Draw! data for triangle, circle, zigzag, and square
-def download_quickdraw_data():
-    categories = ['triangle', 'circle', 'zigzag', 'square']
-    base_url = 'https://storage.googleapis.com/quickdraw_dataset/full/numpy_bitmap/'
-    
-    for category in categories:
-        url = base_url + category + '.npy'
-        response = requests.get(url, stream=True)
-        with open(f'{category}.npy', 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
+def download_quickdraw_data(categories=CATEGORIES, cache_dir=CACHE_DIR, offline=False):
+    """Make sure every class file is in the cache; only missing files are downloaded"""
+    os.makedirs(cache_dir, exist_ok=True)
+    missing = [c for c in categories if not os.path.exists(class_path(c, cache_dir))]
+    if not missing:
+        print(f"📦 Using cached Quick, Draw! data in {cache_dir}")
+        return
+    if offline:
+        raise FileNotFoundError(f"Missing from {cache_dir}: {', '.join(missing)} (run once without --offline)")
+
+    try:
+        import requests
+    except ImportError:
+        raise ImportError("Downloading needs requests. Install with: pip install requests")
+    for category in missing:
+        path = class_path(category, cache_dir)
+        print(f"⬇️  Downloading {category}.npy into {cache_dir}")
+        response = requests.get(BASE_URL + category + '.npy', stream=True)
+        response.raise_for_status()
+        # Renamed only when complete, so an interrupted download is never taken for a cached file
+        with open(path + '.part', 'wb') as f:
+            for chunk in response.iter_content(chunk_size=1 << 20):
                 f.write(chunk)
+        os.replace(path + '.part', path)
+
+def open_quickdraw_data(categories=CATEGORIES, cache_dir=CACHE_DIR, samples_per_class=SAMPLES_PER_CLASS):
+    """Read-only uint8 (n, 784) memory maps, one per class, cut to samples_per_class rows"""
+    return [np.load(class_path(c, cache_dir), mmap_mode='r')[:samples_per_class] for c in categories]
+
+def split_rows(class_data, validation_split=VALIDATION_SPLIT):
+    """(train_rows, validation_rows) per class; the last fraction of each class validates"""
+    splits = []
+    for data in class_data:
+        n_train = len(data) - int(len(data) * validation_split)
+        splits.append((np.arange(n_train), np.arange(n_train, len(data))))
+    return splits
+
+def balanced_order(class_rows, rng=None):
+    """(labels, rows) of one epoch with the classes interleaved
+
+    Every class contributes as many rows as the smallest one, in a fresh
+    random order when rng is given (in row order otherwise).
+    """
+    count = min(len(rows) for rows in class_rows)
+    picks = [rng.permutation(rows)[:count] if rng is not None else rows[:count] for rows in class_rows]
+    labels = np.tile(np.arange(len(class_rows)), count)
+    return labels, np.stack(picks, axis=1).reshape(-1)
+
+def iter_quickdraw_batches(class_data, labels, rows, batch_size=BATCH_SIZE):
+    """uint8 (B, 28, 28, 1) batches; only the rows of the current batch are read from disk"""
+    for start in range(0, len(rows), batch_size):
+        batch_labels = labels[start:start + batch_size]
+        batch_rows = rows[start:start + batch_size]
+        images = np.empty((len(batch_rows), IMG_SIZE * IMG_SIZE), dtype=np.uint8)
+        for c, data in enumerate(class_data):
+            mask = batch_labels == c
+            if mask.any():
+                images[mask] = data[batch_rows[mask]]
+        yield images.reshape(-1, IMG_SIZE, IMG_SIZE, 1), batch_labels.astype(np.int64)
+
+def make_quickdraw_dataset(class_data, class_rows, batch_size=BATCH_SIZE, training=True, seed=SEED):
+    """tf.data pipeline over the memory maps, normalized per batch"""
+    import tensorflow as tf
+
+    rng = np.random.default_rng(seed) if training else None
+
+    def epoch():
+        return iter_quickdraw_batches(class_data, *balanced_order(class_rows, rng), batch_size)
 
-# Load and preprocess the data
-def load_and_preprocess_data():
-    categories = ['triangle', 'circle', 'zigzag', 'square']
+    ds = tf.data.Dataset.from_generator(epoch, output_signature=(
+        tf.TensorSpec([None, IMG_SIZE, IMG_SIZE, 1], tf.uint8),
+        tf.TensorSpec([None], tf.int64),
+    ))
+    # Same float32 values as X.astype('float32') / 255.0 on the whole array
+    ds = ds.map(lambda x, y: (tf.cast(x, tf.float32) / 255.0, y), num_parallel_calls=tf.data.AUTOTUNE)
+    return ds.prefetch(tf.data.AUTOTUNE)
+
+def load_and_preprocess_data(categories=CATEGORIES, cache_dir=CACHE_DIR, samples_per_class=SAMPLES_PER_CLASS):
+    """The previous in-memory loader: whole float32 (N, 28, 28, 1) array, kept for --check-loader"""
     X = []
     y = []
-    
     for i, category in enumerate(categories):
-        data = np.load(f'{category}.npy')
-        # Take first 70000 samples of each category
-        data = data[:70000]
-        # Reshape to 28x28 images
-        data = data.reshape(-1, 28, 28, 1)
-        X.append(data)
+        data = np.load(class_path(category, cache_dir))[:samples_per_class]
+        X.append(data.reshape(-1, IMG_SIZE, IMG_SIZE, 1))
         y.append(np.full(len(data), i))
-    
     X = np.concatenate(X)
     y = np.concatenate(y)
-    
-    # Normalize pixel values
     X = X.astype('float32') / 255.0
-    
     return X, y
 
 # Create and train the model
-def create_and_train_model(X, y):
-    inputs = keras.Input(shape=(28, 28, 1))
+def create_model(num_classes=len(CATEGORIES)):
+    from tensorflow import keras
+
+    inputs = keras.Input(shape=(IMG_SIZE, IMG_SIZE, 1))
     x = keras.layers.Conv2D(32, (3, 3), activation='relu')(inputs)
     x = keras.layers.MaxPooling2D((2, 2))(x)
     x = keras.layers.Conv2D(64, (3, 3), activation='relu')(x)
@@ -52,45 +138,110 @@ def create_and_train_model(X, y):
     x = keras.layers.Conv2D(64, (3, 3), activation='relu')(x)
     x = keras.layers.Flatten()(x)
     x = keras.layers.Dense(64, activation='relu')(x)
-    outputs = keras.layers.Dense(4, activation='softmax')(x)  # Changed to 4 classes
+    outputs = keras.layers.Dense(num_classes, activation='softmax')(x)
     model = keras.Model(inputs=inputs, outputs=outputs)
 
     model.compile(optimizer='adam',
                   loss='sparse_categorical_crossentropy',
                   metrics=['accuracy'])
+    return model
 
-    model.fit(X, y, epochs=10, validation_split=0.2)
-
+def train_model(class_data, epochs=EPOCHS, batch_size=BATCH_SIZE, seed=SEED):
+    splits = split_rows(class_data)
+    train_ds = make_quickdraw_dataset(class_data, [t for t, _ in splits], batch_size, training=True, seed=seed)
+    val_ds = make_quickdraw_dataset(class_data, [v for _, v in splits], batch_size, training=False)
+    model = create_model(len(class_data))
+    model.fit(train_ds, epochs=epochs, validation_data=val_ds)
     return model
 
 # Convert to ONNX format
-def convert_to_onnx(model):
-    import tf2onnx
-    
-    input_signature = [tf.TensorSpec([1, 28, 28, 1], tf.float32, name="input")]
-    onnx_model, _ = tf2onnx.convert.from_keras(model, input_signature, opset=13)
-    
-    with open("gesture_model.onnx", "wb") as f:
-        f.write(onnx_model.SerializeToString())
+def convert_to_onnx(model, path=ONNX_PATH):
+    from gesture_onnx_export import export_keras_model
+
+    export_keras_model(model, path)
+
+# --- LOADER CHECK ---
+def _peak_rss_mb():
+    """Peak RSS of this process; VmHWM starts over at exec, unlike ru_maxrss"""
+    try:
+        with open('/proc/self/status') as f:
+            return next(int(line.split()[1]) for line in f if line.startswith('VmHWM:')) / 1024
+    except OSError:
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _memory_probe(loader, cache_dir):
+    """Run one loader in this process and print its peak RSS"""
+    if loader == 'eager':
+        X, y = load_and_preprocess_data(cache_dir=cache_dir)
+        total = float(X.sum())
+    else:
+        class_data = open_quickdraw_data(cache_dir=cache_dir)
+        train_rows = [t for t, _ in split_rows(class_data)]
+        total = 0.0
+        # One full epoch, normalized batch by batch like the tf.data map
+        for images, _ in iter_quickdraw_batches(class_data, *balanced_order(train_rows, np.random.default_rng(SEED))):
+            total += float((images.astype('float32') / 255.0).sum())
+    print(f"{_peak_rss_mb():.1f}")
+
+def check_loader(cache_dir=CACHE_DIR, min_ratio=4.0):
+    """Compare peak RSS and pixels of the memory-mapped loader against the old in-memory one"""
+    # Probes run first, in fresh processes, before this one holds the full array
+    peaks = {}
+    for loader in ('eager', 'lazy'):
+        result = subprocess.run([sys.executable, os.path.abspath(__file__), '--memory-probe', loader,
+                                 '--cache-dir', cache_dir], capture_output=True, text=True, check=True)
+        peaks[loader] = float(result.stdout.split()[-1])
+    class_data = open_quickdraw_data(cache_dir=cache_dir)
+    X, y = load_and_preprocess_data(cache_dir=cache_dir)
+    starts = np.cumsum([0] + [len(d) for d in class_data[:-1]])
+    labels, rows = balanced_order([np.arange(len(d)) for d in class_data], np.random.default_rng(SEED))
+    mismatches = 0
+    for i, (images, batch_labels) in enumerate(iter_quickdraw_batches(class_data, labels, rows, 4096)):
+        idx = starts[labels[i * 4096:(i + 1) * 4096]] + rows[i * 4096:(i + 1) * 4096]
+        mismatches += int(np.any(images.astype('float32') / 255.0 != X[idx])) + int(np.any(batch_labels != y[idx]))
+    del X, y
+    print(f"{'✅' if not mismatches else '❌'} Lazy batches {'match' if not mismatches else 'differ from'} "
+          f"the in-memory float32 array ({len(rows)} samples)")
+
+    ratio = peaks['eager'] / peaks['lazy']
+    ok = ratio > min_ratio
+    print(f"{'✅' if ok else '❌'} Peak RSS: in-memory {peaks['eager']:.0f} MB, "
+          f"memory-mapped {peaks['lazy']:.0f} MB ({ratio:.1f}x lower, target >{min_ratio:g}x)")
+    return 0 if ok and not mismatches else 1
 
 def main():
-    print("Downloading Quick, Draw! data...")
-    download_quickdraw_data()
-    
-    print("Loading and preprocessing data...")
-    X, y = load_and_preprocess_data()
-    
+    parser = argparse.ArgumentParser(description="Pretrain the shape CNN on Quick, Draw! bitmaps")
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help="Where the class .npy files are kept")
+    parser.add_argument('--offline', action='store_true', help="Fail instead of downloading missing files")
+    parser.add_argument('--epochs', type=int, default=EPOCHS)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--check-loader', action='store_true',
+                        help="Compare the memory-mapped loader with the in-memory one (no TensorFlow)")
+    parser.add_argument('--memory-probe', choices=('eager', 'lazy'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.memory_probe:
+        _memory_probe(args.memory_probe, args.cache_dir)
+        return 0
+
+    download_quickdraw_data(cache_dir=args.cache_dir, offline=args.offline)
+    if args.check_loader:
+        return check_loader(args.cache_dir)
+
+    print("Opening Quick, Draw! data...")
+    class_data = open_quickdraw_data(cache_dir=args.cache_dir)
+    print("   " + ", ".join(f"{c}: {len(d)}" for c, d in zip(CATEGORIES, class_data)))
+
     print("Creating and training model...")
-    model = create_and_train_model(X, y)
-    
+    model = train_model(class_data, args.epochs, args.batch_size)
+
     print("Converting to ONNX format...")
     convert_to_onnx(model)
-    
-    print("Done! Model saved as gesture_model.onnx")
-    
-    # Clean up downloaded files
-    for category in ['triangle', 'circle', 'zigzag', 'square']:
-        os.remove(f'{category}.npy')
+
+    print(f"Done! Model saved as {ONNX_PATH}")
+    return 0
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Knowledge distillation of the VR gesture CNN into tiny students
+
+The BatchNorm CNN from train_vr_gesture_model_fixed.py is the teacher.
+Narrow students are trained on the same XML data and stroke augmentation
+with a mix of hard-label cross-entropy and the teacher's temperature-softened
+probabilities, exported through the normal ONNX path, and compared on
+size, onnxruntime latency and held-out accuracy:
+
+    python train_vr_distilled_model.py [--widths 4 8 16] [--temperature 4] [--alpha 0.3]
+
+The teacher is vr_gesture_teacher.h5 when an earlier run trained one
+(--retrain-teacher, or no model yet), otherwise the production
+vr_gesture_model.h5, which is only ever read.
+"""
+
+import argparse
+import os
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+from sklearn.model_selection import train_test_split
+from benchmark_inference import evaluate_onnx
+from gesture_onnx_export import export_keras_model, model_stats
+from gesture_preprocessing import load_training_data, load_training_points, select_gestures
+from gesture_tf_data import make_dataset, make_stroke_augmented_dataset
+from gesture_training import class_weights
+from train_vr_gesture_model_fixed import create_cnn_model
+
+# --- CONFIGURATION ---
+TEACHER_MODEL = 'vr_gesture_model.h5'
+TEACHER_H5 = 'vr_gesture_teacher.h5'  # A retrained teacher never replaces the production model
+TEACHER_ONNX = 'vr_gesture_teacher.onnx'
+STUDENT_WIDTHS = [4, 8, 16]
+STUDENT_PATTERN = 'vr_gesture_student_w{width}'  # .h5 / .onnx
+TEMPERATURE = 4.0
+ALPHA = 0.3  # Weight of the hard-label loss; the rest goes to the teacher's soft targets
+EPOCHS = 60
+
+def create_student_model(width=8, num_classes=4):
+    """Narrow create_cnn_model: width, 2x and 4x width conv channels and no hidden dense layer
+
+    The last Dense layer is linear and followed by a separate Softmax, so
+    the logits are available for temperature scaling while the exported
+    model keeps the probability output.
+    """
+    inputs = keras.Input(shape=(28, 28, 1))
+
+    x = keras.layers.Conv2D(width, (3, 3), activation='relu', padding='same')(inputs)
+    x = keras.layers.MaxPooling2D((2, 2))(x)
+    x = keras.layers.Conv2D(2 * width, (3, 3), activation='relu', padding='same')(x)
+    x = keras.layers.MaxPooling2D((2, 2))(x)
+    x = keras.layers.Conv2D(4 * width, (3, 3), activation='relu', padding='same')(x)
+    x = keras.layers.GlobalAveragePooling2D()(x)
+    x = keras.layers.Dropout(0.2)(x)
+
+    logits = keras.layers.Dense(num_classes, name='logits')(x)
+    outputs = keras.layers.Softmax()(logits)
+    return keras.Model(inputs=inputs, outputs=outputs)
+
+def train_teacher(train_ds, test_ds, y_train, epochs=100):
+    """Train the create_cnn_model teacher the way train_vr_gesture_model_fixed.py does"""
+    teacher = create_cnn_model()
+    teacher.compile(
+        optimizer=keras.optimizers.Adam(learning_rate=0.001),
+        loss='sparse_categorical_crossentropy',
+        metrics=['accuracy']
+    )
+    teacher.fit(
+        train_ds,
+        epochs=epochs,
+        validation_data=test_ds,
+        class_weight=class_weights(y_train),
+        callbacks=[
+            keras.callbacks.EarlyStopping(patience=15, restore_best_weights=True, monitor='val_accuracy'),
+            keras.callbacks.ReduceLROnPlateau(factor=0.5, patience=8, monitor='val_accuracy'),
+        ],
+        verbose=2
+    )
+    return teacher
+
+def distill(teacher, student, train_ds, test_ds, epochs=EPOCHS, temperature=TEMPERATURE, alpha=ALPHA):
+    """Train student on alpha * CE(labels) + (1 - alpha) * T^2 * KL(teacher_T || student_T)"""
+    student_logits = keras.Model(student.input, student.get_layer('logits').output)
+    optimizer = keras.optimizers.Adam(learning_rate=0.003)
+    hard_loss = keras.losses.SparseCategoricalCrossentropy(from_logits=True)
+    kl = keras.losses.KLDivergence()
+
+    @tf.function
+    def train_step(x, y):
+        # log(p) / T re-softmaxed is the teacher's temperature-scaled distribution
+        teacher_probs = teacher(x, training=False)
+        soft_targets = tf.nn.softmax(tf.math.log(teacher_probs + 1e-8) / temperature)
+        with tf.GradientTape() as tape:
+            logits = student_logits(x, training=True)
+            loss = alpha * hard_loss(y, logits) + (1 - alpha) * temperature ** 2 * kl(
+                soft_targets, tf.nn.softmax(logits / temperature))
+        grads = tape.gradient(loss, student_logits.trainable_variables)
+        optimizer.apply_gradients(zip(grads, student_logits.trainable_variables))
+        return loss
+
+    best_accuracy, best_weights = -1.0, student.get_weights()
+    for epoch in range(epochs):
+        losses = [float(train_step(x, y)) for x, y in train_ds]
+        accuracy = _accuracy(student, test_ds)
+        if accuracy > best_accuracy:
+            best_accuracy, best_weights = accuracy, student.get_weights()
+        print(f"   epoch {epoch + 1:3d}: loss {np.mean(losses):.4f}, val accuracy {accuracy:.4f}")
+    student.set_weights(best_weights)
+    return best_accuracy
+
+def _accuracy(model, ds):
+    correct = total = 0
+    for x, y in ds:
+        predicted = np.argmax(model(x, training=False).numpy(), axis=1)
+        correct += int(np.sum(predicted == y.numpy()))
+        total += len(predicted)
+    return correct / max(total, 1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Distill the gesture CNN into narrow students")
+    parser.add_argument('--teacher', default=None,
+                        help=f"Trained create_cnn_model teacher (.h5/.keras), never overwritten "
+                             f"(default: {TEACHER_H5} if a previous run trained one, else {TEACHER_MODEL})")
+    parser.add_argument('--retrain-teacher', action='store_true',
+                        help=f"Train a fresh teacher into {TEACHER_H5} even if one exists")
+    parser.add_argument('--widths', type=int, nargs='+', default=STUDENT_WIDTHS)
+    parser.add_argument('--temperature', type=float, default=TEMPERATURE)
+    parser.add_argument('--alpha', type=float, default=ALPHA)
+    parser.add_argument('--epochs', type=int, default=EPOCHS)
+    args = parser.parse_args()
+    if args.teacher is None:
+        args.teacher = TEACHER_H5 if os.path.exists(TEACHER_H5) else TEACHER_MODEL
+
+    print("🎓 VR Gesture Distillation")
+    print("=" * 40)
+
+    X, y, class_names = load_training_data()
+    X = X.reshape(-1, 28, 28, 1)
+    train_idx, test_idx = train_test_split(
+        np.arange(len(y)), test_size=0.2, stratify=y, random_state=42
+    )
+    X_test, y_test = X[test_idx], y[test_idx]
+
+    # Same data and stroke augmentation as train_vr_gesture_model_fixed.py
+    values, offsets, _, _ = load_training_points()
+    train_values, train_offsets = select_gestures(values, offsets, train_idx)
+    train_ds = make_stroke_augmented_dataset(train_values, train_offsets, y[train_idx], batch_size=32)
+    test_ds = make_dataset(X_test, y_test, batch_size=64, training=False)
+
+    if os.path.exists(args.teacher) and not args.retrain_teacher:
+        teacher = keras.models.load_model(args.teacher, compile=False)
+        print(f"👩‍🏫 Teacher: {args.teacher}")
+    else:
+        print(f"👩‍🏫 Training teacher (create_cnn_model)...")
+        teacher = train_teacher(train_ds, test_ds, y[train_idx])
+        teacher.save(TEACHER_H5)
+        print(f"💾 Teacher saved as: {TEACHER_H5}")
+    teacher.trainable = False
+
+    candidates = {'teacher': TEACHER_ONNX}
+    export_keras_model(teacher, TEACHER_ONNX)
+
+    for width in args.widths:
+        print(f"\n🧪 Student width {width}")
+        student = create_student_model(width, len(class_names))
+        distill(teacher, student, train_ds, test_ds, args.epochs, args.temperature, args.alpha)
+        name = STUDENT_PATTERN.format(width=width)
+        student.save(f"{name}.h5")
+        export_keras_model(student, f"{name}.onnx")
+        candidates[f"student w{width}"] = f"{name}.onnx"
+
+    print(f"\n{'model':>14} {'params':>9} {'FLOPs':>11} {'KB':>7} {'p50 ms':>7} {'p95 ms':>7} {'accuracy':>9}")
+    for label, path in candidates.items():
+        stats = model_stats(path)
+        result = evaluate_onnx(path, X_test.astype(np.float32), y_test)
+        print(f"{label:>14} {stats['params']:>9,} {stats['flops']:>11,} {result['size_bytes'] / 1024:>7.1f} "
+              f"{result['latency_ms']['p50']:>7.3f} {result['latency_ms']['p95']:>7.3f} {result['accuracy']:>9.4f}")
+    print(f"\n✅ Copy the chosen vr_gesture_student_w*.onnx to Unity as vr_gesture_model.onnx")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Warm-start fine-tuning of the VR gesture CNN with new recordings
+
+Instead of retraining from random weights, loads the last
+vr_gesture_model.h5 and trains it briefly on the recordings it has not
+seen yet, mixed with a class-balanced replay buffer of old ones so it
+does not forget them. The first conv blocks stay frozen and the learning
+rate is a tenth of a full training run.
+
+vr_gesture_model.manifest.json (written by this script and by the full
+training scripts) lists the content digests a model was trained on and
+the ones held out from it. Held-out recordings stay held out across
+updates and new recordings are assigned by digest, so the evaluation set
+never contains anything the previous model was trained on, and the
+manifest only ever marks trained recordings as trained. Without a
+manifest, recordings modified after the .h5 file count as new (see
+gesture_training.assign_split). The result is exported through the
+normal ONNX path and only replaces the current model if it is not worse
+on the held-out recordings:
+
+    python train_vr_finetune.py [vr_gesture_model.h5] [--epochs 10] [--frozen-blocks 2]
+    python train_vr_finetune.py --compare     # also time a full retrain for the report
+    python train_vr_finetune.py --dry-run     # only show what would be trained on (no TensorFlow)
+"""
+
+import argparse
+import json
+import time
+import numpy as np
+from gesture_preprocessing import (
+    CLASS_NAMES, load_training_data, load_training_points, load_training_sources, select_gestures
+)
+from gesture_training import (
+    MANIFEST_PATH, assign_split, class_weights, freeze_conv_blocks, read_manifest, require_model, write_manifest
+)
+
+# --- CONFIGURATION ---
+BASE_MODEL = 'vr_gesture_model.h5'
+MODEL_ONNX = 'vr_gesture_model.onnx'
+REPORT_JSON = 'finetune_report.json'
+FINE_TUNE_EPOCHS = 10
+FINE_TUNE_LR = 0.0001        # Full training starts at 0.001
+FROZEN_CONV_BLOCKS = 2       # Leading Conv2D blocks (with their BatchNorm) kept fixed
+REPLAY_RATIO = 2.0           # Old samples replayed per new sample
+MIN_REPLAY = 128
+FULL_EPOCHS = 100
+ACCURACY_TOLERANCE = 0.0     # Keep the current model if fine-tuning loses more than this
+
+def replay_indices(old_idx, y, count, rng, num_classes=len(CLASS_NAMES)):
+    """Up to count old samples, the same number from every class"""
+    per_class = -(-count // num_classes)
+    picks = []
+    for c in range(num_classes):
+        candidates = old_idx[y[old_idx] == c]
+        picks.append(rng.choice(candidates, min(per_class, len(candidates)), replace=False))
+    return np.sort(np.concatenate(picks))
+
+def fine_tune(model, values, offsets, y, X_val, y_val, epochs=FINE_TUNE_EPOCHS, learning_rate=FINE_TUNE_LR,
+              frozen_blocks=FROZEN_CONV_BLOCKS):
+    """Briefly train a loaded model with frozen leading conv blocks; returns epochs run"""
+    from tensorflow import keras
+    from gesture_tf_data import make_stroke_augmented_dataset
+
+    frozen = freeze_conv_blocks(model, frozen_blocks)
+    print(f"🧊 Frozen: {', '.join(frozen) or 'nothing'}")
+    model.compile(
+        optimizer=keras.optimizers.Adam(learning_rate=learning_rate),
+        loss='sparse_categorical_crossentropy',
+        metrics=['accuracy']
+    )
+    history = model.fit(
+        make_stroke_augmented_dataset(values, offsets, y, batch_size=32),
+        epochs=epochs,
+        validation_data=(X_val, y_val),
+        class_weight=class_weights(y),
+        callbacks=[keras.callbacks.EarlyStopping(patience=3, restore_best_weights=True, monitor='val_accuracy')],
+        verbose=2
+    )
+    for layer in model.layers:
+        layer.trainable = True
+    return len(history.history['loss'])
+
+def full_retrain(values, offsets, y, X_val, y_val, epochs=FULL_EPOCHS):
+    """Training from scratch with the train_vr_gesture_model_fixed.py recipe; returns (model, epochs run)"""
+    from tensorflow import keras
+    from gesture_tf_data import make_stroke_augmented_dataset
+    from train_vr_gesture_model_fixed import create_cnn_model
+
+    model = create_cnn_model()
+    model.compile(
+        optimizer=keras.optimizers.Adam(learning_rate=0.001),
+        loss='sparse_categorical_crossentropy',
+        metrics=['accuracy']
+    )
+    history = model.fit(
+        make_stroke_augmented_dataset(values, offsets, y, batch_size=32),
+        epochs=epochs,
+        validation_data=(X_val, y_val),
+        class_weight=class_weights(y),
+        callbacks=[
+            keras.callbacks.EarlyStopping(patience=15, restore_best_weights=True, monitor='val_accuracy'),
+            keras.callbacks.ReduceLROnPlateau(factor=0.5, patience=8, monitor='val_accuracy'),
+        ],
+        verbose=2
+    )
+    return model, len(history.history['loss'])
+
+def accuracy(model, X, y):
+    return float(np.mean(np.argmax(model.predict(X, verbose=0), axis=1) == y))
+
+def main():
+    parser = argparse.ArgumentParser(description="Fine-tune the last gesture model on new recordings")
+    parser.add_argument('model', nargs='?', default=BASE_MODEL, help="Keras model to start from")
+    parser.add_argument('--manifest', default=MANIFEST_PATH)
+    parser.add_argument('--epochs', type=int, default=FINE_TUNE_EPOCHS)
+    parser.add_argument('--lr', type=float, default=FINE_TUNE_LR)
+    parser.add_argument('--frozen-blocks', type=int, default=FROZEN_CONV_BLOCKS)
+    parser.add_argument('--replay-ratio', type=float, default=REPLAY_RATIO)
+    parser.add_argument('--compare', action='store_true', help="Also run a full retrain and report both")
+    parser.add_argument('--dry-run', action='store_true', help="Only report new and replayed sample counts")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print("🔁 VR Gesture Fine-Tuning")
+    print("=" * 40)
+
+    X, y, _ = load_training_data()
+    values, offsets, _, _ = load_training_points()
+    digests, mtime_ns = load_training_sources()
+    X = X.reshape(-1, 28, 28, 1)
+    trained, held_out, new = assign_split(digests, y, mtime_ns, read_manifest(args.manifest), args.model)
+    new_idx, old_idx, test_idx = np.flatnonzero(new), np.flatnonzero(trained), np.flatnonzero(held_out)
+    train_idx = np.concatenate([old_idx, new_idx])
+    if len(new_idx) == 0:
+        print(f"✅ No new training recordings since {args.model}, nothing to do")
+        return
+
+    rng = np.random.default_rng(args.seed)
+    replay = replay_indices(old_idx, y, max(MIN_REPLAY, int(args.replay_ratio * len(new_idx))), rng)
+    tune_idx = np.concatenate([new_idx, replay])
+    print(f"\n📊 New: {len(new_idx)} recordings {np.bincount(y[new_idx], minlength=len(CLASS_NAMES))}, "
+          f"replayed: {len(replay)} of {len(old_idx)}, held out: {len(test_idx)}")
+    if args.dry_run:
+        return
+
+    require_model(args.model)
+    from tensorflow import keras
+
+    X_test, y_test = X[test_idx], y[test_idx]
+    model = keras.models.load_model(args.model, compile=False)
+    results = [{'run': 'previous', 'seconds': 0.0, 'epochs': 0, 'samples': 0,
+                'accuracy': accuracy(model, X_test, y_test)}]
+
+    start = time.perf_counter()
+    epochs = fine_tune(model, *select_gestures(values, offsets, tune_idx), y[tune_idx], X_test, y_test,
+                       args.epochs, args.lr, args.frozen_blocks)
+    results.append({'run': 'fine-tune', 'seconds': time.perf_counter() - start, 'epochs': epochs,
+                    'samples': len(tune_idx), 'accuracy': accuracy(model, X_test, y_test)})
+
+    if args.compare:
+        start = time.perf_counter()
+        full, full_epochs = full_retrain(*select_gestures(values, offsets, train_idx), y[train_idx], X_test, y_test)
+        results.append({'run': 'full retrain', 'seconds': time.perf_counter() - start, 'epochs': full_epochs,
+                        'samples': len(train_idx), 'accuracy': accuracy(full, X_test, y_test)})
+
+    print(f"\n{'run':>13} {'samples':>8} {'epochs':>7} {'seconds':>9} {'accuracy':>9}")
+    for r in results:
+        print(f"{r['run']:>13} {r['samples']:>8} {r['epochs']:>7} {r['seconds']:>9.1f} {r['accuracy']:>9.4f}")
+    if args.compare:
+        print(f"⏱️  Fine-tuning took {results[1]['seconds'] / max(results[2]['seconds'], 1e-9):.1%} "
+              f"of the full retrain time")
+    with open(REPORT_JSON, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Report saved: {REPORT_JSON}")
+
+    if results[1]['accuracy'] < results[0]['accuracy'] - ACCURACY_TOLERANCE:
+        print(f"⚠️  Fine-tuned model is less accurate on the held-out recordings, keeping {args.model}")
+        return
+
+    model.save(args.model)
+    print(f"💾 Model saved as: {args.model}")
+    # Old recordings stay trained (the weights came from them); held-out ones are never marked trained
+    digests = np.array(digests)
+    write_manifest(digests[train_idx], digests[test_idx], args.model, args.manifest)
+    try:
+        from gesture_onnx_export import export_keras_model
+        export_keras_model(model, MODEL_ONNX)
+        print(f"🔄 ONNX model saved as: {MODEL_ONNX}")
+    except Exception as e:
+        print(f"⚠️  ONNX conversion failed: {e}")
+
+if __name__ == "__main__":
+    main()
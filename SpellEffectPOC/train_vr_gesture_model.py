@@ -7,11 +7,10 @@ Trains a CNN specifically for VR controller gestures using your existing XML dat
 import numpy as np
 import tensorflow as tf
 from tensorflow import keras
-import xml.etree.ElementTree as ET
 import glob
 import os
 from sklearn.model_selection import train_test_split
-import cv2
+from gesture_preprocessing import load_gesture_xml, points_to_images
 
 def load_vr_gesture_data(gestures_path="TrainingRecordingDataXMLs/"):
     """Load and preprocess VR gesture XML files"""
@@ -37,37 +36,15 @@ def load_vr_gesture_data(gestures_path="TrainingRecordingDataXMLs/"):
         print(f"Found {len(xml_files)} files for {spell_name}")
         
         for xml_file in xml_files:
-            try:
-                # Parse XML and extract points
-                tree = ET.parse(xml_file)
-                root = tree.getroot()
-                
-                points = []
-                for point_elem in root.findall(".//Point"):
-                    x_str = point_elem.get('X')
-                    y_str = point_elem.get('Y')
-                    if x_str is not None and y_str is not None:
-                        try:
-                            x = float(x_str.strip())
-                            y = float(y_str.strip())
-                            points.append([x, y])
-                        except ValueError:
-                            continue
-                
-                if len(points) < 5:  # Skip gestures with too few points
-                    continue
-                    
-                # Convert to 28x28 image using your existing approach
-                image = vr_points_to_image(points, 28, 28)
-                
-                X.append(image)
-                y.append(class_idx)
-                
-            except Exception as e:
-                print(f"Error processing {xml_file}: {e}")
+            points = load_gesture_xml(xml_file)
+            if points is None:  # Skip unreadable gestures or ones with too few points
                 continue
+
+            X.append(points)
+            y.append(class_idx)
     
-    X = np.array(X).reshape(-1, 28, 28, 1)
+    # Convert to 28x28 images using your existing approach (27-pixel scale, matching Unity)
+    X = points_to_images(X, scale=27.0).reshape(-1, 28, 28, 1)
     y = np.array(y)
     
     print(f"Loaded {len(X)} gesture samples")
@@ -79,56 +56,6 @@ def load_vr_gesture_data(gestures_path="TrainingRecordingDataXMLs/"):
     
     return X, y
 
-def vr_points_to_image(points, width, height):
-    """Convert VR gesture points to 28x28 image (matching your Unity implementation)"""
-    points = np.array(points)
-    
-    # Normalize and center (matching Unity SentisGestureRecognizer logic)
-    if len(points) < 2:
-        return np.zeros((height, width))
-    
-    # Get bounding box
-    min_x, min_y = points.min(axis=0)
-    max_x, max_y = points.max(axis=0)
-    
-    # Center at origin
-    center_x, center_y = (max_x + min_x) / 2, (max_y + min_y) / 2
-    centered_points = points - [center_x, center_y]
-    
-    # Scale to fit 27 pixels (leave 1-pixel border)
-    max_dimension = max(max_x - min_x, max_y - min_y)
-    if max_dimension > 0:
-        scale = 27.0 / max_dimension
-        scaled_points = centered_points * scale
-    else:
-        scaled_points = centered_points
-    
-    # Shift to center of 28x28 image
-    final_points = scaled_points + [14, 14]
-    
-    # Create image
-    image = np.zeros((height, width))
-    
-    # Draw lines between points
-    for i in range(1, len(final_points)):
-        x1, y1 = final_points[i-1]
-        x2, y2 = final_points[i]
-        
-        # Convert to integer coordinates
-        x1, y1 = int(round(x1)), int(round(y1))
-        x2, y2 = int(round(x2)), int(round(y2))
-        
-        # Clamp to bounds
-        x1 = max(0, min(width-1, x1))
-        y1 = max(0, min(height-1, y1))
-        x2 = max(0, min(width-1, x2))
-        y2 = max(0, min(height-1, y2))
-        
-        # Draw line using OpenCV
-        cv2.line(image, (x1, y1), (x2, y2), 1.0, 1)
-    
-    return image
-
 def create_vr_optimized_model():
     """Create CNN optimized for VR gesture recognition"""
     inputs = keras.Input(shape=(28, 28, 1))
@@ -240,13 +167,9 @@ def train_vr_model():
 def convert_to_onnx(model):
     """Convert trained model to ONNX format for Unity Sentis"""
     try:
-        import tf2onnx
-        
-        input_signature = [tf.TensorSpec([1, 28, 28, 1], tf.float32, name="input")]
-        onnx_model, _ = tf2onnx.convert.from_keras(model, input_signature, opset=13)
+        from gesture_onnx_export import export_keras_model
         
-        with open("vr_gesture_model.onnx", "wb") as f:
-            f.write(onnx_model.SerializeToString())
+        export_keras_model(model, "vr_gesture_model.onnx")
             
         print("Successfully converted to ONNX format: vr_gesture_model.onnx")
         
@@ -6,135 +6,39 @@ Fixed VR Gesture Model Training Script
 import numpy as np
 import tensorflow as tf
 from tensorflow import keras
-import xml.etree.ElementTree as ET
-import glob
-import os
 from sklearn.model_selection import train_test_split
-import cv2
+from gesture_preprocessing import load_training_data, load_training_points, load_training_sources, select_gestures
+from gesture_training import write_manifest
+from gesture_tf_data import make_dataset, make_stroke_augmented_dataset
 
-def load_gesture_xml(xml_file):
-    """Load a single XML gesture file and return points"""
-    try:
-        tree = ET.parse(xml_file)
-        root = tree.getroot()
-        
-        points = []
-        for point_elem in root.findall(".//Point"):
-            x_str = point_elem.get('X')
-            y_str = point_elem.get('Y')
-            
-            if x_str and y_str:
-                try:
-                    x = float(x_str.strip())
-                    y = float(y_str.strip()) 
-                    points.append([x, y])
-                except ValueError:
-                    continue
-        
-        return np.array(points) if len(points) >= 5 else None
-        
-    except Exception as e:
-        print(f"Error loading {xml_file}: {e}")
-        return None
-
-def points_to_image(points, width=28, height=28):
-    """Convert 2D points to 28x28 image"""
-    if len(points) < 2:
-        return np.zeros((height, width))
-    
-    # Get bounding box
-    min_x, min_y = points.min(axis=0)
-    max_x, max_y = points.max(axis=0)
-    
-    # Center points at origin
-    center_x, center_y = (max_x + min_x) / 2, (max_y + min_y) / 2
-    centered = points - [center_x, center_y]
-    
-    # Scale to fit in 27 pixels (leave 1-pixel border)
-    max_dim = max(max_x - min_x, max_y - min_y)
-    if max_dim > 0:
-        scale = 26.0 / max_dim  # Fit in 26 pixels, center at 14
-        scaled = centered * scale
-    else:
-        scaled = centered
-    
-    # Shift to center of 28x28 image
-    final_points = scaled + [14, 14]
-    
-    # Create image
-    image = np.zeros((height, width), dtype=np.float32)
-    
-    # Draw lines between consecutive points
-    for i in range(1, len(final_points)):
-        x1, y1 = final_points[i-1]
-        x2, y2 = final_points[i]
-        
-        # Convert to pixel coordinates
-        x1, y1 = int(round(x1)), int(round(y1))
-        x2, y2 = int(round(x2)), int(round(y2))
-        
-        # Clamp to bounds
-        x1 = max(0, min(width-1, x1))
-        y1 = max(0, min(height-1, y1))
-        x2 = max(0, min(width-1, x2))
-        y2 = max(0, min(height-1, y2))
-        
-        # Draw line
-        cv2.line(image, (x1, y1), (x2, y2), 1.0, 1)
-    
-    return image
-
-def load_training_data():
-    """Load all training data"""
-    base_path = "TrainingRecordingDataXMLs/GestureTraining"
-    
-    class_names = ['cast_bombardo', 'cast_protego', 'cast_stupefy', 'cast_expecto_patronum']
-    X, y = [], []
-    
-    for class_idx, class_name in enumerate(class_names):
-        class_folder = os.path.join(base_path, class_name)
-        xml_files = glob.glob(os.path.join(class_folder, "*.xml"))
-        
-        print(f"Loading {len(xml_files)} files for {class_name}")
-        
-        valid_count = 0
-        for xml_file in xml_files:
-            points = load_gesture_xml(xml_file)
-            if points is not None:
-                image = points_to_image(points)
-                X.append(image)
-                y.append(class_idx)
-                valid_count += 1
-        
-        print(f"  -> {valid_count} valid gestures loaded")
-    
-    return np.array(X), np.array(y), class_names
+# Augment the raw strokes and re-rasterize every epoch (sharp lines) instead of warping the images
+STROKE_AUGMENTATION = True
 
-def create_cnn_model():
+def create_cnn_model(conv_channels=(32, 64, 128), dense_units=(256, 128)):
     """Create CNN model for gesture recognition"""
     inputs = keras.Input(shape=(28, 28, 1))
     
     # Feature extraction layers
-    x = keras.layers.Conv2D(32, (3, 3), activation='relu', padding='same')(inputs)
+    x = keras.layers.Conv2D(conv_channels[0], (3, 3), activation='relu', padding='same')(inputs)
     x = keras.layers.BatchNormalization()(x)
     x = keras.layers.MaxPooling2D((2, 2))(x)
     x = keras.layers.Dropout(0.25)(x)
     
-    x = keras.layers.Conv2D(64, (3, 3), activation='relu', padding='same')(x)
+    x = keras.layers.Conv2D(conv_channels[1], (3, 3), activation='relu', padding='same')(x)
     x = keras.layers.BatchNormalization()(x)
     x = keras.layers.MaxPooling2D((2, 2))(x)
     x = keras.layers.Dropout(0.25)(x)
     
-    x = keras.layers.Conv2D(128, (3, 3), activation='relu', padding='same')(x)
+    x = keras.layers.Conv2D(conv_channels[2], (3, 3), activation='relu', padding='same')(x)
     x = keras.layers.BatchNormalization()(x)
     x = keras.layers.GlobalAveragePooling2D()(x)  # Instead of Flatten + MaxPool
     
     # Classification layers
-    x = keras.layers.Dense(256, activation='relu')(x)
+    x = keras.layers.Dense(dense_units[0], activation='relu')(x)
     x = keras.layers.BatchNormalization()(x)
     x = keras.layers.Dropout(0.5)(x)
     
-    x = keras.layers.Dense(128, activation='relu')(x)
+    x = keras.layers.Dense(dense_units[1], activation='relu')(x)
     x = keras.layers.Dropout(0.5)(x)
     
     outputs = keras.layers.Dense(4, activation='softmax')(x)
@@ -162,10 +66,11 @@ def main():
     # Reshape data for CNN
     X = X.reshape(-1, 28, 28, 1)
     
-    # Split data
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, stratify=y, random_state=42
+    # Split data (by index, so the raw points can follow the same split)
+    train_idx, test_idx = train_test_split(
+        np.arange(len(y)), test_size=0.2, stratify=y, random_state=42
     )
+    X_train, X_test, y_train, y_test = X[train_idx], X[test_idx], y[train_idx], y[test_idx]
     
     print(f"\n🔀 Data Split:")
     print(f"Training: {len(X_train)} samples")
@@ -195,16 +100,22 @@ def main():
     
     print(f"\n⚖️  Class weights: {class_weights}")
     
-    # Data augmentation
-    datagen = keras.preprocessing.image.ImageDataGenerator(
-        rotation_range=10,
-        width_shift_range=0.1,
-        height_shift_range=0.1,
-        shear_range=0.1,
-        zoom_range=0.1,
-        fill_mode='constant',
-        cval=0
-    )
+    # Input pipelines
+    if STROKE_AUGMENTATION:
+        # Fresh trimmed/dropped/re-timed/warped strokes every epoch
+        values, offsets, _, _ = load_training_points()
+        train_values, train_offsets = select_gestures(values, offsets, train_idx)
+        train_ds = make_stroke_augmented_dataset(train_values, train_offsets, y_train, batch_size=32)
+    else:
+        # Image-space rotation/shift/shear/zoom augmentation
+        train_ds = make_dataset(X_train, y_train, batch_size=32, training=True, augmentation={
+            'rotation_range': 10,
+            'width_shift_range': 0.1,
+            'height_shift_range': 0.1,
+            'shear_range': 0.1,
+            'zoom_range': 0.1,
+        })
+    test_ds = make_dataset(X_test, y_test, batch_size=32, training=False)
     
     # Callbacks
     callbacks = [
@@ -228,9 +139,9 @@ def main():
     # Train model
     print(f"\n🚀 Starting training...")
     history = model.fit(
-        datagen.flow(X_train, y_train, batch_size=32),
+        train_ds,
         epochs=100,
-        validation_data=(X_test, y_test),
+        validation_data=test_ds,
         class_weight=class_weights,
         callbacks=callbacks,
         verbose=1
@@ -245,16 +156,15 @@ def main():
     # Save models
     model.save('vr_gesture_model.h5')
     print(f"\n💾 Model saved as: vr_gesture_model.h5")
+    # Lets train_vr_finetune.py tell new recordings from trained and held-out ones
+    digests = np.array(load_training_sources()[0])
+    write_manifest(digests[train_idx], digests[test_idx], 'vr_gesture_model.h5')
     
     # Convert to ONNX
     try:
-        import tf2onnx
-        
-        input_signature = [tf.TensorSpec([1, 28, 28, 1], tf.float32)]
-        onnx_model, _ = tf2onnx.convert.from_keras(model, input_signature, opset=13)
+        from gesture_onnx_export import export_keras_model
         
-        with open("vr_gesture_model.onnx", "wb") as f:
-            f.write(onnx_model.SerializeToString())
+        export_keras_model(model, "vr_gesture_model.onnx")
             
         print(f"🔄 ONNX model saved as: vr_gesture_model.onnx")
         print(f"\n✅ Training complete! Replace your Unity model with vr_gesture_model.onnx")
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Prefix (online) training and evaluation for the VR gesture CNN
+
+Recognition normally starts at MovementRecognizer.EndMovement, after the
+whole stroke. This trains create_cnn_model on the full recordings plus
+their prefixes (the first 30/50/70/90% of path length, cut exactly at that
+arc length), so the model can recognize a stroke that is still being drawn.
+
+The report compares the prefix model with the full-stroke model:
+  - accuracy against the fraction of the stroke seen
+  - an online replay: points are fed one at a time into an
+    IncrementalRasterizer (one segment drawn per point, full redraw only
+    when the bounding box grows), the model runs after every point, and the
+    spell commits as soon as its confidence reaches a threshold
+
+    python train_vr_prefix_model.py [--epochs 100]
+    python train_vr_prefix_model.py --evaluate vr_gesture_prefix.onnx   # report only, no TensorFlow
+"""
+
+import argparse
+import os
+import time
+import numpy as np
+from sklearn.model_selection import train_test_split
+from benchmark_inference import load_onnx
+from gesture_preprocessing import (
+    MIN_POINTS, IncrementalRasterizer, load_training_points, packed_points_to_images, select_gestures,
+    truncate_gestures
+)
+
+# --- CONFIGURATION ---
+PREFIX_FRACTIONS = [0.3, 0.5, 0.7, 0.9]     # Prefixes added to the training set
+EVAL_FRACTIONS = [0.3, 0.5, 0.7, 0.9, 1.0]
+COMMIT_CONFIDENCES = [0.9, 0.95, 0.99]       # Online commit thresholds to report
+PREFIX_MODEL_H5 = 'vr_gesture_prefix.h5'
+PREFIX_MODEL_ONNX = 'vr_gesture_prefix.onnx'
+FULL_MODEL_ONNX = 'vr_gesture_model.onnx'
+
+def concat_packed(parts):
+    """Concatenate packed (values, offsets) batches into one"""
+    values = np.concatenate([v for v, _ in parts])
+    starts = np.cumsum([0] + [o[-1] for _, o in parts[:-1]])
+    offsets = np.concatenate([[0]] + [o[1:] + start for (_, o), start in zip(parts, starts)]).astype(np.int64)
+    return values, offsets
+
+def prefix_training_set(values, offsets, y, fractions=PREFIX_FRACTIONS):
+    """Full gestures followed by every prefix, with repeated labels"""
+    parts = [(np.asarray(values, dtype=np.float64), offsets)]
+    parts += [truncate_gestures(values, offsets, fraction) for fraction in fractions]
+    return (*concat_packed(parts), np.tile(y, len(parts)))
+
+def train_prefix_model(values, offsets, y, X_val, y_val, epochs=100):
+    """create_cnn_model trained on stroke-augmented full gestures and prefixes"""
+    from tensorflow import keras
+    from gesture_tf_data import make_stroke_augmented_dataset
+    from train_vr_gesture_model_fixed import create_cnn_model
+
+    model = create_cnn_model()
+    model.compile(
+        optimizer=keras.optimizers.Adam(learning_rate=0.001),
+        loss='sparse_categorical_crossentropy',
+        metrics=['accuracy']
+    )
+    train_ds = make_stroke_augmented_dataset(*prefix_training_set(values, offsets, y), batch_size=32)
+    model.fit(
+        train_ds,
+        epochs=epochs,
+        validation_data=(X_val, y_val),
+        callbacks=[keras.callbacks.EarlyStopping(patience=15, restore_best_weights=True, monitor='val_accuracy')],
+        verbose=2
+    )
+    return model
+
+def prefix_accuracy(predict, values, offsets, y, fractions=EVAL_FRACTIONS):
+    """Accuracy on prefixes of each length, as {fraction: accuracy}"""
+    accuracy = {}
+    for fraction in fractions:
+        X = packed_points_to_images(*truncate_gestures(values, offsets, fraction))[..., None]
+        accuracy[fraction] = float(np.mean(np.argmax(predict(X), axis=1) == y))
+    return accuracy
+
+def replay_online(predict, values, offsets, y, confidence):
+    """Feed every gesture point by point and commit at the first confident prediction
+
+    Returns accuracy, mean fraction of path length seen at commit, share of
+    casts committed before the last point, and ms per point spent updating
+    the raster.
+    """
+    correct, seen, early = [], [], []
+    raster = IncrementalRasterizer()
+    raster_time, points_fed = 0.0, 0
+    for i in range(len(offsets) - 1):
+        points = values[offsets[i]:offsets[i + 1]]
+        arc = np.concatenate([[0.0], np.cumsum(np.linalg.norm(np.diff(points, axis=0), axis=1))])
+        raster.reset()
+        for k, (x, y_) in enumerate(points):
+            start = time.perf_counter()
+            image = raster.add_point(x, y_)
+            raster_time += time.perf_counter() - start
+            points_fed += 1
+            if k + 1 < MIN_POINTS and k + 1 < len(points):
+                continue
+            probabilities = predict(image[None, :, :, None])[0]
+            if probabilities.max() >= confidence or k + 1 == len(points):
+                correct.append(np.argmax(probabilities) == y[i])
+                seen.append(arc[k] / arc[-1] if arc[-1] > 0 else 1.0)
+                early.append(k + 1 < len(points))
+                break
+    return {
+        'accuracy': float(np.mean(correct)),
+        'fraction_seen': float(np.mean(seen)),
+        'committed_early': float(np.mean(early)),
+        'raster_ms_per_point': raster_time / max(points_fed, 1) * 1000,
+    }
+
+def load_batched_onnx(path):
+    """ONNX predict() that accepts any batch, even for graphs exported with a fixed batch of 1"""
+    predict, fixed_batch = load_onnx(path)
+    if fixed_batch != 1:
+        return predict
+    return lambda X: np.concatenate([predict(x[None]) for x in X])
+
+def report(models, values, offsets, y):
+    """Print accuracy by stroke fraction and online commit results for each ONNX model"""
+    predictors = {}
+    for label, path in models.items():
+        if os.path.exists(path):
+            predictors[label] = load_batched_onnx(path)
+        else:
+            print(f"⚠️  {label} model {path} not found, skipped")
+
+    print(f"\n📈 Accuracy by fraction of stroke seen ({len(y)} held-out gestures)")
+    print(f"{'model':>12} " + ' '.join(f"{f:>6.0%}" for f in EVAL_FRACTIONS))
+    for label, predict in predictors.items():
+        accuracy = prefix_accuracy(predict, values, offsets, y)
+        print(f"{label:>12} " + ' '.join(f"{accuracy[f]:>6.3f}" for f in EVAL_FRACTIONS))
+
+    print(f"\n⚡ Online replay: commit at the first prediction >= confidence")
+    print(f"{'model':>12} {'conf':>5} {'accuracy':>9} {'seen':>6} {'early':>6} {'raster ms/pt':>13}")
+    for label, predict in predictors.items():
+        for confidence in COMMIT_CONFIDENCES:
+            r = replay_online(predict, values, offsets, y, confidence)
+            print(f"{label:>12} {confidence:>5.2f} {r['accuracy']:>9.4f} {r['fraction_seen']:>6.1%} "
+                  f"{r['committed_early']:>6.1%} {r['raster_ms_per_point']:>13.4f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Train and evaluate a gesture model on stroke prefixes")
+    parser.add_argument('--epochs', type=int, default=100)
+    parser.add_argument('--evaluate', default=None, metavar='ONNX',
+                        help="Only report on an already exported prefix model")
+    parser.add_argument('--baseline', default=FULL_MODEL_ONNX, help="Full-stroke model to compare against")
+    args = parser.parse_args()
+
+    print("✍️  VR Gesture Prefix Training")
+    print("=" * 40)
+
+    values, offsets, y, class_names = load_training_points()
+    train_idx, test_idx = train_test_split(np.arange(len(y)), test_size=0.2, stratify=y, random_state=42)
+    test_values, test_offsets = select_gestures(values, offsets, test_idx)
+
+    prefix_onnx = args.evaluate or PREFIX_MODEL_ONNX
+    if args.evaluate is None:
+        # Validate on held-out prefixes too, so early stopping rewards early recognition
+        val_values, val_offsets, y_val = prefix_training_set(test_values, test_offsets, y[test_idx])
+        X_val = packed_points_to_images(val_values, val_offsets)[..., None]
+        print(f"Training: {len(train_idx)} gestures x {len(PREFIX_FRACTIONS) + 1} prefixes, Testing: {len(test_idx)}")
+
+        model = train_prefix_model(*select_gestures(values, offsets, train_idx), y[train_idx],
+                                   X_val, y_val, args.epochs)
+        model.save(PREFIX_MODEL_H5)
+        print(f"💾 Saved: {PREFIX_MODEL_H5}")
+        try:
+            from gesture_onnx_export import export_keras_model
+            export_keras_model(model, PREFIX_MODEL_ONNX)
+            print(f"🔄 ONNX saved: {PREFIX_MODEL_ONNX}")
+        except Exception as e:
+            print(f"⚠️ ONNX conversion failed: {e}")
+            return
+
+    report({'full-stroke': args.baseline, 'prefix': prefix_onnx}, test_values, test_offsets, y[test_idx])
+
+if __name__ == "__main__":
+    main()
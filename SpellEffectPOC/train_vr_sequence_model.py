@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+VR Gesture Point-Sequence Model Training
+
+Trains a small 1D-conv (or GRU) classifier on the ordered (28, 2) resampled
+points instead of a 28x28 raster, exports it through the shared ONNX path
+(same 4-class "probabilities" output), and compares parameters, FLOPs,
+onnxruntime latency and accuracy with the raster CNN:
+
+    python train_vr_sequence_model.py [--arch conv|gru] [--epochs 100]
+"""
+
+import argparse
+import numpy as np
+from tensorflow import keras
+from sklearn.model_selection import train_test_split
+from benchmark_inference import evaluate_onnx
+from gesture_onnx_export import export_keras_model, model_stats
+from gesture_preprocessing import (
+    SEQUENCE_POINTS, load_training_points, packed_points_to_images, points_to_sequences, select_gestures
+)
+from gesture_tf_data import make_stroke_augmented_dataset
+
+# --- CONFIGURATION ---
+SEQUENCE_MODEL_H5 = 'vr_gesture_sequence.h5'
+SEQUENCE_MODEL_ONNX = 'vr_gesture_sequence.onnx'
+RASTER_MODEL_ONNX = 'vr_gesture_model.onnx'
+
+def create_sequence_model(arch='conv', num_points=SEQUENCE_POINTS, num_classes=4):
+    """Small classifier over (num_points, 2) normalized point sequences
+
+    The first convolution sees neighbouring points, so it can learn stroke
+    deltas and directions directly from positions.
+    """
+    inputs = keras.Input(shape=(num_points, 2))
+
+    if arch == 'gru':
+        x = keras.layers.GRU(48)(inputs)
+    else:
+        x = keras.layers.Conv1D(32, 3, activation='relu', padding='same')(inputs)
+        x = keras.layers.Conv1D(48, 3, strides=2, activation='relu', padding='same')(x)
+        x = keras.layers.Conv1D(64, 3, strides=2, activation='relu', padding='same')(x)
+        x = keras.layers.GlobalAveragePooling1D()(x)
+
+    x = keras.layers.Dense(32, activation='relu')(x)
+    x = keras.layers.Dropout(0.3)(x)
+    outputs = keras.layers.Dense(num_classes, activation='softmax')(x)
+
+    return keras.Model(inputs=inputs, outputs=outputs)
+
+def compare_with_raster(values, offsets, y, test_idx, num_points=SEQUENCE_POINTS):
+    """Print parameters, FLOPs, latency and accuracy of both exported models"""
+    test_values, test_offsets = select_gestures(values, offsets, test_idx)
+    inputs = {
+        RASTER_MODEL_ONNX: packed_points_to_images(test_values, test_offsets)[..., None],
+        SEQUENCE_MODEL_ONNX: points_to_sequences(test_values, test_offsets, num_points),
+    }
+
+    print(f"\n{'model':>26} {'params':>9} {'FLOPs':>11} {'KB':>7} {'p50 ms':>7} {'accuracy':>9}")
+    for path, X in inputs.items():
+        try:
+            stats = model_stats(path)
+            result = evaluate_onnx(path, X, y[test_idx])
+        except Exception as e:
+            print(f"{path:>26} unavailable: {e}")
+            continue
+        print(f"{path:>26} {stats['params']:>9,} {stats['flops']:>11,} {result['size_bytes'] / 1024:>7.1f} "
+              f"{result['latency_ms']['p50']:>7.3f} {result['accuracy']:>9.4f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the point-sequence gesture model")
+    parser.add_argument('--arch', choices=['conv', 'gru'], default='conv')
+    parser.add_argument('--epochs', type=int, default=100)
+    parser.add_argument('--points', type=int, default=SEQUENCE_POINTS, help="Resampled points per gesture")
+    args = parser.parse_args()
+
+    print("🎯 VR Gesture Point-Sequence Training")
+    print("=" * 40)
+
+    values, offsets, y, class_names = load_training_points()
+    if len(y) == 0:
+        print("❌ No training data loaded!")
+        return
+
+    # Same split as the raster training scripts
+    train_idx, test_idx = train_test_split(
+        np.arange(len(y)), test_size=0.2, stratify=y, random_state=42
+    )
+    train_values, train_offsets = select_gestures(values, offsets, train_idx)
+    X_test = points_to_sequences(*select_gestures(values, offsets, test_idx), args.points)
+    print(f"Training: {len(train_idx)}, Testing: {len(test_idx)}")
+
+    model = create_sequence_model(args.arch, args.points, len(class_names))
+    model.compile(
+        optimizer=keras.optimizers.Adam(learning_rate=0.002),
+        loss='sparse_categorical_crossentropy',
+        metrics=['accuracy']
+    )
+    model.summary()
+
+    # Fresh stroke augmentation every epoch, resampled to sequences instead of rasterized
+    train_ds = make_stroke_augmented_dataset(train_values, train_offsets, y[train_idx],
+                                             batch_size=32, sequence_points=args.points)
+    callbacks = [
+        keras.callbacks.EarlyStopping(patience=15, restore_best_weights=True, monitor='val_accuracy'),
+        keras.callbacks.ReduceLROnPlateau(factor=0.5, patience=8, monitor='val_accuracy'),
+    ]
+
+    print(f"\n🚀 Training...")
+    model.fit(
+        train_ds,
+        epochs=args.epochs,
+        validation_data=(X_test, y[test_idx]),
+        callbacks=callbacks,
+        verbose=1
+    )
+
+    test_loss, test_acc = model.evaluate(X_test, y[test_idx], verbose=0)
+    print(f"\n🎯 Test accuracy: {test_acc:.4f}")
+
+    model.save(SEQUENCE_MODEL_H5)
+    print(f"💾 Saved: {SEQUENCE_MODEL_H5}")
+
+    try:
+        export_keras_model(model, SEQUENCE_MODEL_ONNX, input_shape=(args.points, 2))
+        print(f"🔄 ONNX saved: {SEQUENCE_MODEL_ONNX} (input: (batch, {args.points}, 2) normalized points)")
+    except Exception as e:
+        print(f"⚠️ ONNX conversion failed: {e}")
+        return
+
+    compare_with_raster(values, offsets, y, test_idx, args.points)
+
+if __name__ == "__main__":
+    main()
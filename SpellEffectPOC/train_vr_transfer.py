@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Quick, Draw! pretraining and transfer to the VR gesture CNN
+
+The four Quick, Draw! shapes are the four spells (class_mapping in
+train_vr_gesture_model.py): triangle -> bombardo, circle -> protego,
+zigzag -> stupefy, square -> expecto_patronum, in CLASS_NAMES order. So
+create_cnn_model is pretrained once on the Quick, Draw! bitmaps (streamed
+from the memory-mapped cache of train_gesture_model.py) and saved as a
+backbone, head included. The VR model then starts from that backbone:
+the first conv block stays frozen, the upper blocks and the head are
+fine-tuned on the XML corpus with the usual stroke augmentation.
+
+The report trains the same network from scratch on the same data and
+compares the epochs needed to reach a target held-out accuracy:
+
+    python train_vr_transfer.py [--target 0.95] [--epochs 60] [--repeats 1]
+    python train_vr_transfer.py --pretrain-only          # just build quickdraw_backbone.h5
+    python train_vr_transfer.py --skip-scratch           # transfer model only, no comparison
+"""
+
+import argparse
+import json
+import os
+import time
+import numpy as np
+from sklearn.model_selection import train_test_split
+from gesture_preprocessing import load_training_data, load_training_points, select_gestures
+from gesture_training import class_weights, freeze_conv_blocks
+from train_gesture_model import (
+    CACHE_DIR, download_quickdraw_data, make_quickdraw_dataset, open_quickdraw_data, split_rows
+)
+
+# --- CONFIGURATION ---
+BACKBONE_H5 = 'quickdraw_backbone.h5'
+TRANSFER_H5 = 'vr_gesture_transfer.h5'
+TRANSFER_ONNX = 'vr_gesture_transfer.onnx'
+REPORT_JSON = 'transfer_report.json'
+PRETRAIN_EPOCHS = 5
+TRANSFER_LR = 0.0005
+FROZEN_CONV_BLOCKS = 1   # Upper conv blocks and the head are fine-tuned
+MAX_EPOCHS = 60
+TARGET_ACCURACY = 0.95
+
+def pretrain_backbone(cache_dir=CACHE_DIR, epochs=PRETRAIN_EPOCHS, path=BACKBONE_H5):
+    """Train create_cnn_model on Quick, Draw! and save it; returns the model"""
+    from tensorflow import keras
+    from train_vr_gesture_model_fixed import create_cnn_model
+
+    class_data = open_quickdraw_data(cache_dir=cache_dir)
+    splits = split_rows(class_data)
+    model = create_cnn_model()
+    model.compile(
+        optimizer=keras.optimizers.Adam(learning_rate=0.001),
+        loss='sparse_categorical_crossentropy',
+        metrics=['accuracy']
+    )
+    model.fit(
+        make_quickdraw_dataset(class_data, [t for t, _ in splits], training=True),
+        epochs=epochs,
+        validation_data=make_quickdraw_dataset(class_data, [v for _, v in splits], training=False),
+        verbose=2
+    )
+    model.save(path)
+    print(f"💾 Backbone saved: {path}")
+    return model
+
+def epochs_to_target(val_accuracy, target):
+    """1-based epoch at which val_accuracy first reaches target, or None"""
+    reached = [i + 1 for i, acc in enumerate(val_accuracy) if acc >= target]
+    return reached[0] if reached else None
+
+def train_vr(model, values, offsets, y, X_val, y_val, learning_rate, epochs=MAX_EPOCHS, seed=None):
+    """Stroke-augmented VR training with the fixed-script callbacks; returns the val_accuracy history"""
+    from tensorflow import keras
+    from gesture_tf_data import make_stroke_augmented_dataset
+
+    model.compile(
+        optimizer=keras.optimizers.Adam(learning_rate=learning_rate),
+        loss='sparse_categorical_crossentropy',
+        metrics=['accuracy']
+    )
+    history = model.fit(
+        make_stroke_augmented_dataset(values, offsets, y, batch_size=32, seed=seed),
+        epochs=epochs,
+        validation_data=(X_val, y_val),
+        class_weight=class_weights(y),
+        callbacks=[
+            keras.callbacks.EarlyStopping(patience=15, restore_best_weights=True, monitor='val_accuracy'),
+            keras.callbacks.ReduceLROnPlateau(factor=0.5, patience=8, monitor='val_accuracy'),
+        ],
+        verbose=2
+    )
+    return history.history['val_accuracy']
+
+def transfer_model(backbone_path=BACKBONE_H5, frozen_blocks=FROZEN_CONV_BLOCKS):
+    """VR model initialized from the pretrained backbone, leading conv blocks frozen"""
+    from tensorflow import keras
+
+    model = keras.models.load_model(backbone_path, compile=False)
+    frozen = freeze_conv_blocks(model, frozen_blocks)
+    print(f"🧊 Frozen: {', '.join(frozen) or 'nothing'}")
+    return model
+
+def main():
+    parser = argparse.ArgumentParser(description="Pretrain on Quick, Draw! and transfer to the VR corpus")
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help="Quick, Draw! class files (see train_gesture_model.py)")
+    parser.add_argument('--backbone', default=BACKBONE_H5)
+    parser.add_argument('--retrain-backbone', action='store_true', help="Pretrain even if the backbone exists")
+    parser.add_argument('--pretrain-only', action='store_true')
+    parser.add_argument('--pretrain-epochs', type=int, default=PRETRAIN_EPOCHS)
+    parser.add_argument('--frozen-blocks', type=int, default=FROZEN_CONV_BLOCKS)
+    parser.add_argument('--lr', type=float, default=TRANSFER_LR)
+    parser.add_argument('--epochs', type=int, default=MAX_EPOCHS)
+    parser.add_argument('--target', type=float, default=TARGET_ACCURACY, help="Held-out accuracy to reach")
+    parser.add_argument('--repeats', type=int, default=1, help="Runs per method, with different seeds")
+    parser.add_argument('--skip-scratch', action='store_true', help="Do not train the from-scratch baseline")
+    args = parser.parse_args()
+
+    print("🧪 Quick, Draw! -> VR Transfer")
+    print("=" * 40)
+
+    if args.retrain_backbone or not os.path.exists(args.backbone):
+        download_quickdraw_data(cache_dir=args.cache_dir)
+        start = time.perf_counter()
+        pretrain_backbone(args.cache_dir, args.pretrain_epochs, args.backbone)
+        print(f"⏱️  Pretraining took {time.perf_counter() - start:.0f}s (done once)")
+    else:
+        print(f"📦 Using pretrained backbone {args.backbone}")
+    if args.pretrain_only:
+        return
+
+    from train_vr_gesture_model_fixed import create_cnn_model
+
+    X, y, _ = load_training_data()
+    values, offsets, _, _ = load_training_points()
+    X = X.reshape(-1, 28, 28, 1)
+    train_idx, test_idx = train_test_split(np.arange(len(y)), test_size=0.2, stratify=y, random_state=42)
+    train_values, train_offsets = select_gestures(values, offsets, train_idx)
+    X_test, y_test = X[test_idx], y[test_idx]
+
+    methods = {'transfer': lambda: (transfer_model(args.backbone, args.frozen_blocks), args.lr)}
+    if not args.skip_scratch:
+        methods['scratch'] = lambda: (create_cnn_model(), 0.001)
+
+    results = []
+    for repeat in range(args.repeats):
+        for method, build in methods.items():
+            print(f"\n🚀 {method} (run {repeat + 1}/{args.repeats})")
+            model, learning_rate = build()
+            start = time.perf_counter()
+            val_accuracy = train_vr(model, train_values, train_offsets, y[train_idx], X_test, y_test,
+                                    learning_rate, args.epochs, seed=repeat)
+            results.append({
+                'method': method,
+                'run': repeat,
+                'epochs_to_target': epochs_to_target(val_accuracy, args.target),
+                'epochs': len(val_accuracy),
+                'best_accuracy': float(max(val_accuracy)),
+                'seconds': time.perf_counter() - start,
+            })
+            if method == 'transfer' and repeat == 0:
+                model.save(TRANSFER_H5)
+                print(f"💾 Model saved as: {TRANSFER_H5}")
+                try:
+                    from gesture_onnx_export import export_keras_model
+                    export_keras_model(model, TRANSFER_ONNX)
+                    print(f"🔄 ONNX model saved as: {TRANSFER_ONNX}")
+                except Exception as e:
+                    print(f"⚠️  ONNX conversion failed: {e}")
+
+    print(f"\n📈 Epochs to {args.target:.0%} held-out accuracy ({len(test_idx)} gestures)")
+    print(f"{'method':>9} {'run':>4} {'to target':>10} {'epochs':>7} {'best':>7} {'seconds':>8}")
+    for r in results:
+        reached = r['epochs_to_target'] if r['epochs_to_target'] is not None else 'never'
+        print(f"{r['method']:>9} {r['run']:>4} {reached:>10} {r['epochs']:>7} {r['best_accuracy']:>7.4f} "
+              f"{r['seconds']:>8.1f}")
+    for method in methods:
+        reached = [r['epochs_to_target'] for r in results if r['method'] == method]
+        if all(e is not None for e in reached):
+            print(f"   {method}: mean {np.mean(reached):.1f} epochs to target")
+        else:
+            print(f"   {method}: missed the target in {reached.count(None)} of {len(reached)} runs")
+
+    with open(REPORT_JSON, 'w') as f:
+        json.dump({'target': args.target, 'backbone': args.backbone, 'results': results}, f, indent=2)
+    print(f"💾 Report saved: {REPORT_JSON}")
+
+if __name__ == "__main__":
+    main()